@@ -1,48 +1,183 @@
 import os
-from flask import Flask, render_template, redirect, url_for, flash, request, jsonify
-from flask_sqlalchemy import SQLAlchemy
+import base64
+import binascii
+import hashlib
+import hmac
+import io
+import json
+import secrets
+import sqlite3
+import click
+from flask import (
+    Blueprint, Flask, Response, current_app, make_response, render_template, redirect,
+    url_for, flash, request, session, jsonify, stream_with_context
+)
+from flask.cli import AppGroup
+from flask_login import current_user, login_required, login_user, logout_user
+from markupsafe import Markup
 from datetime import datetime
-import google.generativeai as genai
-from sqlalchemy.orm import DeclarativeBase
-from utils.gemini import chat_with_gemini, validate_learning, generate_task_schedule
+from sqlalchemy import and_, case, event, func, or_
+from sqlalchemy.orm import joinedload, selectinload
+from extensions import db, login_manager
+from models import User, Goal, Task
+from forms import GoalForm, LoginForm, RegistrationForm
+from migrations import run_migrations
+from utils.bulk import archived_goal_ids, bulk_insert_tasks, delete_goals, import_goals
+from utils.curriculum import configure_curriculum, template_schedule
+from utils.gemini import (
+    chat_with_gemini, configure_gemini, stream_chat_with_gemini, validate_learning, validate_learning_batch
+)
+from utils.jobs import create_job_queue
+from utils.llm_cache import MemoryCache, configure_llm_cache, get_llm_cache
+from utils.llm_gateway import configure_llm_gateway, get_llm_gateway
+from utils.metrics import init_request_metrics, registry as metrics_registry, schedules_generated
+from utils.search import SEARCH_TYPES, search
+from utils.stats import (
+    bump_data_version, get_data_version, get_user_stats, rebuild_user_stats,
+    record_tasks_added, record_tasks_completed, record_tasks_removed, stats_summary
+)
+from utils.transfer import EXPORT_FORMATS, EXPORT_MIMETYPES, READERS, export_goals, import_records
 import logging
 
-logging.basicConfig(level=logging.DEBUG)
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO").upper())
 logger = logging.getLogger(__name__)
 
-class Base(DeclarativeBase):
-    pass
-
-db = SQLAlchemy(model_class=Base)
-app = Flask(__name__)
-app.secret_key = os.environ.get("SESSION_SECRET", "default-secret-key")
-
-# Database configuration
-app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///goals.db"
-app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-db.init_app(app)
-
-# Gemini AI configuration
-genai.configure(api_key=os.environ.get("GEMINI_API_KEY"))
-
-from models import User, Goal, Task
-from forms import GoalForm
+# Routes and CLI commands; create_app() registers them. cli_group=None puts
+# the commands at the top level (flask migrate, flask goals ...)
+main = Blueprint('main', __name__, cli_group=None)
+
+def collect_llm_cache_metrics():
+    stats = get_llm_cache().stats()
+    return [
+        ('llm_cache_hits_total', 'counter', 'LLM response cache hits.', stats['hits']),
+        ('llm_cache_misses_total', 'counter', 'LLM response cache misses.', stats['misses']),
+        ('llm_cache_evictions_total', 'counter', 'LLM response cache evictions.', stats['evictions']),
+        ('llm_cache_entries', 'gauge', 'Entries in the LLM response cache.', stats['entries'])
+    ]
+
+metrics_registry.add_collector(collect_llm_cache_metrics)
+
+def collect_llm_gateway_metrics():
+    stats = get_llm_gateway().stats()
+    return [
+        ('llm_gateway_in_flight', 'gauge', 'Gemini calls currently in flight.', stats['in_flight']),
+        ('llm_gateway_rejected_total', 'counter', 'Gemini calls refused by the gateway.', stats['rejected']),
+        ('llm_gateway_retries_total', 'counter', 'Gemini calls retried after a failure.', stats['retries']),
+        ('llm_gateway_circuit_open', 'gauge', '1 while the Gemini circuit breaker is open or half-open.',
+         stats['circuit_open'])
+    ]
+
+metrics_registry.add_collector(collect_llm_gateway_metrics)
 
 # Add nl2br template filter
-@app.template_filter('nl2br')
+@main.app_template_filter('nl2br')
 def nl2br_filter(s):
     if s is None:
         return ""
     return s.replace('\n', '<br>')
 
-@app.route('/')
+def data_etag(*parts):
+    """Strong ETag for a response that depends only on the user's data and `parts`"""
+    payload = json.dumps(
+        [current_user.id, get_data_version(current_user.id), current_app.config["ETAG_SALT"], *parts],
+        default=str
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+def conditional_response(etag, build):
+    """304 when the client already holds `etag`, otherwise build() tagged with it.
+
+    Browsers revalidate on every use (no-cache) and send the ETag back in
+    If-None-Match, including for fetch() calls, so a repeat view costs one
+    primary-key read. A pending flash message always gets a full render.
+    """
+    if request.if_none_match.contains(etag) and '_flashes' not in session:
+        response = Response(status=304)
+    else:
+        response = make_response(build())
+        if response.status_code != 200:
+            return response
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+@login_manager.user_loader
+def load_user(user_id):
+    return db.session.get(User, int(user_id))
+
+@login_manager.unauthorized_handler
+def unauthorized():
+    """Send pages to the login form; API and fetch() callers get a 401"""
+    if request.path.startswith('/api/') or request.is_json:
+        return jsonify({'error': 'Authentication required'}), 401
+    return redirect(url_for('main.login', next=request.full_path if request.query_string else request.path))
+
+def owned_goal_or_404(goal_id):
+    return Goal.query.filter_by(id=goal_id, user_id=current_user.id).first_or_404()
+
+def owned_task_or_404(task_id):
+    return Task.query.filter_by(id=task_id, user_id=current_user.id).first_or_404()
+
+def safe_next_url(target):
+    """Only follow redirects within this site"""
+    if target and target.startswith('/') and not target.startswith('//'):
+        return target
+    return url_for('main.dashboard')
+
+@main.route('/login', methods=['GET', 'POST'])
+def login():
+    if current_user.is_authenticated:
+        return redirect(url_for('main.dashboard'))
+    form = LoginForm()
+    if form.validate_on_submit():
+        user = User.query.filter_by(email=form.email.data.strip().lower()).first()
+        if user is not None and user.check_password(form.password.data):
+            login_user(user, remember=form.remember.data)
+            return redirect(safe_next_url(request.args.get('next')))
+        flash('Invalid email or password.', 'error')
+    return render_template('login.html', form=form)
+
+@main.route('/register', methods=['GET', 'POST'])
+def register():
+    if current_user.is_authenticated:
+        return redirect(url_for('main.dashboard'))
+    form = RegistrationForm()
+    if form.validate_on_submit():
+        try:
+            user = User(username=form.username.data.strip(), email=form.email.data.strip().lower())
+            user.set_password(form.password.data)
+            db.session.add(user)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error registering user: {str(e)}")
+            flash('Error creating your account. Please try again.', 'error')
+            return render_template('register.html', form=form)
+        login_user(user)
+        logger.info(f"Registered user {user.id}")
+        flash('Welcome! Add your first goal to get started.', 'success')
+        return redirect(url_for('main.new_goal'))
+    return render_template('register.html', form=form)
+
+@main.route('/logout', methods=['POST'])
+def logout():
+    logout_user()
+    return redirect(url_for('main.login'))
+
+@main.route('/')
+@login_required
 def dashboard():
-    goals = Goal.query.all()
-    stats = calculate_stats()
     today_date = datetime.now().date().strftime('%Y-%m-%d')
-    return render_template('dashboard.html', goals=goals, stats=stats, today_date=today_date)
 
-@app.route('/goal/new', methods=['GET', 'POST'])
+    def render():
+        goals, stats, goal_cards = load_dashboard_data(current_user.id, today_date)
+        return render_template('dashboard.html', goals=goals, stats=stats,
+                               goal_cards=goal_cards, today_date=today_date)
+
+    return conditional_response(data_etag('dashboard', today_date), render)
+
+@main.route('/goal/new', methods=['GET', 'POST'])
+@login_required
 def new_goal():
     form = GoalForm()
     if form.validate_on_submit():
@@ -53,48 +188,53 @@ def new_goal():
                 description=form.description.data,
                 start_date=form.start_date.data,
                 end_date=form.end_date.data,
-                user_id=1  # Default user ID for now
+                user_id=current_user.id
             )
             db.session.add(goal)
-            db.session.commit()
-            logger.info(f"Created new goal: {goal.title}")
-
-            # Generate schedule using Gemini AI
-            tasks = generate_task_schedule(
-                goal.title,
-                goal.description,
-                goal.start_date,
-                goal.end_date
-            )
+            db.session.flush()
+            bump_data_version(goal.user_id)
 
+            # A goal that clearly matches a curriculum template gets its
+            # schedule right away, without asking Gemini
+            tasks = template_schedule(goal.title, goal.description, goal.start_date, goal.end_date)
             if tasks:
-                # Add generated tasks to database
-                for task_date, task_desc in tasks:
-                    task = Task(
-                        date=task_date,
-                        description=task_desc,
-                        goal_id=goal.id
-                    )
-                    db.session.add(task)
+                bulk_insert_tasks(goal, tasks)
+                record_tasks_added(goal.user_id, len(tasks))
                 db.session.commit()
-                logger.info(f"Generated {len(tasks)} tasks for goal: {goal.title}")
+                schedules_generated.inc('template')
+                logger.info(f"Created new goal from a template: {goal.title}")
                 flash('Goal and schedule created successfully!', 'success')
-            else:
+                return redirect(url_for('main.dashboard'))
+
+            # Schedule generation runs in the background; the job row is
+            # committed together with the goal
+            schedule_queue = current_app.extensions['schedule_queue']
+            job = schedule_queue.enqueue(goal)
+            db.session.commit()
+            logger.info(f"Created new goal: {goal.title}")
+            schedule_queue.dispatch(job)
+
+            if job.status == 'succeeded':
+                flash('Goal and schedule created successfully!', 'success')
+            elif job.status == 'failed':
                 logger.warning(f"No tasks generated for goal: {goal.title}")
                 flash('Goal created but there was an error generating the schedule.', 'warning')
+            else:
+                flash('Goal created! Your schedule is being generated and will appear shortly.', 'info')
 
         except Exception as e:
             db.session.rollback()
             logger.error(f"Error creating goal: {str(e)}")
             flash('Error creating goal. Please try again.', 'error')
 
-        return redirect(url_for('dashboard'))
+        return redirect(url_for('main.dashboard'))
 
     return render_template('goal.html', form=form)
 
-@app.route('/validate_concept/<int:task_id>', methods=['POST'])
+@main.route('/validate_concept/<int:task_id>', methods=['POST'])
+@login_required
 def validate_concept(task_id):
-    task = Task.query.get_or_404(task_id)
+    task = owned_task_or_404(task_id)
     user_response = request.json.get('response')
 
     if not user_response:
@@ -102,23 +242,104 @@ def validate_concept(task_id):
 
     is_valid, feedback = validate_learning(task.description, user_response)
 
-    if is_valid:
-        task.completed = True
-        try:
-            db.session.commit()
-        except Exception as e:
-            db.session.rollback()
-            logger.error(f"Error saving task completion: {str(e)}")
-            return jsonify({'error': 'Error saving completion status'}), 500
+    if is_valid and not complete_task(task):
+        return jsonify({'error': 'Error saving completion status'}), 500
 
     return jsonify({
         'success': is_valid,
         'feedback': feedback
     })
 
-@app.route('/task/update/<int:task_id>', methods=['POST'])
+def complete_task(task):
+    """Mark a validated task as done; returns False if that could not be saved"""
+    return complete_tasks([task])
+
+def complete_tasks(tasks):
+    """Mark validated tasks as done in one transaction; returns False if that
+    could not be saved"""
+    task_dates = {}
+    for task in tasks:
+        if not task.completed:
+            task.completed = True
+            task_dates.setdefault(task.user_id, []).append(task.date)
+    if not task_dates:
+        return True
+    try:
+        for user_id, dates in task_dates.items():
+            record_tasks_completed(user_id, dates)
+        db.session.commit()
+        return True
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error saving task completion: {str(e)}")
+        return False
+
+# Upper bound on the answers one /validate_concepts request may submit
+VALIDATION_BATCH_MAX_ITEMS = 50
+
+def parse_validation_items(data):
+    """Return ([(task_id, response)], None) for a batch request body, or (None, error)"""
+    items = data.get('items') if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return None, 'No responses provided'
+    if len(items) > VALIDATION_BATCH_MAX_ITEMS:
+        return None, f'At most {VALIDATION_BATCH_MAX_ITEMS} responses per request'
+    pairs = []
+    for item in items:
+        task_id = item.get('task_id') if isinstance(item, dict) else None
+        response = item.get('response') if isinstance(item, dict) else None
+        if not isinstance(task_id, int) or not isinstance(response, str) or not response.strip():
+            return None, 'Each item needs a task_id and a response'
+        pairs.append((task_id, response))
+    if len({task_id for task_id, _ in pairs}) < len(pairs):
+        return None, 'Each task may only appear once'
+    return pairs, None
+
+def task_descriptions(task_ids, user_id):
+    """Descriptions of the listed tasks that belong to the user"""
+    return dict(
+        db.session.query(Task.id, Task.description).filter(Task.id.in_(task_ids), Task.user_id == user_id)
+    )
+
+def finish_validation_batch(pairs, verdicts, user_id):
+    """Save the completions from a validated batch in a single transaction
+    and build the per-task results; returns (body, status)"""
+    valid_ids = [task_id for task_id, (is_valid, _) in verdicts.items() if is_valid]
+    if valid_ids:
+        tasks = Task.query.filter(Task.id.in_(valid_ids), Task.user_id == user_id).all()
+        if not complete_tasks(tasks):
+            return {'error': 'Error saving completion status'}, 500
+
+    results = []
+    for task_id, _ in pairs:
+        if task_id in verdicts:
+            is_valid, feedback = verdicts[task_id]
+            results.append({'task_id': task_id, 'success': is_valid, 'feedback': feedback})
+        else:
+            results.append({'task_id': task_id, 'error': 'Task not found'})
+    return {'results': results}, 200
+
+@main.route('/validate_concepts', methods=['POST'])
+@login_required
+def validate_concepts():
+    """Validate answers for several tasks with as few Gemini calls as possible"""
+    pairs, error = parse_validation_items(request.get_json(silent=True))
+    if error:
+        return jsonify({'error': error}), 400
+
+    descriptions = task_descriptions([task_id for task_id, _ in pairs], current_user.id)
+    found = [(task_id, response) for task_id, response in pairs if task_id in descriptions]
+    verdicts = validate_learning_batch([(descriptions[task_id], response) for task_id, response in found])
+
+    body, status = finish_validation_batch(
+        pairs, dict(zip([task_id for task_id, _ in found], verdicts)), current_user.id
+    )
+    return jsonify(body), status
+
+@main.route('/task/update/<int:task_id>', methods=['POST'])
+@login_required
 def update_task(task_id):
-    task = Task.query.get_or_404(task_id)
+    task = owned_task_or_404(task_id)
     data = request.json
 
     if 'description' not in data:
@@ -126,6 +347,7 @@ def update_task(task_id):
 
     try:
         task.description = data['description']
+        bump_data_version(task.user_id)
         db.session.commit()
         return jsonify({'success': True})
     except Exception as e:
@@ -133,38 +355,86 @@ def update_task(task_id):
         logger.error(f"Error updating task: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
-def calculate_stats():
-    total_tasks = Task.query.count()
-    completed_tasks = Task.query.filter_by(completed=True).count()
-    return {
-        "streak": calculate_streak(),
-        "active_days": completed_tasks,
-        "missing_days": total_tasks - completed_tasks
-    }
-
-def calculate_streak():
-    tasks = Task.query.filter_by(completed=True).order_by(Task.date.desc()).all()
-    streak = 0
-    current_date = datetime.now().date()
-
-    for task in tasks:
-        if (current_date - task.date).days == streak:
-            streak += 1
+def load_dashboard_data(user_id, today_date=None):
+    """Load the goals, the dashboard stats and each goal's rendered card.
+
+    Cards are cached per goal and data version, so only goals without a
+    cached card need their tasks loaded, in a single query. With every
+    card cached the page costs the stats read and the goal query.
+    """
+    today_date = today_date or datetime.now().date().strftime('%Y-%m-%d')
+    # Stats first: building a missing stats row commits, which would
+    # expire the goals loaded below
+    stats = get_user_stats(user_id)
+    version = stats.data_version
+    summary = stats_summary(stats)
+    goals = (
+        Goal.query.options(selectinload(Goal.schedule_job))
+        .filter(Goal.user_id == user_id).order_by(Goal.id).all()
+    )
+    return goals, summary, render_goal_cards(goals, version, today_date)
+
+def render_goal_cards(goals, version, today_date):
+    """Map goal id -> rendered _goal_card.html, from the fragment cache where possible"""
+    cards = {}
+    missing = []
+    for goal in goals:
+        html = current_app.extensions['fragment_cache'].get(f"goal-card:{goal.id}:{version}:{today_date}")
+        if html is None:
+            missing.append(goal)
         else:
-            break
-
-    return streak
-
-@app.route('/chat')
+            cards[goal.id] = Markup(html)
+
+    if missing:
+        tasks_by_goal = {goal.id: [] for goal in missing}
+        tasks = Task.query.filter(Task.goal_id.in_(tasks_by_goal)).order_by(Task.date, Task.id)
+        for task in tasks:
+            tasks_by_goal[task.goal_id].append(task)
+        for goal in missing:
+            html = render_template('_goal_card.html', goal=goal, tasks=tasks_by_goal[goal.id],
+                                   today_date=today_date)
+            current_app.extensions['fragment_cache'].set(f"goal-card:{goal.id}:{version}:{today_date}", html)
+            cards[goal.id] = Markup(html)
+    return cards
+
+@main.cli.command('rebuild-stats')
+@click.option('--user-id', type=int, help='Only rebuild stats for this user.')
+def rebuild_stats_command(user_id):
+    """Recompute the materialized dashboard stats from task history"""
+    user_ids = [user_id] if user_id else [u.id for u in User.query.all()]
+    for uid in user_ids:
+        rebuild_user_stats(uid)
+    db.session.commit()
+    click.echo(f"Rebuilt stats for {len(user_ids)} user(s)")
+
+@main.route('/chat')
+@login_required
 def chat():
     return render_template('chat.html')
     
-@app.route('/help')
+def metrics_scrape_allowed():
+    """With METRICS_TOKEN set the scraper must send it as a bearer token;
+    without one only clients on this host may scrape"""
+    token = current_app.config["METRICS_TOKEN"]
+    if token:
+        expected = f"Bearer {token}".encode()
+        return hmac.compare_digest(request.headers.get('Authorization', '').encode(), expected)
+    return request.remote_addr in ('127.0.0.1', '::1')
+
+@main.route('/metrics')
+def metrics():
+    """Prometheus scrape endpoint for this worker process"""
+    if not metrics_scrape_allowed():
+        return Response('Forbidden\n', status=403, mimetype='text/plain')
+    return Response(metrics_registry.render(), mimetype='text/plain; version=0.0.4')
+
+@main.route('/help')
 def help_page():
     """Display help information about how to use the app"""
     return render_template('help.html')
 
-@app.route('/chat/send', methods=['POST'])
+@main.route('/chat/send', methods=['POST'])
+@login_required
 def process_chat():
     message = request.json.get('message')
     if not message:
@@ -181,73 +451,520 @@ def process_chat():
             'error': result['error'] or 'Failed to process message'
         }), 500
 
-@app.route('/goal/delete/<int:goal_id>', methods=['POST'])
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@main.route('/chat/stream', methods=['POST'])
+@login_required
+def stream_chat():
+    """Stream the chat reply as Server-Sent Events while it is generated"""
+    message = request.json.get('message')
+    if not message:
+        return jsonify({'error': 'No message provided'}), 400
+
+    def events():
+        chunks = stream_chat_with_gemini(message)
+        try:
+            for text in chunks:
+                yield sse_event('chunk', {'text': text})
+            yield sse_event('done', {})
+        except Exception as e:
+            logger.error(f"Error in chat stream: {str(e)}")
+            yield sse_event('error', {'error': str(e)})
+        finally:
+            # Runs when the server closes the response on client disconnect,
+            # which cancels the upstream generation
+            chunks.close()
+
+    return Response(events(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@main.route('/goal/delete/<int:goal_id>', methods=['POST'])
+@login_required
 def delete_goal(goal_id):
-    goal = Goal.query.get_or_404(goal_id)
+    goal = owned_goal_or_404(goal_id)
     try:
-        # Delete associated tasks first
-        Task.query.filter_by(goal_id=goal.id).delete()
-        # Then delete the goal
+        total, completed = db.session.query(
+            func.count(Task.id),
+            func.count(case((Task.completed.is_(True), 1)))
+        ).filter(Task.goal_id == goal.id).one()
+        # Tasks and the schedule job go with it through ON DELETE CASCADE
         db.session.delete(goal)
+        record_tasks_removed(goal.user_id, total, completed)
         db.session.commit()
         flash('Goal deleted successfully!', 'success')
     except Exception as e:
         db.session.rollback()
         flash('Error deleting goal. Please try again.', 'error')
         logger.error(f"Error deleting goal: {str(e)}")
-    return redirect(url_for('dashboard'))
-
-@app.route('/api/tasks')
+    return redirect(url_for('main.dashboard'))
+
+# Columns /api/tasks can project with ?fields=
+TASK_API_FIELDS = {
+    'id': Task.id,
+    'date': Task.date,
+    'description': Task.description,
+    'completed': Task.completed,
+    'goal_id': Task.goal_id
+}
+TASK_API_MAX_LIMIT = 500
+
+def encode_task_cursor(task_date, task_id):
+    raw = f"{task_date.strftime('%Y-%m-%d')},{task_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+def decode_task_cursor(cursor):
+    date_str, task_id = base64.urlsafe_b64decode(cursor.encode()).decode().split(',')
+    return datetime.strptime(date_str, '%Y-%m-%d').date(), int(task_id)
+
+@main.route('/api/tasks')
+@login_required
 def get_tasks():
-    """API endpoint to get tasks for calendar view"""
-    tasks = Task.query.all()
-    task_list = []
-    
-    for task in tasks:
-        task_list.append({
-            'id': task.id,
-            'date': task.date.strftime('%Y-%m-%d'),
-            'description': task.description,
-            'completed': task.completed,
-            'goal_id': task.goal_id
+    """API endpoint to get tasks for calendar view.
+
+    Optional query parameters:
+      start, end  -- inclusive YYYY-MM-DD bounds on the task date
+      goal_id     -- only tasks of this goal
+      fields      -- comma separated subset of the task fields to return
+      limit       -- page size; the next page's cursor is sent in X-Next-Cursor
+      cursor      -- continue after the page that returned this cursor
+      summary=day -- return {date: {total, completed}} instead of tasks
+
+    Responses carry an ETag and are answered with 304 until the data changes.
+    """
+    return conditional_response(data_etag('api_tasks', request.query_string.decode()), task_list_response)
+
+def task_list_response():
+    # Every filter starts from the user's (user_id, date) index
+    filters = [Task.user_id == current_user.id]
+    try:
+        if request.args.get('start'):
+            start = datetime.strptime(request.args['start'], '%Y-%m-%d').date()
+            filters.append(Task.date >= start)
+        if request.args.get('end'):
+            end = datetime.strptime(request.args['end'], '%Y-%m-%d').date()
+            filters.append(Task.date <= end)
+    except ValueError:
+        return jsonify({'error': 'Dates must use the YYYY-MM-DD format'}), 400
+    goal_id = request.args.get('goal_id', type=int)
+    if goal_id is not None:
+        filters.append(Task.goal_id == goal_id)
+
+    if request.args.get('summary') == 'day':
+        rows = db.session.query(
+            Task.date,
+            func.count(Task.id),
+            func.count(case((Task.completed.is_(True), 1)))
+        ).filter(*filters).group_by(Task.date).all()
+        return jsonify({
+            task_date.strftime('%Y-%m-%d'): {'total': total, 'completed': completed}
+            for task_date, total, completed in rows
         })
-    
-    return jsonify(task_list)
 
-@app.route('/tasks/date/<date_string>')
+    fields = list(TASK_API_FIELDS)
+    if request.args.get('fields'):
+        fields = [f.strip() for f in request.args['fields'].split(',') if f.strip()]
+        unknown = [f for f in fields if f not in TASK_API_FIELDS]
+        if unknown:
+            return jsonify({'error': f"Unknown fields: {', '.join(unknown)}"}), 400
+
+    limit = request.args.get('limit', type=int)
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            after_date, after_id = decode_task_cursor(cursor)
+        except (ValueError, UnicodeDecodeError, binascii.Error):
+            return jsonify({'error': 'Invalid cursor'}), 400
+        filters.append(or_(
+            Task.date > after_date,
+            and_(Task.date == after_date, Task.id > after_id)
+        ))
+        limit = limit or TASK_API_MAX_LIMIT
+    if limit is not None:
+        limit = max(1, min(limit, TASK_API_MAX_LIMIT))
+
+    # The keyset columns are always selected so the next cursor can be built
+    columns = [TASK_API_FIELDS[f] for f in fields if f not in ('id', 'date')]
+    query = db.session.query(Task.id, Task.date, *columns).filter(*filters)
+    query = query.order_by(Task.date, Task.id)
+    if limit is not None:
+        query = query.limit(limit + 1)
+    rows = query.all()
+
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_task_cursor(rows[-1].date, rows[-1].id)
+
+    task_list = []
+    for row in rows:
+        task = {}
+        for field in fields:
+            value = getattr(row, field)
+            task[field] = value.strftime('%Y-%m-%d') if field == 'date' else value
+        task_list.append(task)
+
+    response = jsonify(task_list)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+SEARCH_MAX_LIMIT = 50
+
+@main.route('/api/search')
+@login_required
+def search_api():
+    """Full-text search over task descriptions and goals.
+
+    Query parameters:
+      q       -- the words to look for
+      type    -- 'task' (default) or 'goal'
+      limit   -- page size, at most SEARCH_MAX_LIMIT
+      offset  -- skip this many results; the next page's offset is returned
+
+    Results are ranked best first and carry an HTML snippet with the
+    matching words in <mark>.
+    """
+    return conditional_response(data_etag('search', request.query_string.decode()), search_response)
+
+def search_response():
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'No search query provided'}), 400
+    kind = request.args.get('type', 'task')
+    if kind not in SEARCH_TYPES:
+        return jsonify({'error': f"type must be one of: {', '.join(SEARCH_TYPES)}"}), 400
+    limit = max(1, min(request.args.get('limit', 20, type=int), SEARCH_MAX_LIMIT))
+    offset = max(0, request.args.get('offset', 0, type=int))
+
+    # One extra row tells whether there is a next page
+    results = search(query, current_user.id, kind, limit=limit + 1, offset=offset)
+    return jsonify({
+        'results': results[:limit],
+        'next_offset': offset + limit if len(results) > limit else None
+    })
+
+@main.route('/api/export')
+@login_required
+def export_api():
+    """Download the user's goals with their tasks as NDJSON (default) or CSV.
+
+    The rows are read through a server-side cursor and streamed in chunks,
+    so the response can be any size.
+    """
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+    filename = f"milestones-{datetime.now().date().isoformat()}.{fmt}"
+    return Response(
+        stream_with_context(export_goals(fmt, current_user.id)),
+        mimetype=EXPORT_MIMETYPES[fmt],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+@main.route('/api/import', methods=['POST'])
+@login_required
+def import_api():
+    """Import goals from an NDJSON or CSV request body, as written by /api/export.
+
+    The body is read line by line and inserted in batches, each committed
+    on its own. Invalid rows are skipped and reported, and the tasks of a
+    rejected goal are skipped.
+    """
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+    lines = io.TextIOWrapper(request.stream, encoding='utf-8', newline='')
+    try:
+        result = import_records(READERS[fmt](lines), user_id=current_user.id)
+    except UnicodeDecodeError:
+        return jsonify({'error': 'Body must be UTF-8 text'}), 400
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error importing goals: {str(e)}")
+        return jsonify({'error': 'Error importing goals'}), 500
+    return jsonify({
+        'goals': result.goals,
+        'tasks': result.tasks,
+        'rejected': result.error_count,
+        'skipped_tasks': result.skipped,
+        'errors': result.errors
+    })
+
+@main.route('/api/goals/<int:goal_id>/schedule_status')
+@login_required
+def schedule_status(goal_id):
+    """Progress of the background schedule generation for a goal"""
+    goal = owned_goal_or_404(goal_id)
+    job = goal.schedule_job
+    if job is None:
+        return jsonify({'goal_id': goal.id, 'status': 'none'})
+    return jsonify({
+        'goal_id': goal.id,
+        'status': job.status,
+        'attempts': job.attempts,
+        'max_attempts': job.max_attempts,
+        'error': job.last_error if job.status == 'failed' else None
+    })
+
+@main.route('/tasks/date/<date_string>')
+@login_required
 def tasks_by_date(date_string):
     """Show tasks for a specific date"""
     try:
         date_obj = datetime.strptime(date_string, '%Y-%m-%d').date()
-        tasks = Task.query.filter_by(date=date_obj).all()
-        
-        # Check if the date is today
-        is_today = date_obj == datetime.now().date()
-        
-        # Log for debugging
-        logger.debug(f"Date requested: {date_string}, is today: {is_today}")
-        logger.debug(f"Tasks found: {len(tasks)}")
-        
+    except ValueError:
+        flash('Invalid date format', 'error')
+        return redirect(url_for('main.dashboard'))
+
+    # Check if the date is today
+    is_today = date_obj == datetime.now().date()
+
+    def render():
+        # The goal titles come with the tasks instead of one query per task
+        tasks = (
+            Task.query.options(joinedload(Task.goal))
+            .filter_by(user_id=current_user.id, date=date_obj).order_by(Task.id).all()
+        )
+
+        # Lazy formatting: this is a hot path and debug logging is usually off
+        logger.debug("Date requested: %s, is today: %s, tasks found: %d", date_string, is_today, len(tasks))
+
         return render_template('day_tasks.html', 
                               tasks=tasks, 
                               date=date_obj,
                               is_today=is_today)
-    except ValueError:
-        flash('Invalid date format', 'error')
-        return redirect(url_for('dashboard'))
-
-with app.app_context():
-    db.create_all()
-    # Create default user if not exists
-    if not User.query.filter_by(id=1).first():
-        default_user = User(
-            id=1,
-            username="default",
-            email="default@example.com",
-            password_hash="default"
-        )
-        db.session.add(default_user)
-        db.session.commit()
 
-if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    return conditional_response(data_etag('day_tasks', date_string, is_today), render)
+
+goals_cli = AppGroup('goals', help='Bulk administration of goals.')
+
+@goals_cli.command('delete-archived')
+@click.option('--before', required=True, type=click.DateTime(formats=['%Y-%m-%d']),
+              help='Delete goals that ended before this date (YYYY-MM-DD).')
+@click.option('--user-id', type=int, help='Only delete goals of this user.')
+@click.option('--dry-run', is_flag=True, help='Only report how many goals would be deleted.')
+def delete_archived_goals_command(before, user_id, dry_run):
+    """Delete finished goals and their tasks in one statement"""
+    goal_ids = archived_goal_ids(before.date(), user_id)
+    if dry_run:
+        click.echo(f"{len(goal_ids)} goal(s) would be deleted")
+        return
+    deleted = delete_goals(goal_ids)
+    db.session.commit()
+    click.echo(f"Deleted {deleted} goal(s)")
+
+@goals_cli.command('import')
+@click.argument('path', type=click.File('r', encoding='utf-8'))
+@click.option('--format', 'fmt', type=click.Choice(['json', *EXPORT_FORMATS]),
+              help='Input format; by default taken from the file extension, else json.')
+@click.option('--batch-size', type=int, default=1000, show_default=True,
+              help='Rows inserted and committed at a time (ndjson and csv).')
+@click.option('--user-id', type=int, help='Assign every goal to this user (ndjson and csv).')
+def import_goals_command(path, fmt, batch_size, user_id):
+    """Import goals with their tasks from a JSON list, or stream them in
+    batches from an NDJSON or CSV export"""
+    if fmt is None:
+        extension = os.path.splitext(path.name)[1].lstrip('.').lower()
+        fmt = extension if extension in EXPORT_FORMATS else 'json'
+    if fmt == 'json':
+        goals, tasks = import_goals(json.load(path))
+        db.session.commit()
+        click.echo(f"Imported {goals} goal(s) with {tasks} task(s)")
+        return
+
+    result = import_records(READERS[fmt](path), batch_size=batch_size, user_id=user_id)
+    for error in result.errors:
+        click.echo(f"line {error['line']}: {error['error']}", err=True)
+    if result.error_count > len(result.errors):
+        click.echo(f"... and {result.error_count - len(result.errors)} more", err=True)
+    click.echo(
+        f"Imported {result.goals} goal(s) with {result.tasks} task(s), rejected {result.error_count} row(s), "
+        f"skipped {result.skipped} task(s) of rejected goals"
+    )
+
+@goals_cli.command('export')
+@click.argument('output', type=click.File('w', encoding='utf-8', lazy=True), default='-')
+@click.option('--format', 'fmt', type=click.Choice(EXPORT_FORMATS), default='ndjson', show_default=True)
+@click.option('--user-id', type=int, help='Only export goals of this user.')
+def export_goals_command(output, fmt, user_id):
+    """Write goals with their tasks to OUTPUT (default stdout) as NDJSON or CSV"""
+    for chunk in export_goals(fmt, user_id):
+        output.write(chunk)
+
+main.cli.add_command(goals_cli)
+
+users_cli = AppGroup('users', help='Administration of user accounts.')
+
+@users_cli.command('set-password')
+@click.argument('email')
+@click.password_option()
+def set_password_command(email, password):
+    """Set the password of an account, e.g. to sign in as the user that
+    owned all goals before accounts were introduced (default@example.com)"""
+    user = User.query.filter_by(email=email.strip().lower()).first()
+    if user is None:
+        raise click.ClickException(f"No user with email {email}")
+    user.set_password(password)
+    db.session.commit()
+    click.echo(f"Password updated for {user.username}")
+
+main.cli.add_command(users_cli)
+
+@main.cli.command('migrate')
+def migrate_command():
+    """Apply pending database schema migrations"""
+    version = run_migrations()
+    click.echo(f"Database schema is at version {version}")
+
+def sqlite_pragma_listener(config):
+    """Engine connect hook applying the app's SQLite settings to every new connection"""
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        if isinstance(dbapi_connection, sqlite3.Connection):
+            cursor = dbapi_connection.cursor()
+            cursor.execute(f"PRAGMA journal_mode={config['SQLITE_JOURNAL_MODE']}")
+            cursor.execute(f"PRAGMA synchronous={config['SQLITE_SYNCHRONOUS']}")
+            cursor.execute(f"PRAGMA busy_timeout={config['SQLITE_BUSY_TIMEOUT_MS']}")
+            # SQLite only enforces foreign keys, and so ON DELETE CASCADE, when asked to
+            cursor.execute("PRAGMA foreign_keys=ON")
+            cursor.close()
+    return set_sqlite_pragmas
+
+def init_database():
+    """Bring the schema up to date"""
+    return run_migrations()
+
+@main.cli.command('init-db')
+def init_db_command():
+    """Create or upgrade the schema; run once per deploy"""
+    version = init_database()
+    click.echo(f"Database schema is at version {version}")
+
+def create_app(config=None):
+    """Build the application from the environment, overridden by `config`.
+
+    Nothing here touches the database or the Gemini SDK: the schema is set
+    up by `flask --app app init-db`, the SDK is imported on the first model
+    call and the schedule workers are started by the web entry point
+    (main.py), so creating an app for a worker, a CLI command or a test is
+    cheap.
+    """
+    app = Flask(__name__)
+    # Signs the session cookie, the only proof of who a user is
+    app.secret_key = os.environ.get("SESSION_SECRET")
+
+    # Database configuration: DATABASE_URL selects the backend (Postgres in
+    # production, SQLite by default)
+    database_url = os.environ.get("DATABASE_URL", "sqlite:///goals.db")
+    if database_url.startswith("postgres://"):
+        # Scheme used by many hosting providers but no longer accepted by SQLAlchemy
+        database_url = "postgresql://" + database_url[len("postgres://"):]
+    app.config["SQLALCHEMY_DATABASE_URI"] = database_url
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    if not database_url.startswith("sqlite"):
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+            "pool_size": int(os.environ.get("DB_POOL_SIZE", 5)),
+            "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", 10)),
+            "pool_timeout": int(os.environ.get("DB_POOL_TIMEOUT", 30)),
+            # Drop connections the server or a proxy closed while idle
+            "pool_pre_ping": True,
+            "pool_recycle": int(os.environ.get("DB_POOL_RECYCLE", 300))
+        }
+
+    # WAL lets readers run alongside a writer and busy_timeout makes concurrent
+    # writers wait for the lock instead of failing with "database is locked"
+    app.config["SQLITE_JOURNAL_MODE"] = os.environ.get("SQLITE_JOURNAL_MODE", "WAL")
+    app.config["SQLITE_SYNCHRONOUS"] = os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL")
+    app.config["SQLITE_BUSY_TIMEOUT_MS"] = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", 5000))
+
+    # Requests slower than this are logged with their query and LLM time; 0 disables
+    app.config["SLOW_REQUEST_MS"] = int(os.environ.get("SLOW_REQUEST_MS", 1000))
+
+    # /metrics requires `Authorization: Bearer <METRICS_TOKEN>`. Without a
+    # token it is served to local clients only; set one when a reverse proxy
+    # on the same host forwards outside requests.
+    app.config["METRICS_TOKEN"] = os.environ.get("METRICS_TOKEN")
+
+    # Background schedule generation: 'database' (worker threads polling the
+    # schedule_job table) or 'inline' (generate within the request)
+    app.config["SCHEDULE_QUEUE"] = os.environ.get("SCHEDULE_QUEUE", "database")
+    app.config["SCHEDULE_WORKERS"] = int(os.environ.get("SCHEDULE_WORKERS", 2))
+    app.config["SCHEDULE_JOB_MAX_ATTEMPTS"] = int(os.environ.get("SCHEDULE_JOB_MAX_ATTEMPTS", 3))
+
+    # Curriculum templates used for offline schedules. With
+    # SCHEDULE_TEMPLATES_FIRST, goals whose title clearly names one of their
+    # subjects are scheduled from the template without calling Gemini.
+    app.config["CURRICULA_PATH"] = os.environ.get(
+        "CURRICULA_PATH", os.path.join(app.root_path, "data", "curricula.json"))
+    app.config["SCHEDULE_TEMPLATES_FIRST"] = os.environ.get("SCHEDULE_TEMPLATES_FIRST", "1") == "1"
+
+    # Gemini AI configuration; the model is built once per process on first use
+    app.config["GEMINI_MODEL"] = os.environ.get("GEMINI_MODEL", "gemini-1.5-pro")
+    app.config["GEMINI_API_KEY"] = os.environ.get("GEMINI_API_KEY")
+
+    # Cache for schedule and validation responses: 'memory', 'sqlite' or 'none'
+    app.config["LLM_CACHE_BACKEND"] = os.environ.get("LLM_CACHE_BACKEND", "memory")
+    app.config["LLM_CACHE_PATH"] = os.environ.get("LLM_CACHE_PATH", os.path.join(app.instance_path, "llm_cache.db"))
+    app.config["LLM_CACHE_TTL"] = int(os.environ.get("LLM_CACHE_TTL", 7 * 24 * 3600))
+    app.config["LLM_CACHE_MAX_ENTRIES"] = int(os.environ.get("LLM_CACHE_MAX_ENTRIES", 1000))
+
+    # Limits for every Gemini call: per-call timeout, calls in flight and
+    # started per minute, retries, and the circuit breaker that makes callers
+    # fall back immediately after repeated failures
+    app.config["LLM_TIMEOUT"] = float(os.environ.get("LLM_TIMEOUT", 30))
+    app.config["LLM_MAX_CONCURRENCY"] = int(os.environ.get("LLM_MAX_CONCURRENCY", 4))
+    app.config["LLM_QUEUE_TIMEOUT"] = float(os.environ.get("LLM_QUEUE_TIMEOUT", 10))
+    app.config["LLM_RATE_PER_MINUTE"] = int(os.environ.get("LLM_RATE_PER_MINUTE", 60))
+    app.config["LLM_BURST"] = int(os.environ.get("LLM_BURST", 10))
+    app.config["LLM_MAX_RETRIES"] = int(os.environ.get("LLM_MAX_RETRIES", 2))
+    app.config["LLM_BREAKER_THRESHOLD"] = int(os.environ.get("LLM_BREAKER_THRESHOLD", 5))
+    app.config["LLM_BREAKER_RESET"] = float(os.environ.get("LLM_BREAKER_RESET", 30))
+
+    # Rendered per-goal task tables, keyed on the owner's data version. Change
+    # ETAG_SALT on deploys that alter templates so browsers drop cached pages.
+    app.config["FRAGMENT_CACHE_MAX_ENTRIES"] = int(os.environ.get("FRAGMENT_CACHE_MAX_ENTRIES", 500))
+    app.config["ETAG_SALT"] = os.environ.get("ETAG_SALT", "")
+
+    app.config.update(config or {})
+
+    if not app.secret_key:
+        if not (app.debug or app.testing):
+            raise RuntimeError("SESSION_SECRET must be set: it signs the session cookies that identify users")
+        # Sessions then last only as long as the process
+        logger.warning("SESSION_SECRET is not set; using a random key for this process")
+        app.secret_key = secrets.token_hex(32)
+
+    db.init_app(app)
+    login_manager.init_app(app)
+    if app.config["SQLALCHEMY_DATABASE_URI"].startswith("sqlite"):
+        with app.app_context():
+            event.listen(db.engine, 'connect', sqlite_pragma_listener(app.config))
+
+    configure_gemini(api_key=app.config["GEMINI_API_KEY"], model_name=app.config["GEMINI_MODEL"])
+    configure_curriculum(path=app.config["CURRICULA_PATH"], prefer=app.config["SCHEDULE_TEMPLATES_FIRST"])
+    configure_llm_cache(
+        backend=app.config["LLM_CACHE_BACKEND"],
+        path=app.config["LLM_CACHE_PATH"],
+        ttl=app.config["LLM_CACHE_TTL"],
+        max_entries=app.config["LLM_CACHE_MAX_ENTRIES"]
+    )
+    configure_llm_gateway(
+        timeout=app.config["LLM_TIMEOUT"],
+        max_concurrency=app.config["LLM_MAX_CONCURRENCY"],
+        queue_timeout=app.config["LLM_QUEUE_TIMEOUT"],
+        rate_per_minute=app.config["LLM_RATE_PER_MINUTE"],
+        burst=app.config["LLM_BURST"],
+        max_retries=app.config["LLM_MAX_RETRIES"],
+        failure_threshold=app.config["LLM_BREAKER_THRESHOLD"],
+        reset_timeout=app.config["LLM_BREAKER_RESET"]
+    )
+
+    app.extensions['fragment_cache'] = MemoryCache(
+        ttl=24 * 3600, max_entries=app.config["FRAGMENT_CACHE_MAX_ENTRIES"]
+    )
+    app.extensions['schedule_queue'] = create_job_queue(app)
+    init_request_metrics(app)
+    app.register_blueprint(main)
+    return app
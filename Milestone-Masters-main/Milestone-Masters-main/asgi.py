@@ -0,0 +1,329 @@
+"""ASGI entry point for serving the app with an event loop.
+
+    flask --app app init-db && uvicorn asgi:app --host 0.0.0.0 --port 5000
+
+Chat and concept validation (single and batched) spend nearly all of
+their time waiting on Gemini. Here those endpoints are coroutines that
+await the async Gemini calls, so a request waiting on the model does not
+hold a thread and one process can keep many of them open. Their short database work runs in the
+default thread pool. Every other route is the regular Flask app, called
+in that thread pool by wsgi_app() with a WSGI environ built from the ASGI
+scope; goal creation stays there because the schedule is already
+generated by the background workers.
+
+The routes, responses and limits are the same as under gunicorn (main.py),
+which remains the default way to run the app. The coroutines read the
+signed-in user from the same session cookie as the Flask views and only
+touch that user's tasks.
+"""
+import asyncio
+import io
+import json
+import logging
+import sys
+import tempfile
+import time
+from flask_login import current_user
+from werkzeug.exceptions import HTTPException
+from app import (
+    complete_task, create_app, finish_validation_batch, parse_validation_items, sse_event, task_descriptions
+)
+from models import Task
+from utils.gemini import (
+    chat_with_gemini_async, stream_chat_with_gemini_async, validate_learning_async,
+    validate_learning_batch_async
+)
+from utils.metrics import http_request_duration, http_requests, metrics_route
+
+logger = logging.getLogger(__name__)
+
+flask_app = create_app()
+url_adapter = flask_app.url_map.bind('localhost')
+
+# Request bodies larger than this are spooled to a temporary file
+MAX_BODY_IN_MEMORY = 64 * 1024
+
+async def read_body(receive):
+    """The whole request body, as a file positioned at its start"""
+    body = tempfile.SpooledTemporaryFile(max_size=MAX_BODY_IN_MEMORY)
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        body.write(message.get('body', b''))
+        if not message.get('more_body'):
+            break
+    body.seek(0)
+    return body
+
+def wsgi_environ(scope, body):
+    """The WSGI environ of an ASGI HTTP request"""
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    client_host, client_port = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server_name,
+        'SERVER_PORT': str(server_port or 80),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client_host,
+        'REMOTE_PORT': str(client_port),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False
+    }
+    for name, value in scope['headers']:
+        name, value = name.decode('latin-1'), value.decode('latin-1')
+        if name in ('content-type', 'content-length'):
+            key = name.upper().replace('-', '_')
+        else:
+            key = 'HTTP_' + name.upper().replace('-', '_')
+        if key in environ:
+            # Repeated headers are folded into one, as a WSGI server does
+            value = environ[key] + ('; ' if key == 'HTTP_COOKIE' else ',') + value
+        environ[key] = value
+    return environ
+
+async def wsgi_app(scope, receive, send):
+    """Serve the request with the Flask app in a worker thread.
+
+    The response is sent from the event loop chunk by chunk as the app
+    produces it, so streamed responses (exports) are not buffered.
+    """
+    body = await read_body(receive)
+    loop = asyncio.get_running_loop()
+
+    def send_message(message):
+        asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+    def call():
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and response.get('sent'):
+                raise exc_info[1].with_traceback(exc_info[2])
+            response['start'] = {
+                'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+            }
+
+        def send_start():
+            if not response.get('sent'):
+                send_message(response['start'])
+                response['sent'] = True
+
+        chunks = flask_app(wsgi_environ(scope, body), start_response)
+        try:
+            for chunk in chunks:
+                if chunk:
+                    send_start()
+                    send_message({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        finally:
+            if hasattr(chunks, 'close'):
+                chunks.close()
+        send_start()
+        send_message({'type': 'http.response.body', 'body': b''})
+
+    try:
+        await asyncio.to_thread(call)
+    finally:
+        body.close()
+
+class AsyncRequest:
+    def __init__(self, scope, receive, endpoint, view_args):
+        self.scope = scope
+        self.receive = receive
+        self.endpoint = endpoint
+        self.view_args = view_args
+        self.status = None
+        self.user_id = None
+
+    async def json(self):
+        """The request body parsed as JSON, or None if it is not valid JSON"""
+        with await read_body(self.receive) as body:
+            try:
+                return json.loads(body.read())
+            except ValueError:
+                return None
+
+    def run_sync(self, func, *args):
+        """Run database work in a worker thread, inside the app's request
+        context for this request (with its cookies, so current_user is the
+        caller) so its queries count towards the endpoint's metrics"""
+        def call():
+            with flask_app.request_context(wsgi_environ(self.scope, io.BytesIO())):
+                return func(*args)
+        return asyncio.to_thread(call)
+
+async def send_json(request, send, data, status=200):
+    body = json.dumps(data).encode()
+    request.status = status
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+async def process_chat(request, send):
+    data = await request.json()
+    message = data.get('message') if isinstance(data, dict) else None
+    if not message:
+        return await send_json(request, send, {'error': 'No message provided'}, 400)
+
+    result = await chat_with_gemini_async(message)
+
+    if result['success']:
+        await send_json(request, send, {'response': result['response']})
+    else:
+        await send_json(request, send, {'error': result['error'] or 'Failed to process message'}, 500)
+
+async def wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+async def stream_chat(request, send):
+    """Stream the chat reply as Server-Sent Events while it is generated"""
+    data = await request.json()
+    message = data.get('message') if isinstance(data, dict) else None
+    if not message:
+        return await send_json(request, send, {'error': 'No message provided'}, 400)
+
+    request.status = 200
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [
+            (b'content-type', b'text/event-stream; charset=utf-8'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no')
+        ]
+    })
+
+    disconnected = asyncio.ensure_future(wait_for_disconnect(request.receive))
+    chunks = stream_chat_with_gemini_async(message)
+    try:
+        async for text in chunks:
+            if disconnected.done():
+                # Stop reading; closing the generator cancels the upstream generation
+                break
+            await send({'type': 'http.response.body', 'body': sse_event('chunk', {'text': text}).encode(), 'more_body': True})
+        else:
+            await send({'type': 'http.response.body', 'body': sse_event('done', {}).encode(), 'more_body': True})
+    except Exception as e:
+        logger.error(f"Error in chat stream: {str(e)}")
+        await send({'type': 'http.response.body', 'body': sse_event('error', {'error': str(e)}).encode(), 'more_body': True})
+    finally:
+        await chunks.aclose()
+        disconnected.cancel()
+    await send({'type': 'http.response.body', 'body': b''})
+
+def signed_in_user_id():
+    return current_user.id if current_user.is_authenticated else None
+
+def load_user_task(task_id, user_id):
+    return Task.query.filter_by(id=task_id, user_id=user_id).first()
+
+def load_task_description(task_id, user_id):
+    task = load_user_task(task_id, user_id)
+    return task.description if task is not None else None
+
+def complete_task_by_id(task_id, user_id):
+    task = load_user_task(task_id, user_id)
+    return task is not None and complete_task(task)
+
+async def validate_concept(request, send):
+    task_id = request.view_args['task_id']
+    description = await request.run_sync(load_task_description, task_id, request.user_id)
+    if description is None:
+        return await send_json(request, send, {'error': 'Task not found'}, 404)
+
+    data = await request.json()
+    user_response = data.get('response') if isinstance(data, dict) else None
+    if not user_response:
+        return await send_json(request, send, {'error': 'No response provided'}, 400)
+
+    is_valid, feedback = await validate_learning_async(description, user_response)
+
+    if is_valid and not await request.run_sync(complete_task_by_id, task_id, request.user_id):
+        return await send_json(request, send, {'error': 'Error saving completion status'}, 500)
+
+    await send_json(request, send, {'success': is_valid, 'feedback': feedback})
+
+async def validate_concepts(request, send):
+    pairs, error = parse_validation_items(await request.json())
+    if error:
+        return await send_json(request, send, {'error': error}, 400)
+
+    descriptions = await request.run_sync(task_descriptions, [task_id for task_id, _ in pairs], request.user_id)
+    found = [(task_id, response) for task_id, response in pairs if task_id in descriptions]
+    verdicts = await validate_learning_batch_async(
+        [(descriptions[task_id], response) for task_id, response in found]
+    )
+
+    body, status = await request.run_sync(
+        finish_validation_batch, pairs, dict(zip([task_id for task_id, _ in found], verdicts)), request.user_id
+    )
+    await send_json(request, send, body, status)
+
+# Flask endpoints served by a coroutine instead of the WSGI view
+ASYNC_VIEWS = {
+    'main.process_chat': process_chat,
+    'main.stream_chat': stream_chat,
+    'main.validate_concept': validate_concept,
+    'main.validate_concepts': validate_concepts
+}
+
+def match_async_view(scope):
+    """(url rule, view args) of the request's Flask route, or (None, None)"""
+    try:
+        return url_adapter.match(scope['path'], method=scope['method'], return_rule=True)
+    except HTTPException:
+        return None, None
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            # Schedule workers run in the web processes, as with main.py
+            flask_app.extensions['schedule_queue'].start()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+
+    rule, view_args = match_async_view(scope) if scope['type'] == 'http' else (None, None)
+    endpoint = rule.endpoint if rule is not None else None
+    if endpoint not in ASYNC_VIEWS:
+        return await wsgi_app(scope, receive, send)
+
+    request = AsyncRequest(scope, receive, endpoint, view_args)
+    started = time.perf_counter()
+    # Gemini calls made by the coroutine are labelled with its route
+    route = metrics_route.set(rule.rule)
+    try:
+        # Every coroutine view requires a signed-in user, as its Flask view does
+        request.user_id = await request.run_sync(signed_in_user_id)
+        if request.user_id is None:
+            await send_json(request, send, {'error': 'Authentication required'}, 401)
+            return
+        await ASYNC_VIEWS[endpoint](request, send)
+    except Exception as e:
+        logger.error(f"Error in {endpoint}: {str(e)}")
+        if request.status is None:
+            await send_json(request, send, {'error': 'Internal server error'}, 500)
+    finally:
+        http_requests.inc(endpoint, scope['method'], str(request.status or 500))
+        http_request_duration.observe(time.perf_counter() - started, endpoint)
+        metrics_route.reset(route)
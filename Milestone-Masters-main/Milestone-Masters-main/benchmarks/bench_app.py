@@ -0,0 +1,217 @@
+"""Latency, throughput and query-count benchmark for the main routes.
+
+Drives the app through the Flask test client, signed in as the first
+seeded user, against a scratch SQLite database seeded with synthetic
+data, with Gemini replaced by the offline stand-in from
+benchmarks/fake_gemini.py. Each scenario runs sequentially
+and then with --concurrency client threads; the results are printed (or
+written with --output) as JSON:
+
+    python -m benchmarks.bench_app --requests 200 --concurrency 8 --latency 0.05
+
+Run it from the application directory.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+class QueryCounter:
+    """Counts SQL statements executed by the current thread"""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self._local = threading.local()
+        event.listen(engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args):
+        self._local.count = getattr(self._local, "count", 0) + 1
+
+    def reset(self):
+        self._local.count = 0
+
+    @property
+    def count(self):
+        return getattr(self._local, "count", 0)
+
+def build_scenarios(make_client, task_ids, today):
+    counter = itertools.count()
+    etags = {}
+    month_start = today.replace(day=1)
+    month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+
+    def new_goal():
+        n = next(counter)
+        return ("POST", "/goal/new", {"data": {
+            "title": f"Benchmark goal {n}",
+            "description": f"Goal number {n} created by the benchmark",
+            "start_date": today.isoformat(),
+            "end_date": (today + timedelta(days=13)).isoformat()
+        }})
+
+    def validate_concept():
+        n = next(counter)
+        task_id = task_ids[n % len(task_ids)]
+        # A unique answer per request keeps the LLM cache out of the measurement
+        return ("POST", f"/validate_concept/{task_id}", {"json": {"response": f"I learned concept {n}"}})
+
+    def chat_send():
+        return ("POST", "/chat/send", {"json": {"message": f"Explain closures ({next(counter)})"}})
+
+    def revalidate(url):
+        # A browser repeating a view it has cached: expects 304 Not Modified
+        def make_request():
+            if url not in etags:
+                etags[url] = make_client().get(url).headers.get("ETag", "")
+            return ("GET", url, {"headers": {"If-None-Match": etags[url]}})
+        return make_request
+
+    return {
+        "dashboard": lambda: ("GET", "/", {}),
+        "dashboard_revalidate": revalidate("/"),
+        "api_tasks": lambda: ("GET", "/api/tasks", {}),
+        "api_tasks_revalidate": revalidate("/api/tasks"),
+        "api_tasks_month_summary": lambda: (
+            "GET", f"/api/tasks?summary=day&start={month_start}&end={month_end}", {}),
+        "tasks_by_date": lambda: ("GET", f"/tasks/date/{today.isoformat()}", {}),
+        "new_goal": new_goal,
+        "validate_concept": validate_concept,
+        "chat_send": chat_send,
+    }
+
+def run_scenario(make_client, queries, make_request, requests, concurrency):
+    latencies = []
+    query_counts = []
+    errors = 0
+    lock = threading.Lock()
+    local = threading.local()
+
+    def one(_):
+        nonlocal errors
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = make_client()
+        method, url, kwargs = make_request()
+        queries.reset()
+        started = time.perf_counter()
+        response = client.open(url, method=method, **kwargs)
+        response.get_data()
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed * 1000)
+            query_counts.append(queries.count)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests)))
+    wall = time.perf_counter() - started
+
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "throughput_rps": round(requests / wall, 2),
+        "latency_ms": {
+            "mean": round(statistics.mean(latencies), 3),
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "p99": round(percentile(latencies, 99), 3),
+            "max": round(max(latencies), 3)
+        },
+        "queries_per_request": {
+            "mean": round(statistics.mean(query_counts), 2),
+            "max": max(query_counts)
+        }
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the app's routes offline")
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--goals-per-user", type=int, default=4)
+    parser.add_argument("--days-per-goal", type=int, default=30)
+    parser.add_argument("--requests", type=int, default=100, help="requests per scenario and mode")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.05, help="fake Gemini latency in seconds")
+    parser.add_argument("--token-rate", type=float, default=None, help="fake Gemini tokens per second")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--scenarios", help="comma separated subset of scenarios to run")
+    parser.add_argument("--output", help="write the JSON results to this file")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="milestone-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ.setdefault("GEMINI_API_KEY", "fake")
+    os.environ.setdefault("SESSION_SECRET", "bench")
+    os.environ.setdefault("LLM_CACHE_BACKEND", "none")
+    # Measure the app, not the production rate limit on Gemini calls
+    os.environ.setdefault("LLM_RATE_PER_MINUTE", "1000000")
+    os.environ.setdefault("LLM_BURST", "1000")
+    sys.path.insert(0, os.getcwd())
+
+    from app import create_app, init_database
+    from extensions import db
+    from benchmarks.fake_gemini import install_fake_gemini
+    from benchmarks.seed import seed_database, signed_in_client
+    from models import Goal, Task
+
+    app = create_app({"WTF_CSRF_ENABLED": False})
+    install_fake_gemini(latency=args.latency, token_rate=args.token_rate, failure_rate=args.failure_rate)
+
+    today = date.today()
+    with app.app_context():
+        init_database()
+        goal_ids = seed_database(args.users, args.goals_per_user, args.days_per_goal)
+        user_id = db.session.get(Goal, goal_ids[0]).user_id
+        task_ids = [
+            task_id for (task_id,) in db.session.query(Task.id).filter(Task.user_id == user_id, Task.date == today)
+        ]
+        queries = QueryCounter(db.engine)
+        task_count = db.session.query(Task).count()
+    app.extensions["schedule_queue"].start()
+
+    def make_client():
+        return signed_in_client(app, user_id)
+
+    scenarios = build_scenarios(make_client, task_ids or [1], today)
+    if args.scenarios:
+        scenarios = {name: scenarios[name] for name in args.scenarios.split(",")}
+
+    results = {
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "python": platform.python_version(),
+        "config": {**vars(args), "tasks": task_count},
+        "scenarios": {}
+    }
+    for name, make_request in scenarios.items():
+        results["scenarios"][name] = {
+            "sequential": run_scenario(make_client, queries, make_request, args.requests, 1),
+            "concurrent": run_scenario(make_client, queries, make_request, args.requests, args.concurrency)
+        }
+        print(f"{name}: done", file=sys.stderr)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
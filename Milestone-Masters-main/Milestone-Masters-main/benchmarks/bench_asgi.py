@@ -0,0 +1,183 @@
+"""How many concurrent LLM-bound requests one server process holds open.
+
+Starts the app once under gunicorn (one worker with --threads threads,
+the sync serving mode) and once under uvicorn (asgi.py, one process), with
+Gemini replaced by the offline stand-in answering after --latency seconds.
+Each level in --concurrency sends that many /chat/send and
+/validate_concept requests at once and reports throughput, latency and
+how many requests were waiting on the model at once on average. All
+requests are made by one seeded user, signed in through /login:
+
+    python -m benchmarks.bench_asgi --latency 1 --concurrency 8,64,256 --threads 8
+
+Run it from the application directory; gunicorn, uvicorn and httpx must be
+installed.
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SERVERS = {
+    "wsgi": lambda port, args: [
+        sys.executable, "-m", "gunicorn", "--bind", f"127.0.0.1:{port}", "--workers", "1",
+        "--threads", str(args.threads), "--timeout", "300", "benchmarks.bench_asgi:wsgi_factory()"
+    ],
+    "asgi": lambda port, args: [
+        sys.executable, "-m", "uvicorn", "--factory", "benchmarks.bench_asgi:asgi_factory",
+        "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"
+    ],
+}
+
+def install_fake():
+    from benchmarks.fake_gemini import install_fake_gemini
+    install_fake_gemini(latency=float(os.environ["FAKE_GEMINI_LATENCY"]))
+
+def wsgi_factory():
+    from app import create_app
+    app = create_app()
+    install_fake()
+    return app
+
+def asgi_factory():
+    import asgi
+    install_fake()
+    return asgi.app
+
+def percentile(ordered, pct):
+    return round(ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))], 1)
+
+def sign_in(base_url, email, password):
+    """Session cookies of the user, signed in through the login form"""
+    import httpx
+    with httpx.Client(base_url=base_url) as client:
+        page = client.get("/login").text
+        csrf_token = re.search(r'name="csrf_token" type="hidden" value="([^"]+)"', page).group(1)
+        response = client.post("/login", data={"csrf_token": csrf_token, "email": email, "password": password})
+        if response.status_code != 302:
+            raise RuntimeError(f"Could not sign in as {email}")
+        return dict(client.cookies)
+
+async def run_level(base_url, concurrency, latency, task_ids, cookies, counter):
+    import httpx
+
+    async def one(client, n):
+        if n % 2:
+            url, body = "/chat/send", {"message": f"Explain closures ({n})"}
+        else:
+            # A unique answer per request keeps the LLM cache out of the measurement
+            url, body = f"/validate_concept/{task_ids[n % len(task_ids)]}", {"response": f"I learned concept {n}"}
+        started = time.perf_counter()
+        try:
+            response = await client.post(url, json=body)
+            ok = response.status_code == 200
+        except httpx.HTTPError:
+            ok = False
+        return (time.perf_counter() - started) * 1000, ok
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=300, cookies=cookies) as client:
+        started = time.perf_counter()
+        results = await asyncio.gather(*(one(client, next(counter)) for _ in range(concurrency)))
+        wall = time.perf_counter() - started
+
+    latencies = sorted(elapsed for elapsed, _ in results)
+    return {
+        "requests": concurrency,
+        "errors": sum(1 for _, ok in results if not ok),
+        "wall_s": round(wall, 2),
+        "throughput_rps": round(concurrency / wall, 1),
+        # Requests open at the client (waiting or being served), averaged
+        # over the run, and how many of them were waiting on Gemini at once
+        "avg_open": round(sum(latencies) / 1000 / wall, 1),
+        "avg_waiting_on_llm": round(concurrency / wall * latency, 1),
+        "latency_ms": {
+            "mean": round(statistics.mean(latencies), 1),
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "max": round(latencies[-1], 1)
+        }
+    }
+
+def wait_until_ready(base_url, process, timeout=30):
+    import httpx
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with status {process.returncode}")
+        try:
+            if httpx.get(f"{base_url}/help").status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("Server did not start")
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare sync and async serving of the LLM-bound routes")
+    parser.add_argument("--latency", type=float, default=1.0, help="fake Gemini latency in seconds")
+    parser.add_argument("--concurrency", default="8,64,256", help="comma separated request counts")
+    parser.add_argument("--threads", type=int, default=8, help="gunicorn threads for the sync server")
+    parser.add_argument("--servers", default="wsgi,asgi")
+    parser.add_argument("--port", type=int, default=5099)
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.getcwd())
+    workdir = tempfile.mkdtemp(prefix="milestone-asgibench-")
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        GEMINI_API_KEY="fake",
+        SESSION_SECRET="bench",
+        FAKE_GEMINI_LATENCY=str(args.latency),
+        LLM_CACHE_BACKEND="none",
+        LOG_LEVEL="WARNING",
+        # Leave the Gemini limits out of the way: the server is what is measured
+        LLM_MAX_CONCURRENCY="10000",
+        LLM_QUEUE_TIMEOUT="300",
+        LLM_RATE_PER_MINUTE="1000000",
+        LLM_BURST="10000",
+    )
+    os.environ.update(env)
+
+    from app import create_app, init_database
+    from extensions import db
+    from benchmarks.seed import SEED_PASSWORD, seed_database
+    from models import Goal, Task
+
+    app = create_app()
+    with app.app_context():
+        init_database()
+        goal_ids = seed_database(users=2, goals_per_user=4, days_per_goal=30)
+        user = db.session.get(Goal, goal_ids[0]).user
+        email = user.email
+        task_ids = [task_id for (task_id,) in db.session.query(Task.id).filter(Task.user_id == user.id)]
+
+    levels = [int(level) for level in args.concurrency.split(",")]
+    results = {}
+    for name in args.servers.split(","):
+        base_url = f"http://127.0.0.1:{args.port}"
+        process = subprocess.Popen(SERVERS[name](args.port, args), env=env, cwd=os.getcwd())
+        try:
+            wait_until_ready(base_url, process)
+            cookies = sign_in(base_url, email, SEED_PASSWORD)
+            counter = iter(range(10 ** 9))
+            results[name] = {
+                str(level): asyncio.run(run_level(base_url, level, args.latency, task_ids, cookies, counter))
+                for level in levels
+            }
+        finally:
+            process.terminate()
+            process.wait()
+        print(f"{name}: done", file=sys.stderr)
+
+    print(json.dumps({"config": vars(args), "servers": results}, indent=2))
+
+if __name__ == "__main__":
+    main()
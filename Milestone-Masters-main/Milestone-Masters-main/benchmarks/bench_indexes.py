@@ -0,0 +1,148 @@
+"""Query plans and timings for the hot Task/Goal queries, with and without indexes.
+
+Seeds a scratch SQLite database (1M tasks by default), runs the queries the
+app issues on its hot paths, then applies the indexes from migration 2 and
+runs them again:
+
+    python benchmarks/bench_indexes.py --tasks 1000000 [--json]
+
+The schema mirrors models.py; the database is created in a temporary
+directory and never touches instance/goals.db.
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+
+SCHEMA = """
+CREATE TABLE user (id INTEGER PRIMARY KEY, username VARCHAR(64) NOT NULL UNIQUE,
+                   email VARCHAR(120) NOT NULL UNIQUE, password_hash VARCHAR(256));
+CREATE TABLE goal (id INTEGER PRIMARY KEY, title VARCHAR(100) NOT NULL, description TEXT,
+                   start_date DATE NOT NULL, end_date DATE NOT NULL, created_at DATETIME,
+                   user_id INTEGER NOT NULL REFERENCES user (id));
+CREATE TABLE task (id INTEGER PRIMARY KEY, date DATE NOT NULL, description TEXT NOT NULL,
+                   completed BOOLEAN, goal_id INTEGER NOT NULL REFERENCES goal (id));
+"""
+
+# Same definitions as the __table_args__ in models.py
+INDEXES = """
+CREATE INDEX ix_goal_user_id ON goal (user_id);
+CREATE INDEX ix_task_date ON task (date);
+CREATE INDEX ix_task_goal_id_date ON task (goal_id, date);
+CREATE INDEX ix_task_completed_date ON task (completed, date);
+"""
+
+GOAL_DAYS = 90
+USERS = 100
+FIRST_DAY = date(2022, 1, 1)
+
+def seed(conn, task_count):
+    rng = random.Random(42)
+    goal_count = max(1, task_count // GOAL_DAYS)
+    conn.executemany(
+        "INSERT INTO user (id, username, email) VALUES (?, ?, ?)",
+        [(i, f"user{i}", f"user{i}@example.com") for i in range(1, USERS + 1)]
+    )
+    goals = []
+    for goal_id in range(1, goal_count + 1):
+        start = FIRST_DAY + timedelta(days=rng.randrange(1000))
+        goals.append((goal_id, f"Goal {goal_id}", "Seeded goal", start.isoformat(),
+                      (start + timedelta(days=GOAL_DAYS - 1)).isoformat(), rng.randint(1, USERS)))
+    conn.executemany(
+        "INSERT INTO goal (id, title, description, start_date, end_date, user_id) "
+        "VALUES (?, ?, ?, ?, ?, ?)", goals
+    )
+
+    def tasks():
+        task_id = 0
+        for goal_id, _, _, start, _, _ in goals:
+            start = date.fromisoformat(start)
+            for day in range(GOAL_DAYS):
+                task_id += 1
+                if task_id > task_count:
+                    return
+                yield (task_id, (start + timedelta(days=day)).isoformat(),
+                       f"Day {day + 1}: seeded task", rng.random() < 0.4, goal_id)
+
+    conn.executemany(
+        "INSERT INTO task (id, date, description, completed, goal_id) VALUES (?, ?, ?, ?, ?)",
+        tasks()
+    )
+    conn.commit()
+    return goal_count
+
+def queries(goal_count):
+    day = (FIRST_DAY + timedelta(days=500)).isoformat()
+    month_end = (FIRST_DAY + timedelta(days=530)).isoformat()
+    goal_ids = ",".join(str(i) for i in range(1, min(goal_count, 20) + 1))
+    return {
+        "tasks_by_date": ("SELECT * FROM task WHERE date = ?", (day,)),
+        "streak_dates": (
+            "SELECT DISTINCT task.date FROM task JOIN goal ON goal.id = task.goal_id "
+            "WHERE goal.user_id = ? AND task.completed = 1 ORDER BY task.date DESC", (7,)),
+        "user_stats_counts": (
+            "SELECT count(task.id), count(CASE WHEN task.completed = 1 THEN 1 END) "
+            "FROM task JOIN goal ON goal.id = task.goal_id WHERE goal.user_id = ?", (7,)),
+        "global_completed_by_date": (
+            "SELECT date FROM task WHERE completed = 1 ORDER BY date DESC LIMIT 100", ()),
+        "delete_goal_tasks": ("SELECT count(*) FROM task WHERE goal_id = ?", (goal_count // 2 or 1,)),
+        "dashboard_selectin": (
+            f"SELECT * FROM task WHERE goal_id IN ({goal_ids}) ORDER BY goal_id, date", ()),
+        "calendar_month_summary": (
+            "SELECT date, count(id), count(CASE WHEN completed = 1 THEN 1 END) FROM task "
+            "WHERE date >= ? AND date <= ? GROUP BY date", (day, month_end)),
+    }
+
+def measure(conn, sql, params, repeat):
+    plan = [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        conn.execute(sql, params).fetchall()
+        timings.append((time.perf_counter() - started) * 1000)
+    return {"plan": plan, "median_ms": round(statistics.median(timings), 3)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, "bench.db"))
+        conn.executescript(SCHEMA)
+        started = time.perf_counter()
+        goal_count = seed(conn, args.tasks)
+        seed_seconds = time.perf_counter() - started
+
+        results = {"tasks": args.tasks, "goals": goal_count, "seed_seconds": round(seed_seconds, 2)}
+        for phase in ("without_indexes", "with_indexes"):
+            if phase == "with_indexes":
+                conn.executescript(INDEXES)
+                conn.execute("ANALYZE")
+            results[phase] = {
+                name: measure(conn, sql, params, args.repeat)
+                for name, (sql, params) in queries(goal_count).items()
+            }
+        conn.close()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"Seeded {results['tasks']} tasks in {results['goals']} goals ({results['seed_seconds']}s)")
+    for name in results["without_indexes"]:
+        before = results["without_indexes"][name]
+        after = results["with_indexes"][name]
+        print(f"\n{name}: {before['median_ms']} ms -> {after['median_ms']} ms")
+        print(f"  before: {' / '.join(before['plan'])}")
+        print(f"  after:  {' / '.join(after['plan'])}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Latency of /api/search on a large task history.
+
+Seeds a scratch SQLite database through the app (so the search index is
+filled by its triggers) with varied task descriptions drawn from a
+Zipf-distributed vocabulary, then times one user's searches for common,
+mid-frequency and rare words and multi-word queries:
+
+    python -m benchmarks.bench_search --tasks 300000
+
+Run it from the application directory.
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+VOCABULARY_SIZE = 20000
+WORDS_PER_TASK = 25
+
+def make_vocabulary(rng):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = set()
+    while len(words) < VOCABULARY_SIZE:
+        words.add("".join(rng.choice(letters) for _ in range(rng.randint(4, 10))))
+    return sorted(words)
+
+def main():
+    parser = argparse.ArgumentParser(description="Time full-text searches over many tasks")
+    parser.add_argument("--tasks", type=int, default=300000)
+    parser.add_argument("--repeat", type=int, default=20, help="searches per query kind")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="milestone-searchbench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ.setdefault("GEMINI_API_KEY", "fake")
+    os.environ.setdefault("SESSION_SECRET", "bench")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    sys.path.insert(0, os.getcwd())
+
+    from app import create_app, init_database
+    from extensions import db
+    from benchmarks.seed import seed_database, signed_in_client
+    from models import Goal, Task
+
+    rng = random.Random(7)
+    vocabulary = make_vocabulary(rng)
+    # Zipf weights: the n-th most common word occurs about 1/n as often as the first
+    weights = list(itertools.accumulate(1 / rank for rank in range(1, VOCABULARY_SIZE + 1)))
+
+    app = create_app()
+    started = time.perf_counter()
+    with app.app_context():
+        init_database()
+        days_per_goal = 100
+        goal_ids = seed_database(
+            users=10, goals_per_user=max(1, args.tasks // (10 * days_per_goal)), days_per_goal=days_per_goal,
+            describe_task=lambda day: " ".join(rng.choices(vocabulary, cum_weights=weights, k=WORDS_PER_TASK))
+        )
+        task_count = db.session.query(Task).count()
+        user_id = db.session.get(Goal, goal_ids[0]).user_id
+        user_task_count = db.session.query(Task).filter(Task.user_id == user_id).count()
+    seed_seconds = time.perf_counter() - started
+
+    queries = {
+        "common_word": lambda: rng.choice(vocabulary[:10]),
+        "mid_word": lambda: rng.choice(vocabulary[100:500]),
+        "rare_word": lambda: rng.choice(vocabulary[5000:]),
+        "two_words": lambda: f"{rng.choice(vocabulary[:200])} {rng.choice(vocabulary[:200])}",
+        "three_words": lambda: " ".join(rng.sample(vocabulary[:100], 3)),
+    }
+
+    client = signed_in_client(app, user_id)
+    results = {}
+    for name, make_query in queries.items():
+        latencies = []
+        hits = []
+        # Untimed first search, so the timings reflect a warm page cache
+        client.get("/api/search", query_string={"q": make_query()})
+        for _ in range(args.repeat):
+            query = make_query()
+            started = time.perf_counter()
+            response = client.get("/api/search", query_string={"q": query, "limit": 20})
+            latencies.append((time.perf_counter() - started) * 1000)
+            hits.append(len(response.get_json()["results"]))
+        latencies.sort()
+        results[name] = {
+            "p50_ms": round(statistics.median(latencies), 2),
+            "p95_ms": round(latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))], 2),
+            "mean_results": round(statistics.mean(hits), 1)
+        }
+
+    print(json.dumps({
+        "tasks": task_count,
+        "user_tasks": user_task_count,
+        "seed_seconds": round(seed_seconds, 1),
+        "queries": results
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Cold start cost of a web worker.
+
+Each run is a fresh interpreter, like a gunicorn worker being spawned,
+that imports the entry point and serves its first request:
+
+    python -m benchmarks.bench_startup --runs 10
+
+Reported per phase: importing main (module imports plus create_app) and
+the first request to /help, which involves no database or Gemini work.
+The database is set up once beforehand, as `flask init-db` does on deploy.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+CHILD = """
+import json, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+response = main.app.test_client().get('/help')
+assert response.status_code == 200, response.status_code
+served = time.perf_counter()
+import sys
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'first_request_ms': (served - imported) * 1000,
+    'total_ms': (served - started) * 1000,
+    'genai_imported': 'google.generativeai' in sys.modules
+}))
+"""
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure worker cold start")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="milestone-startup-")
+    env = dict(os.environ,
+               DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+               GEMINI_API_KEY=os.environ.get("GEMINI_API_KEY", "fake"),
+               SESSION_SECRET=os.environ.get("SESSION_SECRET", "bench"),
+               SCHEDULE_WORKERS="0", LOG_LEVEL="WARNING", PYTHONWARNINGS="ignore")
+    subprocess.run([sys.executable, "-m", "flask", "--app", "app", "init-db"],
+                   env=env, check=True, capture_output=True)
+
+    samples = []
+    for _ in range(args.runs):
+        completed = subprocess.run([sys.executable, "-c", CHILD], env=env,
+                                   capture_output=True, text=True, check=True)
+        samples.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    print(json.dumps({
+        "runs": args.runs,
+        "genai_imported_at_startup": any(s["genai_imported"] for s in samples),
+        **{
+            phase: {
+                "median": round(statistics.median(s[phase] for s in samples), 1),
+                "min": round(min(s[phase] for s in samples), 1),
+                "max": round(max(s[phase] for s in samples), 1)
+            }
+            for phase in ("import_ms", "first_request_ms", "total_ms")
+        }
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
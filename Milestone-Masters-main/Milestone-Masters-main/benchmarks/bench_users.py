@@ -0,0 +1,97 @@
+"""Latency of one user's pages as the number of other users grows.
+
+Seeds a scratch SQLite database in steps, each adding users with the same
+amount of data, and after every step times the read paths of the first
+user: the dashboard, /api/tasks (full list and month summary), the tasks
+of one day and a search. With every query scoped through the
+(user_id, date) indexes the timings should stay flat as the total grows:
+
+    python -m benchmarks.bench_users --users 1,100,1000 --goals-per-user 4 --days-per-goal 90
+
+Run it from the application directory.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+def main():
+    parser = argparse.ArgumentParser(description="Time one user's reads while other users' data grows")
+    parser.add_argument("--users", default="1,100,1000", help="comma separated total user counts")
+    parser.add_argument("--goals-per-user", type=int, default=4)
+    parser.add_argument("--days-per-goal", type=int, default=90)
+    parser.add_argument("--repeat", type=int, default=50, help="requests per route and step")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="milestone-usersbench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ.setdefault("GEMINI_API_KEY", "fake")
+    os.environ.setdefault("SESSION_SECRET", "bench")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    sys.path.insert(0, os.getcwd())
+
+    from app import create_app, init_database
+    from extensions import db
+    from benchmarks.seed import seed_database, signed_in_client
+    from models import Goal, Task
+
+    app = create_app()
+    today = date.today()
+    month_start = today.replace(day=1)
+    month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    routes = {
+        # The fragment cache is keyed on the data version, so after the
+        # first request this is the stats read, the goal query and rendering
+        "dashboard": "/",
+        "api_tasks": "/api/tasks",
+        "api_tasks_month_summary": f"/api/tasks?summary=day&start={month_start}&end={month_end}",
+        "tasks_by_date": f"/tasks/date/{today.isoformat()}",
+        "search": "/api/search?q=concept",
+    }
+
+    user_id = None
+    seeded = 0
+    steps = {}
+    for total in (int(count) for count in args.users.split(",")):
+        started = time.perf_counter()
+        with app.app_context():
+            init_database()
+            goal_ids = seed_database(
+                users=total - seeded, goals_per_user=args.goals_per_user, days_per_goal=args.days_per_goal,
+                seed=seeded
+            )
+            if user_id is None:
+                user_id = db.session.get(Goal, goal_ids[0]).user_id
+            task_count = db.session.query(Task).count()
+        seeded = total
+        seed_seconds = time.perf_counter() - started
+
+        client = signed_in_client(app, user_id)
+        timings = {}
+        for name, url in routes.items():
+            # Untimed first request, so the timings reflect warm caches
+            client.get(url)
+            latencies = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                response = client.get(url)
+                response.get_data()
+                latencies.append((time.perf_counter() - started) * 1000)
+                if response.status_code != 200:
+                    raise RuntimeError(f"{url} returned {response.status_code}")
+            latencies.sort()
+            timings[name] = {
+                "p50_ms": round(statistics.median(latencies), 2),
+                "p95_ms": round(latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))], 2)
+            }
+        steps[str(total)] = {"tasks": task_count, "seed_seconds": round(seed_seconds, 1), "routes": timings}
+        print(f"{total} users: done", file=sys.stderr)
+
+    print(json.dumps({"config": vars(args), "steps": steps}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""Offline stand-in for google.generativeai.GenerativeModel.
+
+Answers the app's schedule, outline, validation and chat prompts with
+well-formed text after a simulated delay of `latency` seconds plus
+`tokens / token_rate`. With probability `failure_rate` a call raises
+FakeGeminiError instead, to exercise the error paths. generate_content_async()
+behaves the same but waits with asyncio.sleep().
+
+    from benchmarks.fake_gemini import install_fake_gemini
+    install_fake_gemini(latency=0.2, token_rate=200, failure_rate=0.01)
+"""
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+from datetime import date, timedelta
+from types import SimpleNamespace
+from utils.gemini import configure_gemini
+
+class FakeGeminiError(Exception):
+    pass
+
+def count_tokens(text):
+    # Roughly what the real tokenizer produces for English prose
+    return max(1, int(len(text.split()) * 1.3))
+
+class FakeResponse:
+    def __init__(self, chunks, prompt_tokens, delay_per_chunk=0.0):
+        self._chunks = chunks
+        self._delay_per_chunk = delay_per_chunk
+        self.text = "".join(chunks)
+        self.parts = [SimpleNamespace(text=self.text)]
+        self.usage_metadata = SimpleNamespace(
+            prompt_token_count=prompt_tokens,
+            candidates_token_count=count_tokens(self.text),
+            total_token_count=prompt_tokens + count_tokens(self.text)
+        )
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            if self._delay_per_chunk:
+                time.sleep(self._delay_per_chunk)
+            yield SimpleNamespace(text=chunk, parts=[SimpleNamespace(text=chunk)])
+
+    async def __aiter__(self):
+        for chunk in self._chunks:
+            if self._delay_per_chunk:
+                await asyncio.sleep(self._delay_per_chunk)
+            yield SimpleNamespace(text=chunk, parts=[SimpleNamespace(text=chunk)])
+
+class FakeGenerativeModel:
+    def __init__(self, model_name="fake-gemini", latency=0.0, token_rate=None,
+                 failure_rate=0.0, seed=None):
+        self.model_name = f"models/{model_name}"
+        self.latency = latency
+        self.token_rate = token_rate
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def _start_call(self, kwargs):
+        """Count the call; returns (fails, timeout that will be exceeded or None)"""
+        with self._lock:
+            self.calls += 1
+            failed = self._random.random() < self.failure_rate
+        # Honour the per-call timeout the way the SDK's transport does
+        timeout = (kwargs.get('request_options') or {}).get('timeout')
+        if timeout is not None and self.latency > timeout:
+            return failed, timeout
+        return failed, None
+
+    def _build_response(self, prompt, stream, kwargs):
+        """The response and how long generating it takes before it is returned"""
+        json_mode = (kwargs.get('generation_config') or {}).get('response_mime_type') == 'application/json'
+        text = self.respond(prompt, json_mode)
+        # Split into words so streaming delivers many small chunks
+        chunks = re.findall(r'\S+\s*|\s+', text) or [text]
+        generation_time = count_tokens(text) / self.token_rate if self.token_rate else 0.0
+        if stream:
+            return FakeResponse(chunks, count_tokens(prompt), generation_time / len(chunks)), 0.0
+        return FakeResponse(chunks, count_tokens(prompt)), generation_time
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        failed, deadline = self._start_call(kwargs)
+        if deadline is not None:
+            time.sleep(deadline)
+            raise FakeGeminiError("Deadline exceeded")
+        time.sleep(self.latency)
+        if failed:
+            raise FakeGeminiError("Injected failure")
+        response, generation_time = self._build_response(prompt, stream, kwargs)
+        time.sleep(generation_time)
+        return response
+
+    async def generate_content_async(self, prompt, stream=False, **kwargs):
+        failed, deadline = self._start_call(kwargs)
+        if deadline is not None:
+            await asyncio.sleep(deadline)
+            raise FakeGeminiError("Deadline exceeded")
+        await asyncio.sleep(self.latency)
+        if failed:
+            raise FakeGeminiError("Injected failure")
+        response, generation_time = self._build_response(prompt, stream, kwargs)
+        await asyncio.sleep(generation_time)
+        return response
+
+    def respond(self, prompt, json_mode=False):
+        if "Outline a" in prompt:
+            parts = int(re.search(r'Outline a (\d+)-part', prompt).group(1))
+            return "\n".join(f"PART {i + 1}: Fake theme {i + 1}" for i in range(parts))
+
+        dates = re.search(r'Start Date: (\d{4}-\d{2}-\d{2})\s+End Date: (\d{4}-\d{2}-\d{2})', prompt)
+        if dates:
+            start = date.fromisoformat(dates.group(1))
+            end = date.fromisoformat(dates.group(2))
+            first_day = re.search(r'starting from Day (\d+)', prompt)
+            day = int(first_day.group(1)) if first_day else 1
+            entries = []
+            while start <= end:
+                entries.append({
+                    "date": start.isoformat(),
+                    "day": day,
+                    "topic": f"Fake topic {day}",
+                    "objective": f"Understand fake topic {day}",
+                    "concept": f"Core concept {day}",
+                    "practice": f"Write a short program exercising concept {day}"
+                })
+                start += timedelta(days=1)
+                day += 1
+            if json_mode:
+                return json.dumps(entries, indent=1)
+            return "\n".join(
+                f"DATE: {e['date']} | TASK: Day {e['day']}: {e['topic']} - Objective: {e['objective']} - "
+                f"Task: {e['concept']} - Practice: {e['practice']}"
+                for e in entries
+            )
+
+        if "Validate each of these learning responses" in prompt:
+            count = len(re.findall(r'^\s*Response \d+:', prompt, re.MULTILINE))
+            return json.dumps([
+                {"index": number, "valid": True,
+                 "feedback": "Clear explanation that covers the key concept and the practice task."}
+                for number in range(1, count + 1)
+            ])
+
+        if "Validate the learning response" in prompt:
+            return "VALID: Yes\nFEEDBACK: Clear explanation that covers the key concept and the practice task."
+
+        return ("That is a great question. Start with the core idea, try a small example, "
+                "then explain it back in your own words to check your understanding.")
+
+def install_fake_gemini(**options):
+    """Route every utils.gemini call through a FakeGenerativeModel"""
+    models = {}
+
+    def factory(model_name):
+        models[model_name] = FakeGenerativeModel(model_name, **options)
+        return models[model_name]
+
+    configure_gemini(api_key="fake", model_factory=factory)
+    return models
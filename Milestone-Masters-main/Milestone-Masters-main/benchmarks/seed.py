@@ -0,0 +1,107 @@
+"""Seed the app database with synthetic users, goals and tasks.
+
+    DATABASE_URL=sqlite:////tmp/bench.db python -m benchmarks.seed --users 10 --goals-per-user 5
+
+Runs against whatever database the app is configured with, so point
+DATABASE_URL somewhere disposable.
+"""
+import argparse
+import os
+import random
+from datetime import date, timedelta
+
+# Every seeded user signs in with this password
+SEED_PASSWORD = "bench"
+
+def default_task_description(day):
+    return (
+        f"Day {day}: Benchmark topic {day}\n"
+        f"Objective: Learn benchmark concept {day}\n"
+        f"Practice: Write a program using concept {day}"
+    )
+
+def seed_database(users=10, goals_per_user=5, days_per_goal=30, completed_ratio=0.5,
+                  first_day=None, seed=42, describe_task=default_task_description):
+    """Insert the synthetic data and return the ids of the created goals.
+
+    describe_task(day number) supplies each task's description.
+    """
+    from sqlalchemy import insert
+    from werkzeug.security import generate_password_hash
+    from extensions import db
+    from models import Goal, Task, User
+    from utils.stats import rebuild_user_stats
+
+    rng = random.Random(seed)
+    first_day = first_day or date.today() - timedelta(days=days_per_goal // 2)
+    next_user_id = (db.session.query(db.func.max(User.id)).scalar() or 0) + 1
+    # Hashing is deliberately slow, so all users share one hash
+    password_hash = generate_password_hash(SEED_PASSWORD)
+
+    goal_ids = []
+    user_ids = []
+    for user_id in range(next_user_id, next_user_id + users):
+        db.session.add(User(
+            id=user_id,
+            username=f"bench{user_id}",
+            email=f"bench{user_id}@example.com",
+            password_hash=password_hash
+        ))
+        user_ids.append(user_id)
+        for g in range(goals_per_user):
+            start = first_day + timedelta(days=rng.randrange(7))
+            goal = Goal(
+                title=f"Benchmark goal {user_id}-{g}",
+                description="Synthetic goal created by the benchmark seeder",
+                start_date=start,
+                end_date=start + timedelta(days=days_per_goal - 1),
+                user_id=user_id
+            )
+            db.session.add(goal)
+            db.session.flush()
+            goal_ids.append(goal.id)
+            db.session.execute(insert(Task), [
+                {
+                    'date': start + timedelta(days=day),
+                    'description': describe_task(day + 1),
+                    'completed': start + timedelta(days=day) < date.today() and rng.random() < completed_ratio,
+                    'goal_id': goal.id,
+                    'user_id': user_id
+                }
+                for day in range(days_per_goal)
+            ])
+    db.session.commit()
+
+    for user_id in user_ids:
+        rebuild_user_stats(user_id)
+    db.session.commit()
+    return goal_ids
+
+def signed_in_client(app, user_id):
+    """A test client whose session is signed in as the user, as after /login"""
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["_user_id"] = str(user_id)
+        session["_fresh"] = True
+    return client
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed the app database with synthetic data")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--goals-per-user", type=int, default=5)
+    parser.add_argument("--days-per-goal", type=int, default=30)
+    parser.add_argument("--completed-ratio", type=float, default=0.5)
+    args = parser.parse_args()
+
+    if "DATABASE_URL" not in os.environ:
+        parser.error("set DATABASE_URL to the database to seed")
+
+    from app import create_app, init_database
+    app = create_app()
+    with app.app_context():
+        init_database()
+        goal_ids = seed_database(args.users, args.goals_per_user, args.days_per_goal, args.completed_ratio)
+    print(f"Created {args.users} users and {len(goal_ids)} goals")
+
+if __name__ == "__main__":
+    main()
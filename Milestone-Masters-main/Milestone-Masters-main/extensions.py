@@ -0,0 +1,13 @@
+from flask_login import LoginManager
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.orm import DeclarativeBase
+
+class Base(DeclarativeBase):
+    pass
+
+# Bound to an application in create_app(); importing this module is cheap
+# and has no side effects
+db = SQLAlchemy(model_class=Base)
+
+login_manager = LoginManager()
+login_manager.login_view = 'main.login'
@@ -1,9 +1,29 @@
 from flask_wtf import FlaskForm
-from wtforms import StringField, TextAreaField, DateField
-from wtforms.validators import DataRequired, Length
+from wtforms import BooleanField, PasswordField, StringField, TextAreaField, DateField
+from wtforms.validators import DataRequired, Email, EqualTo, Length, ValidationError
+from models import User
 
 class GoalForm(FlaskForm):
     title = StringField('Title', validators=[DataRequired(), Length(max=100)])
     description = TextAreaField('Description', validators=[DataRequired()])
     start_date = DateField('Start Date', validators=[DataRequired()])
-    end_date = DateField('End Date', validators=[DataRequired()])
\ No newline at end of file
+    end_date = DateField('End Date', validators=[DataRequired()])
+
+class LoginForm(FlaskForm):
+    email = StringField('Email', validators=[DataRequired(), Email()])
+    password = PasswordField('Password', validators=[DataRequired()])
+    remember = BooleanField('Remember me')
+
+class RegistrationForm(FlaskForm):
+    username = StringField('Username', validators=[DataRequired(), Length(min=3, max=64)])
+    email = StringField('Email', validators=[DataRequired(), Email(), Length(max=120)])
+    password = PasswordField('Password', validators=[DataRequired(), Length(min=8)])
+    confirm_password = PasswordField('Confirm Password', validators=[DataRequired(), EqualTo('password')])
+
+    def validate_username(self, field):
+        if User.query.filter_by(username=field.data).first() is not None:
+            raise ValidationError('That username is taken.')
+
+    def validate_email(self, field):
+        if User.query.filter_by(email=field.data.lower()).first() is not None:
+            raise ValidationError('An account with that email already exists.')
@@ -1,4 +1,13 @@
-from app import app
+from app import create_app, init_database
+
+app = create_app()
+# Schedule workers run in the web processes; CLI commands create their own
+# app through create_app() and leave them off
+app.extensions['schedule_queue'].start()
 
 if __name__ == "__main__":
+    # Deployments run `flask --app app init-db` once before starting the
+    # workers; the development server sets the database up itself
+    with app.app_context():
+        init_database()
     app.run(host="0.0.0.0", port=5000, debug=True)
@@ -0,0 +1,248 @@
+"""Versioned schema migrations.
+
+Each migration is a function registered with @migration(version) that
+receives an open connection. Applied versions are recorded in the
+schema_version table, and run_migrations() applies the pending ones in
+order, each in its own transaction.
+
+Migration 1 creates any missing table from the current models, so a fresh
+database already has the latest schema when later migrations run. Every
+later migration must therefore be idempotent (checkfirst, IF NOT EXISTS,
+inspecting existing columns) rather than assume the old schema.
+"""
+import logging
+from datetime import datetime
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, inspect, select, text
+from extensions import db
+
+logger = logging.getLogger(__name__)
+
+schema_version = Table(
+    'schema_version', MetaData(),
+    Column('version', Integer, primary_key=True),
+    Column('description', String(200), nullable=False),
+    Column('applied_at', DateTime, nullable=False, default=datetime.utcnow)
+)
+
+MIGRATIONS = {}
+
+def migration(version, description):
+    def register(apply):
+        if version in MIGRATIONS:
+            raise ValueError(f"Duplicate migration version {version}")
+        MIGRATIONS[version] = (description, apply)
+        return apply
+    return register
+
+def current_version(connection):
+    return connection.execute(select(func.max(schema_version.c.version))).scalar() or 0
+
+def run_migrations(engine=None):
+    """Apply all pending migrations and return the resulting version"""
+    engine = engine or db.engine
+    schema_version.create(engine, checkfirst=True)
+
+    with engine.connect() as connection:
+        version = current_version(connection)
+
+    for target in sorted(v for v in MIGRATIONS if v > version):
+        description, apply = MIGRATIONS[target]
+        with engine.begin() as connection:
+            # Another worker may have applied it while we were waiting
+            if current_version(connection) >= target:
+                continue
+            logger.info(f"Applying migration {target}: {description}")
+            apply(connection)
+            connection.execute(schema_version.insert().values(
+                version=target, description=description, applied_at=datetime.utcnow()
+            ))
+        version = target
+
+    return version
+
+def _create_named_indexes(connection, table, *names):
+    """Create only the listed indexes of the model: the model may declare
+    later ones on columns that a later migration adds"""
+    indexes = {index.name: index for index in table.indexes}
+    for name in names:
+        indexes[name].create(connection, checkfirst=True)
+
+@migration(1, "Initial schema")
+def initial_schema(connection):
+    db.metadata.create_all(connection)
+
+@migration(2, "Indexes on task date, goal and completion and on goal owner")
+def task_goal_indexes(connection):
+    from models import Goal, Task
+    _create_named_indexes(connection, Goal.__table__, 'ix_goal_user_id')
+    _create_named_indexes(connection, Task.__table__, 'ix_task_date', 'ix_task_goal_id_date', 'ix_task_completed_date')
+
+@migration(3, "Background schedule generation jobs")
+def schedule_jobs(connection):
+    from models import ScheduleJob
+    ScheduleJob.__table__.create(connection, checkfirst=True)
+
+def _ensure_goal_cascade(connection, table):
+    """Make the table's foreign key to goal ON DELETE CASCADE"""
+    foreign_keys = [
+        fk for fk in inspect(connection).get_foreign_keys(table.name)
+        if fk['referred_table'] == 'goal'
+    ]
+    if all((fk.get('options') or {}).get('ondelete', '').upper() == 'CASCADE' for fk in foreign_keys):
+        return
+
+    if connection.dialect.name != 'sqlite':
+        for fk in foreign_keys:
+            connection.execute(text(f'ALTER TABLE {table.name} DROP CONSTRAINT {fk["name"]}'))
+            connection.execute(text(
+                f'ALTER TABLE {table.name} ADD CONSTRAINT {fk["name"]} '
+                f'FOREIGN KEY ({", ".join(fk["constrained_columns"])}) REFERENCES goal (id) ON DELETE CASCADE'
+            ))
+        return
+
+    # SQLite cannot alter constraints: create a copy of the table from the
+    # model, move the rows over and swap it in
+    from models import Goal, User
+    metadata = MetaData()
+    User.__table__.to_metadata(metadata)
+    Goal.__table__.to_metadata(metadata)
+    rebuilt = table.to_metadata(metadata, name=f'{table.name}_rebuilt')
+    rebuilt.indexes.clear()
+    rebuilt.create(connection)
+
+    old_columns = {column['name'] for column in inspect(connection).get_columns(table.name)}
+    old_indexes = {index['name'] for index in inspect(connection).get_indexes(table.name)}
+    columns = ', '.join(c.name for c in table.columns if c.name in old_columns)
+    connection.execute(text(f'INSERT INTO {rebuilt.name} ({columns}) SELECT {columns} FROM {table.name}'))
+    connection.execute(text(f'DROP TABLE {table.name}'))
+    connection.execute(text(f'ALTER TABLE {rebuilt.name} RENAME TO {table.name}'))
+    # Restore the indexes the table had; later ones are left to their migrations
+    _create_named_indexes(connection, table, *(index.name for index in table.indexes if index.name in old_indexes))
+
+@migration(4, "Cascade goal deletes to tasks and schedule jobs in the database")
+def goal_delete_cascade(connection):
+    from models import ScheduleJob, Task
+    _ensure_goal_cascade(connection, Task.__table__)
+    _ensure_goal_cascade(connection, ScheduleJob.__table__)
+
+@migration(5, "Per-user data version for HTTP caching")
+def user_data_version(connection):
+    from models import UserStats
+    if not inspect(connection).has_table(UserStats.__tablename__):
+        UserStats.__table__.create(connection)
+        return
+    columns = {column['name'] for column in inspect(connection).get_columns(UserStats.__tablename__)}
+    if 'data_version' not in columns:
+        connection.execute(text(
+            f'ALTER TABLE {UserStats.__tablename__} ADD COLUMN data_version INTEGER NOT NULL DEFAULT 0'
+        ))
+
+# Full-text search (utils/search.py). SQLite keeps an FTS5 index per table
+# in step with triggers; Postgres uses generated tsvector columns with GIN
+# indexes, which it maintains itself.
+SQLITE_SEARCH_SCHEMA = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS task_fts USING fts5("
+    "description, content='task', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS task_fts_insert AFTER INSERT ON task BEGIN "
+    "INSERT INTO task_fts (rowid, description) VALUES (new.id, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS task_fts_delete AFTER DELETE ON task BEGIN "
+    "INSERT INTO task_fts (task_fts, rowid, description) VALUES ('delete', old.id, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS task_fts_update AFTER UPDATE OF description ON task BEGIN "
+    "INSERT INTO task_fts (task_fts, rowid, description) VALUES ('delete', old.id, old.description); "
+    "INSERT INTO task_fts (rowid, description) VALUES (new.id, new.description); END",
+    "INSERT INTO task_fts (task_fts) VALUES ('rebuild')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS goal_fts USING fts5("
+    "title, description, content='goal', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS goal_fts_insert AFTER INSERT ON goal BEGIN "
+    "INSERT INTO goal_fts (rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS goal_fts_delete AFTER DELETE ON goal BEGIN "
+    "INSERT INTO goal_fts (goal_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS goal_fts_update AFTER UPDATE OF title, description ON goal BEGIN "
+    "INSERT INTO goal_fts (goal_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO goal_fts (rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "INSERT INTO goal_fts (goal_fts) VALUES ('rebuild')",
+]
+
+POSTGRES_SEARCH_SCHEMA = [
+    "ALTER TABLE task ADD COLUMN IF NOT EXISTS search_vector tsvector "
+    "GENERATED ALWAYS AS (to_tsvector('english', description)) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_task_search_vector ON task USING GIN (search_vector)",
+    "ALTER TABLE goal ADD COLUMN IF NOT EXISTS search_vector tsvector "
+    "GENERATED ALWAYS AS (setweight(to_tsvector('english', title), 'A') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B')) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_goal_search_vector ON goal USING GIN (search_vector)",
+]
+
+@migration(6, "Full-text search over tasks and goals")
+def full_text_search(connection):
+    if connection.dialect.name == 'sqlite':
+        statements = SQLITE_SEARCH_SCHEMA
+    elif connection.dialect.name == 'postgresql':
+        statements = POSTGRES_SEARCH_SCHEMA
+    else:
+        logger.warning(f"Full-text search is not available on {connection.dialect.name}")
+        return
+    for statement in statements:
+        connection.execute(text(statement))
+
+# Migration 7 adds the owner to the SQLite search indexes as an indexed
+# column, so a search reads only the postings of the user's own rows. It
+# is indexed as "u<id>" because FTS5 keeps one list per token across
+# columns: a bare id would share its list with every number in the text.
+SQLITE_OWNER_SEARCH_SCHEMA = [
+    "DROP TRIGGER IF EXISTS task_fts_insert",
+    "DROP TRIGGER IF EXISTS task_fts_delete",
+    "DROP TRIGGER IF EXISTS task_fts_update",
+    "DROP TABLE IF EXISTS task_fts",
+    "CREATE VIRTUAL TABLE task_fts USING fts5("
+    "description, user_id, content='task', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER task_fts_insert AFTER INSERT ON task BEGIN "
+    "INSERT INTO task_fts (rowid, description, user_id) VALUES (new.id, new.description, 'u' || new.user_id); END",
+    "CREATE TRIGGER task_fts_delete AFTER DELETE ON task BEGIN "
+    "INSERT INTO task_fts (task_fts, rowid, description, user_id) "
+    "VALUES ('delete', old.id, old.description, 'u' || old.user_id); END",
+    "CREATE TRIGGER task_fts_update AFTER UPDATE OF description, user_id ON task BEGIN "
+    "INSERT INTO task_fts (task_fts, rowid, description, user_id) "
+    "VALUES ('delete', old.id, old.description, 'u' || old.user_id); "
+    "INSERT INTO task_fts (rowid, description, user_id) VALUES (new.id, new.description, 'u' || new.user_id); END",
+    # Not 'rebuild', which would index the bare ids of the content table
+    "INSERT INTO task_fts (rowid, description, user_id) SELECT id, description, 'u' || user_id FROM task",
+    "DROP TRIGGER IF EXISTS goal_fts_insert",
+    "DROP TRIGGER IF EXISTS goal_fts_delete",
+    "DROP TRIGGER IF EXISTS goal_fts_update",
+    "DROP TABLE IF EXISTS goal_fts",
+    "CREATE VIRTUAL TABLE goal_fts USING fts5("
+    "title, description, user_id, content='goal', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER goal_fts_insert AFTER INSERT ON goal BEGIN "
+    "INSERT INTO goal_fts (rowid, title, description, user_id) "
+    "VALUES (new.id, new.title, new.description, 'u' || new.user_id); END",
+    "CREATE TRIGGER goal_fts_delete AFTER DELETE ON goal BEGIN "
+    "INSERT INTO goal_fts (goal_fts, rowid, title, description, user_id) "
+    "VALUES ('delete', old.id, old.title, old.description, 'u' || old.user_id); END",
+    "CREATE TRIGGER goal_fts_update AFTER UPDATE OF title, description, user_id ON goal BEGIN "
+    "INSERT INTO goal_fts (goal_fts, rowid, title, description, user_id) "
+    "VALUES ('delete', old.id, old.title, old.description, 'u' || old.user_id); "
+    "INSERT INTO goal_fts (rowid, title, description, user_id) "
+    "VALUES (new.id, new.title, new.description, 'u' || new.user_id); END",
+    "INSERT INTO goal_fts (rowid, title, description, user_id) "
+    "SELECT id, title, description, 'u' || user_id FROM goal",
+]
+
+@migration(7, "Owner of each task, for per-user queries without joining goal")
+def task_owner(connection):
+    from models import Task
+    columns = {column['name'] for column in inspect(connection).get_columns(Task.__tablename__)}
+    if 'user_id' not in columns:
+        user_table = connection.dialect.identifier_preparer.quote('user')
+        connection.execute(text(f'ALTER TABLE task ADD COLUMN user_id INTEGER REFERENCES {user_table} (id)'))
+    connection.execute(text(
+        'UPDATE task SET user_id = (SELECT goal.user_id FROM goal WHERE goal.id = task.goal_id) '
+        'WHERE user_id IS NULL'
+    ))
+    _create_named_indexes(connection, Task.__table__, 'ix_task_user_id_date')
+    # Postgres filters on user_id next to the GIN index instead
+    if connection.dialect.name == 'sqlite':
+        for statement in SQLITE_OWNER_SEARCH_SCHEMA:
+            connection.execute(text(statement))
@@ -1,5 +1,6 @@
-from app import db
+from extensions import db
 from flask_login import UserMixin
+from werkzeug.security import check_password_hash, generate_password_hash
 from datetime import datetime
 
 class User(UserMixin, db.Model):
@@ -9,7 +10,18 @@ class User(UserMixin, db.Model):
     password_hash = db.Column(db.String(256))
     goals = db.relationship('Goal', backref='user', lazy=True)
 
+    def set_password(self, password):
+        self.password_hash = generate_password_hash(password)
+
+    def check_password(self, password):
+        # Accounts created before sign-in existed have no password hash
+        return bool(self.password_hash) and check_password_hash(self.password_hash, password)
+
 class Goal(db.Model):
+    __table_args__ = (
+        db.Index('ix_goal_user_id', 'user_id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text)
@@ -17,11 +29,53 @@ class Goal(db.Model):
     end_date = db.Column(db.Date, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    tasks = db.relationship('Task', backref='goal', lazy=True)
+    # Children are removed by ON DELETE CASCADE in the database, so deleting
+    # a goal never loads its tasks
+    tasks = db.relationship('Task', backref='goal', lazy=True, order_by='Task.date',
+                            cascade='all, delete-orphan', passive_deletes=True)
+    schedule_job = db.relationship('ScheduleJob', backref='goal', lazy=True, uselist=False,
+                                   cascade='all, delete-orphan', passive_deletes=True)
 
 class Task(db.Model):
+    __table_args__ = (
+        db.Index('ix_task_date', 'date'),
+        db.Index('ix_task_goal_id_date', 'goal_id', 'date'),
+        db.Index('ix_task_completed_date', 'completed', 'date'),
+        db.Index('ix_task_user_id_date', 'user_id', 'date'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     date = db.Column(db.Date, nullable=False)
     description = db.Column(db.Text, nullable=False)
     completed = db.Column(db.Boolean, default=False)
-    goal_id = db.Column(db.Integer, db.ForeignKey('goal.id'), nullable=False)
+    goal_id = db.Column(db.Integer, db.ForeignKey('goal.id', ondelete='CASCADE'), nullable=False)
+    # Owner of the goal, copied here so per-user queries need no join. Always
+    # set by the app; nullable only because SQLite cannot add a NOT NULL
+    # column to an existing table (migration 7)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+
+class UserStats(db.Model):
+    """Materialized dashboard statistics, kept up to date as tasks change"""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    total_tasks = db.Column(db.Integer, nullable=False, default=0)
+    completed_tasks = db.Column(db.Integer, nullable=False, default=0)
+    current_streak = db.Column(db.Integer, nullable=False, default=0)
+    last_active_date = db.Column(db.Date)
+    # Bumped on every write to the user's goals or tasks; drives ETags and
+    # the rendered-fragment cache
+    data_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class ScheduleJob(db.Model):
+    """Background generation of a goal's task schedule"""
+    id = db.Column(db.Integer, primary_key=True)
+    goal_id = db.Column(db.Integer, db.ForeignKey('goal.id', ondelete='CASCADE'), nullable=False, unique=True)
+    # pending -> running -> succeeded, or back to pending until max_attempts, then failed
+    status = db.Column(db.String(16), nullable=False, default='pending', index=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    last_error = db.Column(db.Text)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -7,63 +7,66 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 });
 
-async function fetchTasks() {
+// Per-day task counts, cached by month so navigating back is free
+const monthSummaryCache = {};
+
+function formatDate(year, month, day) {
+    return `${year}-${String(month + 1).padStart(2, '0')}-${String(day).padStart(2, '0')}`;
+}
+
+async function fetchMonthSummary(year, month) {
+    const key = `${year}-${month}`;
+    if (monthSummaryCache[key]) {
+        return monthSummaryCache[key];
+    }
+    const start = formatDate(year, month, 1);
+    const end = formatDate(year, month, new Date(year, month + 1, 0).getDate());
     try {
-        const response = await fetch('/api/tasks');
+        const response = await fetch(`/api/tasks?summary=day&start=${start}&end=${end}`);
         if (!response.ok) {
             throw new Error('Failed to fetch tasks');
         }
-        return await response.json();
+        monthSummaryCache[key] = await response.json();
+        return monthSummaryCache[key];
     } catch (error) {
         console.error('Error fetching tasks:', error);
-        return [];
+        return {};
     }
 }
 
 async function initializeCalendar(container) {
     // Get the current date
     const today = new Date();
-    const currentMonth = today.getMonth();
-    const currentYear = today.getFullYear();
+    let currentMonth = today.getMonth();
+    let currentYear = today.getFullYear();
 
-    // Get all tasks from API
-    const tasks = await fetchTasks();
+    async function showMonth(year, month) {
+        const summary = await fetchMonthSummary(year, month);
+        renderCalendar(container, year, month, summary);
 
-    // Render calendar
-    renderCalendar(container, currentYear, currentMonth, tasks);
+        // The navigation buttons are recreated on every render
+        document.getElementById('prev-month').addEventListener('click', function() {
+            currentMonth--;
+            if (currentMonth < 0) {
+                currentMonth = 11;
+                currentYear--;
+            }
+            showMonth(currentYear, currentMonth);
+        });
+        document.getElementById('next-month').addEventListener('click', function() {
+            currentMonth++;
+            if (currentMonth > 11) {
+                currentMonth = 0;
+                currentYear++;
+            }
+            showMonth(currentYear, currentMonth);
+        });
+    }
 
-    // Add event listeners for previous and next month buttons after they're created
-    setTimeout(() => {
-        const prevBtn = document.getElementById('prev-month');
-        const nextBtn = document.getElementById('next-month');
-        
-        if (prevBtn) {
-            prevBtn.addEventListener('click', async function() {
-                let newMonth = currentMonth - 1;
-                let newYear = currentYear;
-                if (newMonth < 0) {
-                    newMonth = 11;
-                    newYear--;
-                }
-                renderCalendar(container, newYear, newMonth, tasks);
-            });
-        }
-        
-        if (nextBtn) {
-            nextBtn.addEventListener('click', async function() {
-                let newMonth = currentMonth + 1;
-                let newYear = currentYear;
-                if (newMonth > 11) {
-                    newMonth = 0;
-                    newYear++;
-                }
-                renderCalendar(container, newYear, newMonth, tasks);
-            });
-        }
-    }, 100);
+    await showMonth(currentYear, currentMonth);
 }
 
-function renderCalendar(container, year, month, tasks) {
+function renderCalendar(container, year, month, summary) {
     // Clear container
     container.innerHTML = '';
 
@@ -133,18 +136,18 @@ function renderCalendar(container, year, month, tasks) {
         dayCell.textContent = day;
         
         // Format date string to match task date format (YYYY-MM-DD)
-        const dateStr = `${year}-${String(month + 1).padStart(2, '0')}-${String(day).padStart(2, '0')}`;
+        const dateStr = formatDate(year, month, day);
         
-        // Find tasks for this day
-        const dayTasks = tasks.filter(task => task.date === dateStr);
+        // Task counts for this day
+        const dayCounts = summary[dateStr];
         
         // Add classes based on task status
-        if (dayTasks.length > 0) {
+        if (dayCounts && dayCounts.total > 0) {
             dayCell.classList.add('has-task');
             
             // Check if all tasks for the day are completed
-            const allCompleted = dayTasks.every(task => task.completed);
-            const anyCompleted = dayTasks.some(task => task.completed);
+            const allCompleted = dayCounts.completed === dayCounts.total;
+            const anyCompleted = dayCounts.completed > 0;
             
             if (allCompleted) {
                 dayCell.classList.add('completed');
@@ -134,12 +134,17 @@ document.addEventListener('DOMContentLoaded', function() {
 // Task validation function
 async function openConceptValidation(taskId) {
     const currentTaskId = taskId;
+    let task;
 
     // Get task description
     try {
-        const response = await fetch(`/api/tasks`);
+        // Only fetch the task's own day rather than the whole task history
+        const checkbox = document.querySelector(`.task-checkbox[data-task-id="${taskId}"]`);
+        const taskDate = checkbox ? checkbox.dataset.taskDate : '';
+        const query = taskDate ? `start=${taskDate}&end=${taskDate}&` : '';
+        const response = await fetch(`/api/tasks?${query}fields=id,description`);
         const tasks = await response.json();
-        const task = tasks.find(t => t.id == taskId);
+        task = tasks.find(t => t.id == taskId);
 
         if (!task) {
             console.error('Task not found');
@@ -0,0 +1,41 @@
+"""The dashboard must run the same number of queries however many goals
+the user has: one query per goal (or per task) is the regression this
+guards against."""
+import pytest
+from sqlalchemy import event
+from app import create_app, init_database
+from extensions import db
+from benchmarks.seed import seed_database, signed_in_client
+from models import Goal
+
+def dashboard_query_counts(db_path, goals):
+    """(cold, warm) statement counts for GET / of a user with `goals` goals.
+
+    Cold renders every goal card; warm serves them from the fragment cache.
+    """
+    app = create_app({
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{db_path}",
+        "TESTING": True,
+        "SECRET_KEY": "test",
+        "SCHEDULE_QUEUE": "inline",
+    })
+    with app.app_context():
+        init_database()
+        goal_ids = seed_database(users=1, goals_per_user=goals, days_per_goal=10)
+        user_id = db.session.get(Goal, goal_ids[0]).user_id
+
+        statements = []
+        event.listen(db.engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    client = signed_in_client(app, user_id)
+    counts = []
+    for _ in range(2):
+        statements.clear()
+        response = client.get("/")
+        assert response.status_code == 200
+        counts.append(len(statements))
+    return tuple(counts)
+
+@pytest.mark.parametrize("goals", [10, 40])
+def test_dashboard_query_count_does_not_grow_with_goals(tmp_path, goals):
+    assert dashboard_query_counts(tmp_path / "few.db", 2) == dashboard_query_counts(tmp_path / "many.db", goals)
@@ -0,0 +1,108 @@
+"""The database job queue: which jobs are claimed, lock refreshes while a
+job runs, and runs that lost their job to another worker."""
+import time
+from datetime import date, datetime, timedelta
+import pytest
+from app import create_app, init_database
+from extensions import db
+from benchmarks.seed import seed_database
+from models import Goal, ScheduleJob, Task, User
+from utils import jobs
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'jobs.db'}",
+        "TESTING": True,
+        "SECRET_KEY": "test",
+        "SCHEDULE_QUEUE": "database",
+    })
+    with app.app_context():
+        init_database()
+        seed_database(users=1, goals_per_user=0)
+    return app
+
+def add_job(app, **columns):
+    """A goal with a schedule job; returns the job id"""
+    queue = app.extensions['schedule_queue']
+    start = date(2026, 1, 1)
+    goal = Goal(title="Learn SQL", start_date=start, end_date=start + timedelta(days=2), user_id=User.query.one().id)
+    db.session.add(goal)
+    db.session.flush()
+    job = queue.enqueue(goal)
+    for name, value in columns.items():
+        setattr(job, name, value)
+    db.session.commit()
+    return job.id
+
+def fake_schedule(monkeypatch, during=None):
+    """Replace Gemini with a fixed three-day schedule; during() runs while it is 'generated'"""
+    def generate(title, description, start_date, end_date):
+        if during is not None:
+            during()
+        return [(start_date + timedelta(days=day), f"Day {day + 1}") for day in range(3)]
+    monkeypatch.setattr(jobs, 'generate_task_schedule', generate)
+
+def test_only_pending_and_stale_running_jobs_are_claimed(app):
+    hour_ago = datetime.utcnow() - timedelta(hours=1)
+    with app.app_context():
+        stale = add_job(app, status='running', locked_at=hour_ago, attempts=1)
+        add_job(app, status='running', locked_at=datetime.utcnow(), attempts=1)
+        add_job(app, status='succeeded', locked_at=hour_ago, attempts=1)
+        add_job(app, status='failed', locked_at=hour_ago, attempts=3)
+        queue = app.extensions['schedule_queue']
+
+        claimed = queue.claim()
+        assert (claimed.id, claimed.attempts) == (stale, 2)
+        assert queue.claim() is None
+
+def test_running_job_keeps_its_lock_fresh(app, monkeypatch):
+    queue = app.extensions['schedule_queue']
+    monkeypatch.setattr(queue, 'heartbeat_interval', 0.05)
+    fake_schedule(monkeypatch, during=lambda: time.sleep(0.3))
+    with app.app_context():
+        job_id = add_job(app)
+        job = queue.claim()
+        claimed_at = job.locked_at
+
+        queue.run(job)
+
+        job = db.session.get(ScheduleJob, job_id)
+        assert job.status == 'succeeded'
+        assert job.locked_at > claimed_at
+        assert Task.query.count() == 3
+
+def test_run_that_lost_its_job_stores_nothing(app, monkeypatch):
+    queue = app.extensions['schedule_queue']
+
+    def taken_over():
+        # Another worker claims the job while this one is still generating
+        with app.app_context():
+            ScheduleJob.query.update({'attempts': ScheduleJob.attempts + 1, 'locked_at': datetime.utcnow()})
+            db.session.commit()
+
+    fake_schedule(monkeypatch, during=taken_over)
+    with app.app_context():
+        job_id = add_job(app)
+        queue.run(queue.claim())
+
+        job = db.session.get(ScheduleJob, job_id)
+        assert (job.status, job.attempts) == ('running', 2)
+        assert Task.query.count() == 0
+
+def test_failure_is_not_recorded_on_a_job_taken_over(app, monkeypatch):
+    queue = app.extensions['schedule_queue']
+
+    def taken_over_then_fail(*args):
+        with app.app_context():
+            ScheduleJob.query.update({'attempts': ScheduleJob.attempts + 1})
+            db.session.commit()
+        raise RuntimeError("upstream error")
+
+    monkeypatch.setattr(jobs, 'generate_task_schedule', taken_over_then_fail)
+    with app.app_context():
+        job_id = add_job(app)
+        queue.run(queue.claim())
+
+        job = db.session.get(ScheduleJob, job_id)
+        assert (job.status, job.last_error) == ('running', None)
@@ -0,0 +1,79 @@
+"""The LLM response caches: keys, TTL expiry and LRU eviction, for both
+the in-process and the SQLite backend."""
+import pytest
+from utils import llm_cache as cache_module
+from utils.llm_cache import MemoryCache, SQLiteCache, make_key
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, 'time', clock)
+    return clock
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def make_cache(request, tmp_path):
+    def make(ttl=60, max_entries=10):
+        if request.param == 'memory':
+            return MemoryCache(ttl=ttl, max_entries=max_entries)
+        return SQLiteCache(str(tmp_path / 'cache.db'), ttl=ttl, max_entries=max_entries)
+    return make
+
+def test_stores_json_values(make_cache):
+    cache = make_cache()
+    cache.set('key', [[0, 'Day 1'], [1, 'Day 2']])
+    assert cache.get('key') == [[0, 'Day 1'], [1, 'Day 2']]
+    assert cache.get('other') is None
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'evictions': 0, 'entries': 1}
+
+def test_entries_expire_after_the_ttl(make_cache, clock):
+    cache = make_cache(ttl=60)
+    cache.set('key', 'value')
+    clock.now += 59
+    assert cache.get('key') == 'value'
+    clock.now += 2
+    assert cache.get('key') is None
+    assert len(cache) == 0
+
+def test_least_recently_used_entry_is_evicted(make_cache, clock):
+    cache = make_cache(max_entries=2)
+    cache.set('a', 1)
+    clock.now += 1
+    cache.set('b', 2)
+    clock.now += 1
+    # Reading 'a' makes 'b' the least recently used
+    assert cache.get('a') == 1
+    clock.now += 1
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+    assert cache.stats()['evictions'] == 1
+    assert len(cache) == 2
+
+def test_sqlite_cache_is_shared_through_the_file(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    SQLiteCache(path).set('key', {'valid': True})
+    assert SQLiteCache(path).get('key') == {'valid': True}
+
+def test_key_ignores_case_and_whitespace():
+    assert make_key('validation', 'gemini', 'Learn  Python\n', None) == make_key('validation', 'gemini', 'learn python', '')
+    assert make_key('validation', 'gemini', 'Learn Python') != make_key('validation', 'gemini', 'Learn Rust')
+    assert make_key('validation', 'gemini', 'Learn Python') != make_key('validation', 'other-model', 'Learn Python')
+    assert make_key('validation', 'gemini', 'a') != make_key('schedule', 'gemini', 'a')
+
+def test_prompt_version_bump_invalidates_cached_entries(make_cache, monkeypatch):
+    cache = make_cache()
+    key = make_key('schedule', 'gemini', 'Learn Python', '', 30)
+    cache.set(key, [[0, 'Day 1']])
+
+    monkeypatch.setitem(cache_module.PROMPT_VERSIONS, 'schedule', cache_module.PROMPT_VERSIONS['schedule'] + 1)
+    new_key = make_key('schedule', 'gemini', 'Learn Python', '', 30)
+    assert new_key != key
+    assert cache.get(new_key) is None
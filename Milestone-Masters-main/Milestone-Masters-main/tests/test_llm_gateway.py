@@ -0,0 +1,202 @@
+"""Admission control for Gemini calls: the circuit breaker, retries and
+the concurrency slots held by calls and streams."""
+import asyncio
+from contextlib import closing
+import pytest
+from utils import llm_gateway as gateway_module
+from utils.llm_gateway import CircuitBreaker, LLMGateway, LLMUnavailable
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(gateway_module.time, 'monotonic', clock)
+    return clock
+
+def make_gateway(**options):
+    settings = dict(max_concurrency=1, queue_timeout=0, rate_per_minute=60000, burst=100, backoff=0)
+    return LLMGateway(**{**settings, **options})
+
+class Upstream:
+    """send() stand-in raising the queued errors before answering"""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self, timeout):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return 'reply'
+
+def test_breaker_opens_half_opens_and_closes(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+    clock.now += 30
+    # One trial call at a time while half-open
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow() and breaker.allow()
+
+def test_failed_trial_opens_the_breaker_again(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+def test_open_breaker_rejects_calls(clock):
+    gateway = make_gateway(failure_threshold=1, max_retries=0)
+    with pytest.raises(TimeoutError):
+        gateway.call('chat', Upstream(TimeoutError()))
+
+    upstream = Upstream()
+    with pytest.raises(LLMUnavailable):
+        gateway.call('chat', upstream)
+    assert upstream.calls == 0
+    assert gateway.stats()['circuit_open'] == 1
+
+    clock.now += gateway.breaker.reset_timeout
+    assert gateway.call('chat', upstream) == 'reply'
+    assert gateway.stats()['circuit_open'] == 0
+
+def test_transient_error_is_retried():
+    gateway = make_gateway(max_retries=2)
+    upstream = Upstream(TimeoutError(), ConnectionError())
+    assert gateway.call('chat', upstream) == 'reply'
+    assert upstream.calls == 3
+    assert gateway.stats()['retries'] == 2
+
+def test_retries_are_limited():
+    gateway = make_gateway(max_retries=1)
+    upstream = Upstream(TimeoutError(), TimeoutError(), TimeoutError())
+    with pytest.raises(TimeoutError):
+        gateway.call('chat', upstream)
+    assert upstream.calls == 2
+
+@pytest.mark.parametrize('error', [LLMUnavailable('refused'), ValueError('blocked prompt')])
+def test_refused_calls_are_not_retried(error):
+    gateway = make_gateway(max_retries=2)
+    upstream = Upstream(error)
+    with pytest.raises(type(error)):
+        gateway.call('chat', upstream)
+    assert upstream.calls == 1
+    assert gateway.stats()['retries'] == 0
+
+def test_call_releases_its_slot():
+    gateway = make_gateway()
+    gateway.call('chat', Upstream())
+    with pytest.raises(ValueError):
+        gateway.call('chat', Upstream(ValueError()))
+    assert gateway.call('chat', Upstream()) == 'reply'
+    assert gateway.stats()['in_flight'] == 0
+
+class Chunks:
+    """A streamed response that records whether it was closed"""
+
+    def __init__(self, count):
+        self.remaining = count
+        self.closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.remaining == 0:
+            raise StopIteration
+        self.remaining -= 1
+        return 'chunk'
+
+    def close(self):
+        self.closed = True
+
+def test_stream_holds_its_slot_until_closed():
+    gateway = make_gateway()
+    chunks = Chunks(5)
+    with closing(gateway.stream('chat_stream', lambda timeout: chunks)) as stream:
+        assert next(stream) == 'chunk'
+        assert gateway.stats()['in_flight'] == 1
+        # The only slot belongs to the open stream
+        with pytest.raises(LLMUnavailable):
+            gateway.call('chat', Upstream())
+
+    assert chunks.closed
+    assert gateway.stats()['in_flight'] == 0
+    assert gateway.call('chat', Upstream()) == 'reply'
+
+def test_stream_read_to_the_end_releases_its_slot():
+    gateway = make_gateway()
+    assert list(gateway.stream('chat_stream', lambda timeout: Chunks(3))) == ['chunk'] * 3
+    assert gateway.call('chat', Upstream()) == 'reply'
+
+def test_failure_after_the_first_chunk_is_not_retried():
+    gateway = make_gateway(max_retries=2)
+    opened = []
+
+    def send(timeout):
+        opened.append(timeout)
+        yield 'chunk'
+        raise TimeoutError()
+
+    stream = gateway.stream('chat_stream', send)
+    assert next(stream) == 'chunk'
+    with pytest.raises(TimeoutError):
+        next(stream)
+    assert len(opened) == 1
+    assert gateway.stats()['in_flight'] == 0
+
+class AsyncChunks:
+    def __init__(self, count):
+        self.remaining = count
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.remaining == 0:
+            raise StopAsyncIteration
+        self.remaining -= 1
+        return 'chunk'
+
+    async def aclose(self):
+        self.closed = True
+
+def test_async_stream_releases_its_slot_when_closed_early():
+    gateway = make_gateway()
+    chunks = AsyncChunks(5)
+
+    async def send(timeout):
+        return chunks
+
+    async def consume():
+        stream = gateway.stream_async('chat_stream', send)
+        async for _ in stream:
+            break
+        assert gateway.stats()['in_flight'] == 1
+        with pytest.raises(LLMUnavailable):
+            gateway.call('chat', Upstream())
+        await stream.aclose()
+
+    asyncio.run(consume())
+    assert chunks.closed
+    assert gateway.stats()['in_flight'] == 0
+    assert gateway.call('chat', Upstream()) == 'reply'
@@ -0,0 +1,64 @@
+"""Per-route Gemini metrics, SQL timing of failed statements and access to
+the /metrics endpoint."""
+import pytest
+from sqlalchemy import text
+from app import create_app, init_database
+from extensions import db
+from benchmarks.fake_gemini import install_fake_gemini
+from benchmarks.seed import seed_database, signed_in_client
+from models import Goal, Task
+from utils.metrics import llm_requests
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'metrics.db'}",
+        "TESTING": True,
+        "SECRET_KEY": "test",
+        "SCHEDULE_QUEUE": "inline",
+        "LLM_CACHE_BACKEND": "none",
+    })
+    install_fake_gemini(latency=0)
+    with app.app_context():
+        init_database()
+        seed_database(users=1, goals_per_user=1, days_per_goal=5)
+    return app
+
+@pytest.fixture
+def client(app):
+    with app.app_context():
+        user_id = Goal.query.first().user_id
+    return signed_in_client(app, user_id)
+
+def test_llm_calls_are_labelled_with_their_route(app, client):
+    with app.app_context():
+        task_ids = [task_id for (task_id,) in db.session.query(Task.id)]
+    before = dict(llm_requests._values)
+
+    client.post("/chat/send", json={"message": "What is a closure?"})
+    # Batch validation calls Gemini from a thread pool
+    client.post("/validate_concepts", json={"items": [{"task_id": t, "response": "I did it"} for t in task_ids]})
+
+    new = {labels for labels, count in llm_requests._values.items() if count > before.get(labels, 0)}
+    assert new == {('/chat/send', 'chat', 'success'), ('/validate_concepts', 'validation_batch', 'success')}
+
+def test_failed_statements_do_not_leave_timers_behind(app):
+    with app.app_context():
+        connection = db.session.connection()
+        for _ in range(3):
+            with pytest.raises(Exception):
+                connection.execute(text("SELECT * FROM no_such_table"))
+        assert connection.connection.info['query_started'] == []
+
+def test_metrics_are_served_to_local_clients_only(client):
+    assert client.get("/metrics").status_code == 200
+    assert client.get("/metrics", environ_base={"REMOTE_ADDR": "203.0.113.7"}).status_code == 403
+
+def test_metrics_token_is_required_when_set(app, client):
+    app.config["METRICS_TOKEN"] = "scrape-secret"
+    remote = {"REMOTE_ADDR": "203.0.113.7"}
+    assert client.get("/metrics").status_code == 403
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 403
+    response = client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"}, environ_base=remote)
+    assert response.status_code == 200
+    assert b"llm_requests_total" in response.data
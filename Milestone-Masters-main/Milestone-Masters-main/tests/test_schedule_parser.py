@@ -0,0 +1,88 @@
+"""Parsing of generated schedules: the JSON-mode reply, the fallback for
+truncated or line-format output, and the days left to request again."""
+import json
+from datetime import date
+from utils.schedule_parser import format_task, missing_date_ranges, parse_schedule
+
+START = date(2026, 3, 1)
+END = date(2026, 3, 5)
+
+def entry(day, **fields):
+    return {
+        'date': f"2026-03-{day:02d}", 'day': day, 'topic': f"Topic {day}", 'objective': 'Objective',
+        'concept': 'Concept', 'practice': 'Practice', **fields
+    }
+
+def test_valid_json_reply():
+    entries = [entry(day) for day in range(1, 6)]
+    result = parse_schedule(json.dumps(entries), START, END)
+
+    assert result.tasks == {date(2026, 3, day): format_task(entries[day - 1]) for day in range(1, 6)}
+    assert result.tasks[START] == "Day 1: Topic 1 - Objective: Objective - Task: Concept - Practice: Practice"
+    assert (result.missing, result.duplicates, result.invalid) == ([], 0, 0)
+
+def test_truncated_json_keeps_complete_entries():
+    text = json.dumps([entry(1), entry(2, practice='Use {braces} and "quotes"'), entry(3)])
+    result = parse_schedule(text[:-40], START, END)
+
+    assert sorted(result.tasks) == [date(2026, 3, 1), date(2026, 3, 2)]
+    assert 'Use {braces} and "quotes"' in result.tasks[date(2026, 3, 2)]
+    assert result.missing == [date(2026, 3, day) for day in (3, 4, 5)]
+
+def test_malformed_json_objects_are_counted_invalid():
+    text = '[{"date": "2026-03-01", "topic": "A"}, {"date": "2026-03-02", topic: B}, {"topic": "no date"}]'
+    result = parse_schedule(text, START, END)
+
+    assert list(result.tasks) == [START]
+    assert result.invalid == 2
+
+def test_line_format_fallback():
+    text = (
+        "Here is your plan:\n"
+        "DATE: 2026-03-01 | TASK: Read chapter 1 | take notes\n"
+        "and summarise it\n"
+        "DATE: 2026-03-02 | TASK: Exercises"
+    )
+    result = parse_schedule(text, START, END)
+
+    assert result.tasks == {
+        date(2026, 3, 1): "Read chapter 1 | take notes\nand summarise it",
+        date(2026, 3, 2): "Exercises"
+    }
+
+def test_out_of_range_and_unparseable_dates_are_invalid():
+    entries = [entry(1), entry(6), {**entry(2), 'date': '2026-02-28'}, {**entry(3), 'date': 'March 3rd'}]
+    result = parse_schedule(json.dumps(entries), START, END)
+
+    assert list(result.tasks) == [START]
+    assert result.invalid == 3
+
+def test_duplicate_dates_keep_the_first_entry():
+    entries = [entry(1), entry(1, topic='Second'), entry(2), entry(2, topic='Third')]
+    result = parse_schedule(json.dumps(entries), START, END)
+
+    assert result.tasks[START].startswith("Day 1: Topic 1")
+    assert result.duplicates == 2
+    assert result.invalid == 0
+
+def test_empty_reply():
+    result = parse_schedule(None, START, END)
+    assert result.tasks == {}
+    assert len(result.missing) == 5
+
+def test_missing_ranges_merge_adjacent_days():
+    tasks = {date(2026, 3, day): 'x' for day in (1, 4, 7)}
+    assert missing_date_ranges(tasks, [(START, date(2026, 3, 8))]) == [
+        (date(2026, 3, 2), date(2026, 3, 3)),
+        (date(2026, 3, 5), date(2026, 3, 6)),
+        (date(2026, 3, 8), date(2026, 3, 8))
+    ]
+
+def test_missing_ranges_split_at_segment_boundaries():
+    segments = [(date(2026, 3, 1), date(2026, 3, 7)), (date(2026, 3, 8), date(2026, 3, 14))]
+    tasks = {date(2026, 3, 1): 'x'}
+    assert missing_date_ranges(tasks, segments) == [
+        (date(2026, 3, 2), date(2026, 3, 7)),
+        (date(2026, 3, 8), date(2026, 3, 14))
+    ]
+    assert missing_date_ranges({}, segments) == segments
@@ -0,0 +1,49 @@
+"""Full-text search ranks every match of the user before paging."""
+import pytest
+from app import create_app, init_database
+from extensions import db
+from benchmarks.seed import seed_database, signed_in_client
+from models import Goal, Task
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'search.db'}",
+        "TESTING": True,
+        "SECRET_KEY": "test",
+        "SCHEDULE_QUEUE": "inline",
+    })
+    with app.app_context():
+        init_database()
+    return app
+
+def describe(day):
+    # The oldest task is the best match: it repeats the word in a short text
+    if day == 1:
+        return "Loop loop loop"
+    return f"Day {day}: practise writing a loop over a list of records and explain each step"
+
+def test_best_match_is_found_however_old(app):
+    with app.app_context():
+        goal_ids = seed_database(users=2, goals_per_user=1, days_per_goal=1500, describe_task=describe)
+        user_id = db.session.get(Goal, goal_ids[0]).user_id
+        oldest = Task.query.filter_by(user_id=user_id).order_by(Task.id).first().id
+    client = signed_in_client(app, user_id)
+
+    first_page = client.get("/api/search", query_string={"q": "loop", "limit": 10}).get_json()
+    assert first_page["results"][0]["id"] == oldest
+    assert first_page["next_offset"] == 10
+
+def test_pages_cover_every_match_once(app):
+    with app.app_context():
+        goal_ids = seed_database(users=1, goals_per_user=1, days_per_goal=120, describe_task=describe)
+        user_id = db.session.get(Goal, goal_ids[0]).user_id
+    client = signed_in_client(app, user_id)
+
+    seen = []
+    offset = 0
+    while offset is not None:
+        page = client.get("/api/search", query_string={"q": "loop", "limit": 50, "offset": offset}).get_json()
+        seen.extend(result["id"] for result in page["results"])
+        offset = page["next_offset"]
+    assert len(seen) == len(set(seen)) == 120
@@ -0,0 +1,107 @@
+"""The incrementally maintained dashboard stats must always equal what
+rebuild_user_stats() computes from the full task history."""
+import random
+from datetime import date, timedelta
+import pytest
+from app import complete_tasks, create_app, init_database
+from extensions import db
+from benchmarks.seed import seed_database, signed_in_client
+from models import Goal, Task, User, UserStats
+from utils.bulk import bulk_insert_tasks
+from utils.stats import rebuild_user_stats, record_tasks_added
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'stats.db'}",
+        "TESTING": True,
+        "SECRET_KEY": "test",
+        "WTF_CSRF_ENABLED": False,
+        "SCHEDULE_QUEUE": "inline",
+    })
+    with app.app_context():
+        init_database()
+        seed_database(users=1, goals_per_user=0)
+    return app
+
+def snapshot(stats):
+    return (stats.total_tasks, stats.completed_tasks, stats.current_streak, stats.last_active_date)
+
+def assert_matches_rebuild(user_id):
+    incremental = snapshot(db.session.get(UserStats, user_id))
+    rebuilt = snapshot(rebuild_user_stats(user_id))
+    # Keep the incremental row; the rebuild only served as the reference
+    db.session.rollback()
+    assert incremental == rebuilt
+
+def add_goal(user_id, start, days):
+    goal = Goal(title=f"Goal from {start}", start_date=start, end_date=start + timedelta(days=days - 1), user_id=user_id)
+    db.session.add(goal)
+    db.session.flush()
+    bulk_insert_tasks(goal, [(start + timedelta(days=day), f"Day {day + 1}") for day in range(days)])
+    record_tasks_added(user_id, days)
+    db.session.commit()
+    return goal.id
+
+def complete(user_id, task_dates):
+    tasks = Task.query.filter(Task.user_id == user_id, Task.date.in_(task_dates)).all()
+    assert complete_tasks(tasks)
+
+def test_scripted_completions_and_removals_match_rebuild(app):
+    today = date.today()
+    with app.app_context():
+        user_id = User.query.one().id
+        client = signed_in_client(app, user_id)
+        first = add_goal(user_id, today - timedelta(days=10), 14)
+        assert_matches_rebuild(user_id)
+
+        steps = [
+            [today - timedelta(days=5)],
+            # The next day extends the streak
+            [today - timedelta(days=4)],
+            # A gap restarts it
+            [today - timedelta(days=2)],
+            # Back-dated: closes the gap inside the streak
+            [today - timedelta(days=3)],
+            # Several days at once, including one already completed
+            [today - timedelta(days=1), today, today - timedelta(days=4)],
+            [today + timedelta(days=2)],
+        ]
+        for task_dates in steps:
+            complete(user_id, task_dates)
+            assert_matches_rebuild(user_id)
+
+        second = add_goal(user_id, today - timedelta(days=3), 7)
+        complete(user_id, [today + timedelta(days=3)])
+        assert_matches_rebuild(user_id)
+
+        # Deleting a goal takes its completed days out of the history
+        assert client.post(f"/goal/delete/{first}").status_code == 302
+        assert_matches_rebuild(user_id)
+        assert client.post(f"/goal/delete/{second}").status_code == 302
+        assert_matches_rebuild(user_id)
+        assert snapshot(db.session.get(UserStats, user_id)) == (0, 0, 0, None)
+
+@pytest.mark.parametrize("seed", range(5))
+def test_random_history_matches_rebuild(app, seed):
+    rng = random.Random(seed)
+    today = date.today()
+    with app.app_context():
+        user_id = User.query.one().id
+        client = signed_in_client(app, user_id)
+        goal_ids = [add_goal(user_id, today - timedelta(days=rng.randrange(20)), rng.randrange(1, 15))]
+        for _ in range(30):
+            action = rng.random()
+            if action < 0.15:
+                goal_ids.append(add_goal(user_id, today - timedelta(days=rng.randrange(20)), rng.randrange(1, 15)))
+            elif action < 0.25 and goal_ids:
+                goal_id = goal_ids.pop(rng.randrange(len(goal_ids)))
+                assert client.post(f"/goal/delete/{goal_id}").status_code == 302
+            else:
+                open_dates = sorted({
+                    task_date for (task_date,) in
+                    db.session.query(Task.date).filter(Task.user_id == user_id, Task.completed.is_(False))
+                })
+                if open_dates:
+                    complete(user_id, rng.sample(open_dates, min(len(open_dates), rng.randrange(1, 4))))
+            assert_matches_rebuild(user_id)
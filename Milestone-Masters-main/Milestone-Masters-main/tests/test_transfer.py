@@ -0,0 +1,50 @@
+"""Import of goal exports: invalid and repeated goals and their tasks."""
+import json
+import pytest
+from app import create_app, init_database
+from benchmarks.seed import seed_database
+from models import Goal, Task, User
+from utils.transfer import import_records, read_ndjson
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'transfer.db'}",
+        "TESTING": True,
+        "SECRET_KEY": "test",
+        "SCHEDULE_QUEUE": "inline",
+    })
+    with app.app_context():
+        init_database()
+        seed_database(users=1, goals_per_user=0)
+    return app
+
+def goal(key, title):
+    return {'type': 'goal', 'id': key, 'title': title, 'start_date': '2026-01-01', 'end_date': '2026-01-10'}
+
+def task(key, day):
+    return {'type': 'task', 'goal_id': key, 'date': f"2026-01-{day:02d}", 'description': f"Task {day}"}
+
+def run_import(records):
+    lines = [json.dumps(record) + '\n' for record in records]
+    return import_records(read_ndjson(lines), user_id=User.query.one().id)
+
+def test_tasks_after_a_repeated_goal_are_skipped(app):
+    with app.app_context():
+        result = run_import([
+            goal(1, 'First'), task(1, 1), task(1, 2),
+            goal(1, 'Second with the same id'), task(1, 3), task(1, 4),
+            goal(2, 'Other'), task(2, 5),
+        ])
+
+        assert (result.goals, result.tasks, result.skipped, result.error_count) == (2, 3, 2, 1)
+        assert result.errors == [{'line': 4, 'error': 'Goal 1 appears more than once'}]
+        first = Goal.query.filter_by(title='First').one()
+        assert sorted(t.date.day for t in Task.query.filter_by(goal_id=first.id)) == [1, 2]
+
+def test_tasks_of_an_invalid_goal_are_skipped(app):
+    with app.app_context():
+        result = run_import([{**goal(1, 'Backwards'), 'end_date': '2025-12-01'}, task(1, 1), goal(2, 'Ok'), task(2, 2)])
+
+        assert (result.goals, result.tasks, result.skipped, result.error_count) == (1, 1, 1, 1)
+        assert result.errors[0]['error'] == 'Goal ends before it starts'
@@ -0,0 +1,101 @@
+import logging
+from datetime import date
+from sqlalchemy import delete, insert
+from extensions import db
+from models import Goal, Task
+from utils.stats import rebuild_user_stats
+
+logger = logging.getLogger(__name__)
+
+def bulk_insert_tasks(goal, tasks):
+    """Insert (date, description) pairs for a goal in a single executemany"""
+    if not tasks:
+        return 0
+    db.session.execute(insert(Task), [
+        {'date': task_date, 'description': task_desc, 'goal_id': goal.id, 'user_id': goal.user_id}
+        for task_date, task_desc in tasks
+    ])
+    return len(tasks)
+
+def delete_goals(goal_ids):
+    """Delete goals with one statement; the database cascades to their tasks.
+
+    Stats of the owners are rebuilt in the same transaction. The caller
+    commits.
+    """
+    if not goal_ids:
+        return 0
+    user_ids = {
+        user_id for (user_id,) in
+        db.session.query(Goal.user_id).filter(Goal.id.in_(goal_ids)).distinct()
+    }
+    deleted = db.session.execute(
+        delete(Goal).where(Goal.id.in_(goal_ids)).execution_options(synchronize_session=False)
+    ).rowcount
+    for user_id in user_ids:
+        rebuild_user_stats(user_id)
+    logger.info(f"Deleted {deleted} goals")
+    return deleted
+
+def archived_goal_ids(before, user_id=None):
+    """Ids of goals that ended before the given date"""
+    query = db.session.query(Goal.id).filter(Goal.end_date < before)
+    if user_id is not None:
+        query = query.filter(Goal.user_id == user_id)
+    return [goal_id for (goal_id,) in query]
+
+def _parse_date(value):
+    return value if isinstance(value, date) else date.fromisoformat(value)
+
+def goal_row(record):
+    """Column values for a goal record; dates may be ISO strings"""
+    return {
+        'title': record['title'],
+        'description': record.get('description'),
+        'start_date': _parse_date(record['start_date']),
+        'end_date': _parse_date(record['end_date']),
+        'user_id': record['user_id']
+    }
+
+def task_row(task, goal_id, user_id):
+    return {
+        'date': _parse_date(task['date']),
+        'description': task['description'],
+        'completed': bool(task.get('completed', False)),
+        'goal_id': goal_id,
+        'user_id': user_id
+    }
+
+def insert_goal_rows(goal_rows):
+    """Insert goals with one executemany and return their ids in order"""
+    return db.session.scalars(
+        insert(Goal).returning(Goal.id, sort_by_parameter_order=True), goal_rows
+    ).all()
+
+def insert_task_rows(task_rows):
+    if task_rows:
+        db.session.execute(insert(Task), task_rows)
+
+def import_goals(records):
+    """Insert goals with their tasks using one executemany per table.
+
+    Each record is a dict with title, description, start_date, end_date,
+    user_id and a list of tasks (date, description, completed). Dates may
+    be ISO strings. Everything happens in the caller's transaction.
+    """
+    if not records:
+        return 0, 0
+    goal_rows = [goal_row(record) for record in records]
+    goal_ids = insert_goal_rows(goal_rows)
+
+    task_rows = [
+        task_row(task, goal_id, row['user_id'])
+        for goal_id, row, record in zip(goal_ids, goal_rows, records)
+        for task in record.get('tasks', [])
+    ]
+    insert_task_rows(task_rows)
+
+    for user_id in {row['user_id'] for row in goal_rows}:
+        rebuild_user_stats(user_id)
+    logger.info(f"Imported {len(goal_ids)} goals with {len(task_rows)} tasks")
+    return len(goal_ids), len(task_rows)
@@ -0,0 +1,226 @@
+"""Offline curriculum templates for goal schedules.
+
+The library (data/curricula.json) lists subjects, each with keywords and
+an ordered list of topics with an objective and an exercise. It is loaded
+once per process into an inverted index from keyword tokens to subjects.
+A goal is matched on the tokens of its title, and more weakly its
+description; tokens that are not in the index are matched fuzzily
+against it, so "pyhton" still finds Python.
+
+When the title names one subject clearly, the schedule can be built from
+its template without asking Gemini. The best match, confident or not,
+is also the fallback plan when Gemini is unavailable.
+"""
+import json
+import logging
+import os
+import re
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import timedelta
+from difflib import get_close_matches
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CURRICULA_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'curricula.json')
+
+# Tokens shorter than this are only matched exactly: "git" must not match "gift"
+FUZZY_MIN_LENGTH = 5
+FUZZY_CUTOFF = 0.82
+# A fuzzily matched keyword counts this much of an exact one
+FUZZY_WEIGHT = 0.75
+# Keywords found only in the description count this much of a title match
+DESCRIPTION_WEIGHT = 0.25
+# A confident match needs a title keyword and this lead over the runner-up,
+# so "JavaScript and React" is left to the model
+CONFIDENCE_MARGIN = 2.0
+
+GENERIC_TASK = "Apply {topic} concepts in a small project"
+
+_token_pattern = re.compile(r'[a-z0-9+#]+')
+
+def tokenize(text):
+    """Lowercase word tokens with a plural 's' dropped, so "databases" is "database" """
+    tokens = []
+    for token in _token_pattern.findall((text or '').lower()):
+        if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+@dataclass(frozen=True)
+class Topic:
+    title: str
+    objective: str
+    exercise: str
+
+@dataclass(frozen=True)
+class Subject:
+    name: str
+    keywords: tuple
+    task: str
+    topics: tuple
+
+@dataclass(frozen=True)
+class CurriculumMatch:
+    subject: Subject
+    score: float
+    confident: bool
+
+class CurriculumLibrary:
+    def __init__(self, subjects):
+        self.subjects = subjects
+        # token -> (subject index, keyword tokens) for every keyword containing it
+        self._index = defaultdict(list)
+        for position, subject in enumerate(subjects):
+            for keyword in subject.keywords:
+                keyword_tokens = tuple(tokenize(keyword))
+                for token in set(keyword_tokens):
+                    self._index[token].append((position, keyword_tokens))
+        self._vocabulary = [token for token in self._index if len(token) >= FUZZY_MIN_LENGTH]
+        self._resolve = lru_cache(maxsize=4096)(self._resolve_token)
+
+    @classmethod
+    def load(cls, path=DEFAULT_CURRICULA_PATH):
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        subjects = [
+            Subject(
+                name=entry['name'],
+                keywords=tuple(entry['keywords']),
+                task=entry['task'],
+                topics=tuple(Topic(topic['title'], topic['objective'], topic['exercise']) for topic in entry['topics'])
+            )
+            for entry in data['subjects']
+        ]
+        logger.info(f"Loaded {len(subjects)} curricula with {sum(len(s.topics) for s in subjects)} topics")
+        return cls(subjects)
+
+    def _resolve_token(self, token):
+        """The index token a goal token stands for and its weight, or None"""
+        if token in self._index:
+            return token, 1.0
+        if len(token) < FUZZY_MIN_LENGTH:
+            return None
+        close = get_close_matches(token, self._vocabulary, n=1, cutoff=FUZZY_CUTOFF)
+        return (close[0], FUZZY_WEIGHT) if close else None
+
+    def _keyword_scores(self, text):
+        """Best keyword score per subject: a keyword matches when all its
+        tokens occur, and scores its token count (longer keywords are more
+        specific) times the weight of its weakest token"""
+        found = {}
+        for token in tokenize(text):
+            resolved = self._resolve(token)
+            if resolved is not None:
+                found[resolved[0]] = max(found.get(resolved[0], 0), resolved[1])
+
+        scores = {}
+        for token in found:
+            for position, keyword_tokens in self._index[token]:
+                if all(t in found for t in keyword_tokens):
+                    score = len(keyword_tokens) * min(found[t] for t in keyword_tokens)
+                    scores[position] = max(scores.get(position, 0), score)
+        return scores
+
+    def match(self, goal_title, goal_description=None):
+        """The best matching subject, or None if no keyword occurs"""
+        title_scores = self._keyword_scores(goal_title)
+        scores = dict(title_scores)
+        for position, score in self._keyword_scores(goal_description).items():
+            scores[position] = scores.get(position, 0) + DESCRIPTION_WEIGHT * score
+        if not scores:
+            return None
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        best, score = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0
+        confident = best in title_scores and score >= CONFIDENCE_MARGIN * runner_up
+        return CurriculumMatch(self.subjects[best], score, confident)
+
+def _task_description(day_number, title, objective, task, exercise):
+    return (
+        f"Day {day_number}: {title}\n"
+        f"Objective: {objective}\n"
+        f"Task: {task}\n"
+        f"Practice: {exercise}"
+    )
+
+def build_curriculum_schedule(subject, start_date, end_date):
+    """One task per day following the subject's topics in order.
+
+    Short goals cover the first topics; long ones spread the topics evenly
+    and spend the extra days practicing the topic of the previous day.
+    """
+    days = (end_date - start_date).days + 1
+    topics = subject.topics
+    tasks = []
+    previous = None
+    for offset in range(days):
+        topic = topics[offset * len(topics) // days] if days > len(topics) else topics[offset]
+        task = subject.task.format(topic=topic.title)
+        if topic is previous:
+            description = _task_description(
+                offset + 1, f"{topic.title} (continued)",
+                f"Deepen your understanding of {topic.title}", task,
+                f"Extend the previous exercise: {topic.exercise}"
+            )
+        else:
+            description = _task_description(offset + 1, topic.title, topic.objective, task, topic.exercise)
+        tasks.append((start_date + timedelta(days=offset), description))
+        previous = topic
+    return tasks
+
+def build_generic_schedule(goal_title, start_date, end_date):
+    days = (end_date - start_date).days + 1
+    tasks = []
+    for offset in range(days):
+        topic = f"{goal_title} - Topic {offset + 1}"
+        tasks.append((start_date + timedelta(days=offset), _task_description(
+            offset + 1, topic, f"Learn the fundamentals of {topic}",
+            GENERIC_TASK.format(topic=topic), f"Create a simple example demonstrating {topic}"
+        )))
+    return tasks
+
+_lock = threading.Lock()
+curriculum_library = None
+prefer_templates = True
+
+def configure_curriculum(path=None, prefer=True):
+    """Load the library and set whether confident matches skip Gemini"""
+    global curriculum_library, prefer_templates
+    library = CurriculumLibrary.load(path or DEFAULT_CURRICULA_PATH)
+    with _lock:
+        curriculum_library = library
+        prefer_templates = prefer
+    return library
+
+def get_curriculum_library():
+    """The configured library; the bundled one if none was configured"""
+    global curriculum_library
+    if curriculum_library is None:
+        with _lock:
+            if curriculum_library is None:
+                curriculum_library = CurriculumLibrary.load()
+    return curriculum_library
+
+def template_schedule(goal_title, goal_description, start_date, end_date):
+    """The schedule from a confidently matched template, or None if the
+    goal should go to Gemini"""
+    if not prefer_templates:
+        return None
+    match = get_curriculum_library().match(goal_title, goal_description)
+    if match is None or not match.confident:
+        return None
+    logger.info(f"Using the {match.subject.name} curriculum for goal: {goal_title}")
+    return build_curriculum_schedule(match.subject, start_date, end_date)
+
+def offline_schedule(goal_title, goal_description, start_date, end_date):
+    """Best-effort schedule without the model: the best matching template,
+    else numbered generic topics"""
+    match = get_curriculum_library().match(goal_title, goal_description)
+    if match is None:
+        return build_generic_schedule(goal_title, start_date, end_date)
+    return build_curriculum_schedule(match.subject, start_date, end_date)
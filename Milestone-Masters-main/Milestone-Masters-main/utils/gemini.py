@@ -1,93 +1,220 @@
 import os
+import re
+import json
+import asyncio
 import logging
-from datetime import datetime, timedelta
-import google.generativeai as genai
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import aclosing, closing
+from datetime import timedelta
+from utils.curriculum import offline_schedule, template_schedule
+from utils.llm_cache import get_llm_cache, make_key
+from utils.llm_gateway import LLMUnavailable, get_llm_gateway
+from utils.schedule_parser import SCHEDULE_GENERATION_CONFIG, missing_date_ranges, parse_schedule
+from utils.metrics import observe_llm_call, schedules_generated, with_current_route
 
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+DEFAULT_MODEL_NAME = 'gemini-1.5-pro'
+
+class GeminiClientManager:
+    """Process-wide Gemini model cache.
+
+    genai.configure() throws away the SDK's cached transport clients, and
+    each GenerativeModel creates its client lazily on first use, so both
+    are done once per process here and the models are reused by every
+    request. Safe to use from multiple threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._models = {}
+        self._configured = False
+        self.api_key = None
+        self.model_name = None
+        self.model_factory = None
+
+    def configure(self, api_key=None, model_name=None, model_factory=None):
+        """Set the credentials and default model; drops any cached models.
+
+        model_factory(model_name) replaces genai.GenerativeModel, e.g. with
+        the offline stand-in used by the benchmarks.
+        """
+        with self._lock:
+            self.api_key = api_key
+            self.model_name = model_name
+            self.model_factory = model_factory
+            self._models = {}
+            self._configured = False
+
+    def get_model(self, model_name=None):
+        model_name = model_name or self.model_name or os.environ.get("GEMINI_MODEL", DEFAULT_MODEL_NAME)
+        model = self._models.get(model_name)
+        if model is not None:
+            return model
+
+        with self._lock:
+            model = self._models.get(model_name)
+            if model is None and self.model_factory is not None:
+                model = self.model_factory(model_name)
+                self._models[model_name] = model
+            elif model is None:
+                # Imported on first use: the SDK takes most of a second to
+                # load, which every process would pay at startup otherwise
+                import google.generativeai as genai
+                if not self._configured:
+                    api_key = self.api_key or os.environ.get("GEMINI_API_KEY")
+                    if not api_key:
+                        raise ValueError("Gemini API key not found in environment variables")
+                    genai.configure(api_key=api_key)
+                    self._configured = True
+                model = genai.GenerativeModel(model_name)
+                self._models[model_name] = model
+        return model
+
+client_manager = GeminiClientManager()
+
+def configure_gemini(api_key=None, model_name=None, model_factory=None):
+    client_manager.configure(api_key=api_key, model_name=model_name, model_factory=model_factory)
+
+def get_model(model_name=None):
+    return client_manager.get_model(model_name)
+
 def init_gemini():
-    api_key = os.environ.get("GEMINI_API_KEY")
-    if not api_key:
-        raise ValueError("Gemini API key not found in environment variables")
-    genai.configure(api_key=api_key)
-    # Use the correct model name from available models
-    return genai.GenerativeModel('gemini-1.5-pro')
-
-def generate_topic_list(goal_title, days_count):
-    """Generate a list of relevant topics based on the goal title"""
-    # Default topics for common programming languages/subjects
-    default_topics = {
-        "python": [
-            "Basic syntax", "Variables and data types", "Control flow", 
-            "Functions", "Data structures", "File handling", 
-            "Error handling", "Object-oriented programming", "Modules and packages",
-            "Advanced functions", "Working with APIs", "Testing", "Web frameworks",
-            "List comprehensions", "Decorators", "Generators and iterators", 
-            "Context managers", "Lambda expressions", "Regular expressions",
-            "Python for data analysis", "Python for automation", "Multithreading", 
-            "Multiprocessing", "Async programming", "Working with databases",
-            "Web scraping", "Python socket programming", "Building CLI applications", 
-            "GUI development with Tkinter", "Python with cloud services", "Pandas",
-            "NumPy", "Matplotlib", "Scikit-learn", "Django", "Flask", "FastAPI"
-        ],
-        "javascript": [
-            "Basic syntax", "Variables and data types", "Control flow", 
-            "Functions", "Arrays and objects", "DOM manipulation", 
-            "Events", "Asynchronous JS", "Error handling", "ES6 features",
-            "Modules", "Frameworks introduction", "API integration"
-        ],
-        "web development": [
-            "HTML basics", "CSS fundamentals", "Layout techniques", 
-            "Responsive design", "JavaScript basics", "DOM manipulation", 
-            "Forms and validation", "API integration", "Frontend frameworks intro",
-            "Backend basics", "Databases", "Authentication", "Deployment"
-        ],
-        "machine learning": [
-            "Data preparation", "Basic statistics", "Linear regression", 
-            "Classification algorithms", "Model evaluation", "Feature engineering", 
-            "Decision trees", "Neural networks intro", "Python ML libraries",
-            "Model optimization", "Clustering", "Natural language processing", "Computer vision"
-        ]
-    }
-    
-    # Convert goal title to lowercase for matching
-    goal_lower = goal_title.lower()
-    
-    # Find matching topics or create generic ones
-    for key in default_topics:
-        if key in goal_lower:
-            topics = default_topics[key][:days_count]
-            # If we need more topics than we have in our default list
-            while len(topics) < days_count:
-                topics.append(f"Advanced {key} topic {len(topics) - len(default_topics[key]) + 1}")
-            return topics
-    
-    # Generic topics if no match found
-    return [f"{goal_title} - Topic {i+1}" for i in range(days_count)]
-
-    if not api_key:
-        raise ValueError("Gemini API key not found in environment variables")
-    genai.configure(api_key=api_key)
-    # Use the correct model name from available models
-    return genai.GenerativeModel('gemini-1.5-pro')
+    # Kept for existing callers; returns the shared model
+    return get_model()
+
+def generate(model, operation, prompt, **kwargs):
+    """model.generate_content() through the LLM gateway, with latency,
+    outcome and token metrics for every attempt"""
+    def send(timeout):
+        started = time.perf_counter()
+        try:
+            response = model.generate_content(prompt, request_options={'timeout': timeout}, **kwargs)
+        except Exception:
+            observe_llm_call(operation, time.perf_counter() - started, 'error')
+            raise
+        observe_llm_call(operation, time.perf_counter() - started, 'success', response)
+        return response
 
-def generate_task_schedule(goal_title, goal_description, start_date, end_date):
-    """Generate a schedule using Gemini model"""
     try:
-        model = init_gemini()
-        # Convert dates to string format if they're date objects
-        start_date_str = start_date.strftime('%Y-%m-%d') if hasattr(start_date, 'strftime') else start_date
-        end_date_str = end_date.strftime('%Y-%m-%d') if hasattr(end_date, 'strftime') else end_date
+        return get_llm_gateway().call(operation, send)
+    except LLMUnavailable:
+        observe_llm_call(operation, 0.0, 'rejected')
+        raise
 
-        days_between = (end_date - start_date).days + 1 if hasattr(start_date, 'strftime') else 1
+async def generate_async(model, operation, prompt, **kwargs):
+    """generate() for coroutines, using the SDK's generate_content_async()"""
+    async def send(timeout):
+        started = time.perf_counter()
+        try:
+            response = await model.generate_content_async(prompt, request_options={'timeout': timeout}, **kwargs)
+        except Exception:
+            observe_llm_call(operation, time.perf_counter() - started, 'error')
+            raise
+        observe_llm_call(operation, time.perf_counter() - started, 'success', response)
+        return response
+
+    try:
+        return await get_llm_gateway().call_async(operation, send)
+    except LLMUnavailable:
+        observe_llm_call(operation, 0.0, 'rejected')
+        raise
 
-        prompt = f"""
+def _cancel_stream(response):
+    # The gRPC stream call supports cancel(); other transports just stop
+    # being read
+    cancel = getattr(getattr(response, '_iterator', None), 'cancel', None)
+    if cancel is not None:
+        cancel()
+
+def generate_stream(model, operation, prompt, **kwargs):
+    """Yield the chunks of a streamed generate_content() call.
+
+    The call holds its gateway slot until the stream ends or the generator
+    is closed, which cancels the upstream stream. The gateway timeout is
+    the deadline for the whole stream.
+    """
+    def send(timeout):
+        started = time.perf_counter()
+        try:
+            response = model.generate_content(prompt, stream=True, request_options={'timeout': timeout}, **kwargs)
+        except Exception:
+            observe_llm_call(operation, time.perf_counter() - started, 'error')
+            raise
+        observe_llm_call(operation, time.perf_counter() - started, 'success')
+        return chunks(response)
+
+    def chunks(response):
+        try:
+            yield from response
+        finally:
+            _cancel_stream(response)
+
+    try:
+        yield from get_llm_gateway().stream(operation, send)
+    except LLMUnavailable:
+        observe_llm_call(operation, 0.0, 'rejected')
+        raise
+
+async def generate_stream_async(model, operation, prompt, **kwargs):
+    """generate_stream() for coroutines"""
+    async def send(timeout):
+        started = time.perf_counter()
+        try:
+            response = await model.generate_content_async(
+                prompt, stream=True, request_options={'timeout': timeout}, **kwargs)
+        except Exception:
+            observe_llm_call(operation, time.perf_counter() - started, 'error')
+            raise
+        observe_llm_call(operation, time.perf_counter() - started, 'success')
+        return chunks(response)
+
+    async def chunks(response):
+        try:
+            async for chunk in response:
+                yield chunk
+        finally:
+            _cancel_stream(response)
+
+    try:
+        async with aclosing(get_llm_gateway().stream_async(operation, send)) as stream:
+            async for chunk in stream:
+                yield chunk
+    except LLMUnavailable:
+        observe_llm_call(operation, 0.0, 'rejected')
+        raise
+
+# Goals longer than this many days are generated in segments, concurrently
+SCHEDULE_SEGMENT_THRESHOLD = 14
+# Upper bound on in-flight segment requests for a single goal
+SCHEDULE_MAX_CONCURRENCY = 4
+# Extra rounds for the days that segments left out
+SCHEDULE_SEGMENT_RETRIES = 1
+
+def build_schedule_prompt(goal_title, goal_description, start_date, end_date,
+                          first_day=1, outline=None, segment_index=None):
+    days_between = (end_date - start_date).days + 1
+    start_date_str = start_date.strftime('%Y-%m-%d')
+    end_date_str = end_date.strftime('%Y-%m-%d')
+
+    outline_text = ""
+    if outline:
+        outline_lines = "\n".join(f"        Part {i + 1}: {theme}" for i, theme in enumerate(outline))
+        outline_text = f"""
+        This is part {segment_index + 1} of a longer plan that follows this outline:
+{outline_lines}
+        Only cover part {segment_index + 1}, building on the parts before it and
+        leaving later topics to the parts after it.
+        """
+
+    return f"""
         Create a focused {days_between}-day learning schedule specifically for learning: {goal_title}
         Description: {goal_description}
         Start Date: {start_date_str}
         End Date: {end_date_str}
-
+        {outline_text}
         For each day, provide ONLY relevant tasks directly related to {goal_title}.
         
         Each daily task should include:
@@ -95,8 +222,11 @@ def generate_task_schedule(goal_title, goal_description, start_date, end_date):
         2. ONE key concept to learn
         3. ONE practical coding exercise that builds real-world skills
         
-        Format each task EXACTLY as:
-        DATE: YYYY-MM-DD | TASK: Day [X]: [Specific topic] - Objective: [Clear learning goal] - Task: [Key concept] - Practice: [Coding exercise with specific instructions]
+        Return a JSON array with exactly one object per day from {start_date_str} to {end_date_str}:
+        date (YYYY-MM-DD), day (the day number), topic (the specific topic),
+        objective (a clear learning goal), concept (the key concept) and
+        practice (a coding exercise with specific instructions).
+        Number the days starting from Day {first_day}.
         
         Rules:
         1. Keep tasks strictly focused on {goal_title} without adding unrelated content
@@ -109,139 +239,153 @@ def generate_task_schedule(goal_title, goal_description, start_date, end_date):
         8. Advanced topics should include specific libraries, techniques, or applications
         """
 
-        logger.debug(f"Generating schedule with prompt for goal: {goal_title}")
-        response = model.generate_content(prompt)
-        tasks = []
+def split_date_range(start_date, end_date, segment_days):
+    segments = []
+    segment_start = start_date
+    while segment_start <= end_date:
+        segment_end = min(segment_start + timedelta(days=segment_days - 1), end_date)
+        segments.append((segment_start, segment_end))
+        segment_start = segment_end + timedelta(days=1)
+    return segments
 
-        for line in response.text.split('\n'):
-            if '|' in line:
-                try:
-                    date_part, task_part = line.split('|')
-                    if 'DATE:' in date_part and 'TASK:' in task_part:
-                        date_str = date_part.replace('DATE:', '').strip()
-                        task_desc = task_part.replace('TASK:', '').strip()
-                        task_date = datetime.strptime(date_str, '%Y-%m-%d').date()
-                        if start_date <= task_date <= end_date:
-                            tasks.append((task_date, task_desc))
-                except ValueError as e:
-                    logger.error(f"Error parsing task line '{line}': {str(e)}")
-                    continue
-
-        if not tasks:
-            # Fallback: Generate focused daily tasks relevant to the goal title
-            topics = generate_topic_list(goal_title, days_between)
-            current_date = start_date
-            day_count = 1
-            
-            # Specific learning objectives and exercises for Python topics
-            python_objectives = {
-                "Basic syntax": "Learn Python's indentation rules, comments, and basic operators",
-                "Variables and data types": "Understand different data types (int, float, string, bool) and type conversion",
-                "Control flow": "Master if-else statements, loops, and conditional expressions",
-                "Functions": "Create and use functions with parameters, return values, and default arguments",
-                "Data structures": "Work with lists, dictionaries, tuples, and sets",
-                "File handling": "Open, read, write, and close files using different modes",
-                "Error handling": "Implement try-except blocks to handle exceptions gracefully",
-                "Object-oriented programming": "Create classes, objects, inheritance, and use special methods",
-                "Modules and packages": "Import and use modules, create your own modules",
-                "Advanced functions": "Explore higher-order functions, closures, and recursion",
-                "Working with APIs": "Make HTTP requests and parse JSON responses",
-                "Testing": "Write unit tests using pytest or unittest",
-                "Web frameworks": "Build a simple web application with Flask",
-                "List comprehensions": "Write concise code for creating lists with conditions and transformations",
-                "Decorators": "Modify function behavior with decorator functions",
-                "Generators and iterators": "Create memory-efficient sequences using generator functions",
-                "Context managers": "Implement resource management with context managers",
-                "Lambda expressions": "Write anonymous functions for simple operations",
-                "Regular expressions": "Parse and validate text using regex patterns",
-                "Python for data analysis": "Process data using pandas DataFrames",
-                "Python for automation": "Automate tasks with scripts",
-                "Multithreading": "Run code concurrently with threads",
-                "Multiprocessing": "Execute tasks in parallel using multiple CPU cores",
-                "Async programming": "Use async/await for non-blocking code execution",
-                "Working with databases": "Connect to SQL databases and execute queries",
-                "Web scraping": "Extract data from websites using BeautifulSoup or Scrapy",
-                "Python socket programming": "Create client-server applications",
-                "Building CLI applications": "Design command-line interfaces with argparse",
-                "GUI development with Tkinter": "Build desktop applications with Python's built-in GUI toolkit",
-                "Python with cloud services": "Integrate with AWS, Azure, or Google Cloud",
-                "Pandas": "Analyze and manipulate tabular data efficiently",
-                "NumPy": "Perform numerical computing with arrays",
-                "Matplotlib": "Create data visualizations and plots",
-                "Scikit-learn": "Build machine learning models with Python",
-                "Django": "Develop full-featured web applications",
-                "Flask": "Create lightweight web services",
-                "FastAPI": "Build high-performance APIs with automatic documentation"
-            }
-            
-            python_exercises = {
-                "Basic syntax": "Write a program that prints 'Hello, World!' and calculates simple math expressions",
-                "Variables and data types": "Create variables of different types and perform operations on them",
-                "Control flow": "Write a program that determines if a number is prime using conditionals and loops",
-                "Functions": "Create a function to calculate the factorial of a number",
-                "Data structures": "Build a contact list using dictionaries with operations to add, remove, and search",
-                "File handling": "Create a program that reads a CSV file, processes data, and writes results to a new file",
-                "Error handling": "Write a program that safely divides numbers and handles potential errors",
-                "Object-oriented programming": "Design a 'Bank Account' class with methods for deposit, withdrawal, and balance check",
-                "Modules and packages": "Create a module with utility functions and import it in a main script",
-                "Advanced functions": "Implement a decorator that times how long a function takes to execute",
-                "Working with APIs": "Build a weather app that fetches data from a public API",
-                "Testing": "Write tests for the 'Bank Account' class created earlier",
-                "Web frameworks": "Create a simple Flask application with routes and templates",
-                "List comprehensions": "Convert for loops to list comprehensions in various examples",
-                "Decorators": "Create a caching decorator for expensive function calls",
-                "Generators and iterators": "Implement a custom range function using generators",
-                "Context managers": "Create a custom context manager for file handling",
-                "Lambda expressions": "Use lambda functions with map, filter, and sort",
-                "Regular expressions": "Build an email validator using regex",
-                "Python for data analysis": "Clean and analyze a sample dataset",
-                "Python for automation": "Create a script that organizes files in a directory by type",
-                "Multithreading": "Build a program that downloads multiple files concurrently",
-                "Multiprocessing": "Process a large dataset in parallel",
-                "Async programming": "Create an async web scraper",
-                "Working with databases": "Build a simple contact management system with SQLite",
-                "Web scraping": "Extract data from a news website",
-                "Python socket programming": "Create a simple chat application",
-                "Building CLI applications": "Build a command-line todo list manager",
-                "GUI development with Tkinter": "Create a calculator application with GUI",
-                "Python with cloud services": "Upload files to S3 or similar service",
-                "Pandas": "Analyze and visualize real-world dataset",
-                "NumPy": "Solve mathematical problems using NumPy arrays",
-                "Matplotlib": "Create various charts and plots from sample data",
-                "Scikit-learn": "Build and evaluate a simple classification model",
-                "Django": "Create a blog application with user authentication",
-                "Flask": "Build a RESTful API",
-                "FastAPI": "Develop a high-performance API with validation"
-            }
-            
-            while current_date <= end_date and day_count <= len(topics):
-                topic = topics[day_count-1] if day_count <= len(topics) else f"Advanced {goal_title} concepts"
-                
-                # Get specific objective and exercise for the topic, or use generic ones
-                objective = python_objectives.get(topic, f"Learn the fundamentals of {topic}")
-                exercise = python_exercises.get(topic, f"Create a simple example demonstrating {topic}")
-                
-                task_desc = (
-                    f"Day {day_count}: {topic}\n"
-                    f"Objective: {objective}\n"
-                    f"Task: Apply {topic} concepts in Python code\n"
-                    f"Practice: {exercise}"
+def build_schedule_outline(model, goal_title, goal_description, segments):
+    """Ask for one short theme per segment so separately generated parts stay consistent"""
+    default = [f"{goal_title} - Part {i + 1}" for i in range(len(segments))]
+    prompt = f"""
+        Outline a {len(segments)}-part learning curriculum for: {goal_title}
+        Description: {goal_description}
+        Each part covers about {(segments[0][1] - segments[0][0]).days + 1} days and the parts
+        should progress logically from fundamentals to advanced topics.
+
+        Return EXACTLY {len(segments)} lines formatted as:
+        PART [N]: [Short theme of the part]
+        """
+    try:
+        response = generate(model, 'schedule_outline', prompt)
+    except Exception as e:
+        logger.warning(f"Error generating schedule outline: {str(e)}")
+        return default
+
+    outline = list(default)
+    for match in re.finditer(r'PART\s*(\d+)\s*:\s*(.+)', response.text):
+        index = int(match.group(1)) - 1
+        if 0 <= index < len(outline):
+            outline[index] = match.group(2).strip()
+    return outline
+
+def generate_segment(model, goal_title, goal_description, segment, first_day, outline, segment_index):
+    """Request one date range of the schedule; returns its date -> task mapping"""
+    segment_start, segment_end = segment
+    prompt = build_schedule_prompt(
+        goal_title, goal_description, segment_start, segment_end,
+        first_day=first_day, outline=outline, segment_index=segment_index
+    )
+    operation = 'schedule' if outline is None else 'schedule_segment'
+    response = generate(model, operation, prompt, generation_config=SCHEDULE_GENERATION_CONFIG)
+    return parse_schedule(response.text, segment_start, segment_end).tasks
+
+def generate_schedule(model, goal_title, goal_description, start_date, end_date):
+    """Generate a schedule, requesting again only the days the model left out.
+
+    Goals up to SCHEDULE_SEGMENT_THRESHOLD days take a single request. Longer
+    ones are split into week (or, past 12 weeks, fortnight) segments that
+    are generated in parallel, each carrying a shared outline so the parts
+    stay consistent. After every round only the runs of missing days are
+    requested again, up to SCHEDULE_SEGMENT_RETRIES times, each within its
+    own segment so a retry is never longer than the segment it replaces.
+    """
+    days_between = (end_date - start_date).days + 1
+    if days_between > SCHEDULE_SEGMENT_THRESHOLD:
+        segments = split_date_range(start_date, end_date, 7 if days_between <= 84 else 14)
+        outline = build_schedule_outline(model, goal_title, goal_description, segments)
+    else:
+        segments = [(start_date, end_date)]
+        outline = None
+
+    def segment_index(day):
+        return next(i for i, (first, last) in enumerate(segments) if first <= day <= last)
+
+    tasks = {}
+    pending = segments
+    for round_number in range(1 + SCHEDULE_SEGMENT_RETRIES):
+        unavailable = False
+        with ThreadPoolExecutor(max_workers=min(SCHEDULE_MAX_CONCURRENCY, len(pending))) as pool:
+            futures = [
+                pool.submit(
+                    with_current_route(generate_segment), model, goal_title, goal_description, segment,
+                    (segment[0] - start_date).days + 1, outline,
+                    segment_index(segment[0]) if outline else None
                 )
-                tasks.append((current_date, task_desc))
-                current_date += timedelta(days=1)
-                day_count += 1
+                for segment in pending
+            ]
+            for future in as_completed(futures):
+                try:
+                    for task_date, task_desc in future.result().items():
+                        tasks.setdefault(task_date, task_desc)
+                except LLMUnavailable as e:
+                    unavailable = True
+                    logger.warning(f"Schedule segment not generated: {str(e)}")
+                except Exception as e:
+                    logger.warning(f"Error generating schedule segment: {str(e)}")
+
+        pending = missing_date_ranges(tasks, segments)
+        if not pending or unavailable:
+            # Retrying is pointless while the gateway is turning calls away
+            break
+        missing = sum((last - first).days + 1 for first, last in pending)
+        logger.info(f"Requesting {missing} missing days in {len(pending)} ranges for goal: {goal_title}")
+
+    return tasks
+
+def build_fallback_schedule(goal_title, start_date, end_date, goal_description=None):
+    """Generate focused daily tasks relevant to the goal title without the model"""
+    return offline_schedule(goal_title, goal_description, start_date, end_date)
+
+def generate_task_schedule(goal_title, goal_description, start_date, end_date):
+    """Generate a schedule from a matching curriculum template, else with Gemini"""
+    try:
+        templated = template_schedule(goal_title, goal_description, start_date, end_date)
+        if templated:
+            schedules_generated.inc('template')
+            return templated
+
+        model = get_model()
+        days_between = (end_date - start_date).days + 1
+
+        # Schedules are cached relative to their start date, so goals with
+        # the same title, description and length share one generated plan
+        cache_key = make_key('schedule', model.model_name, goal_title, goal_description, days_between)
+        cached = get_llm_cache().get(cache_key)
+        if cached is not None:
+            logger.debug(f"Serving cached schedule for goal: {goal_title}")
+            schedules_generated.inc('cache')
+            return [(start_date + timedelta(days=offset), task_desc) for offset, task_desc in cached]
 
+        generated = generate_schedule(model, goal_title, goal_description, start_date, end_date)
+
+        if len(generated) == days_between:
+            schedules_generated.inc('llm')
+            get_llm_cache().set(cache_key, [
+                [(task_date - start_date).days, task_desc] for task_date, task_desc in sorted(generated.items())
+            ])
+        else:
+            # Fill the days the model left out from the offline plan
+            if generated:
+                logger.warning(f"Schedule for goal {goal_title} is missing {days_between - len(generated)} days")
+            schedules_generated.inc('fallback')
+            for task_date, task_desc in build_fallback_schedule(goal_title, start_date, end_date, goal_description):
+                generated.setdefault(task_date, task_desc)
+
+        tasks = sorted(generated.items())
         logger.info(f"Generated {len(tasks)} tasks for goal: {goal_title}")
-        return sorted(tasks, key=lambda x: x[0])
+        return tasks
 
     except Exception as e:
         logger.error(f"Error generating schedule: {str(e)}")
         return []
 
-def validate_learning(task_description, user_response):
-    try:
-        model = init_gemini()
-        prompt = f"""
+def build_validation_prompt(task_description, user_response):
+    return f"""
         Validate the learning response:
         Task: {task_description}
         User's Response: {user_response}
@@ -257,37 +401,256 @@ def validate_learning(task_description, user_response):
         FEEDBACK: [Brief, specific feedback focused only on the task at hand, with 1-2 improvement suggestions if needed]
         """
 
-        response = model.generate_content(prompt)
-        text = response.text
+def parse_validation_response(text):
+    is_valid = "VALID: Yes" in text
+    feedback = text.split("FEEDBACK:")[1].strip() if "FEEDBACK:" in text else text
+    return is_valid, feedback
+
+def validate_learning(task_description, user_response):
+    try:
+        model = get_model()
+        cache_key = make_key('validation', model.model_name, task_description, user_response)
+        cached = get_llm_cache().get(cache_key)
+        if cached is not None:
+            is_valid, feedback = cached
+            return is_valid, feedback
 
-        is_valid = "VALID: Yes" in text
-        feedback = text.split("FEEDBACK:")[1].strip() if "FEEDBACK:" in text else text
+        response = generate(model, 'validation', build_validation_prompt(task_description, user_response))
+        is_valid, feedback = parse_validation_response(response.text)
 
+        get_llm_cache().set(cache_key, [is_valid, feedback])
         return is_valid, feedback
 
+    except LLMUnavailable as e:
+        logger.warning(f"Validation not available: {str(e)}")
+        return False, str(e)
     except Exception as e:
         logger.error(f"Error validating learning: {str(e)}")
         return False, f"Error validating response: {str(e)}"
 
-def chat_with_gemini(message, context=None):
+async def validate_learning_async(task_description, user_response):
     try:
-        model = init_gemini()
-        base_prompt = """You are an AI learning assistant helping users understand concepts 
-        and achieve their learning goals. Your responses should be:
-        1. Clear and concise
-        2. Include practical examples
-        3. Break down complex concepts
-        4. Encourage active learning
-        5. Validate understanding through questions
-
-        Always maintain a supportive and encouraging tone."""
-
-        if context:
-            prompt = f"{base_prompt}\nPrevious context: {context}\nUser: {message}"
+        model = get_model()
+        cache_key = make_key('validation', model.model_name, task_description, user_response)
+        cached = get_llm_cache().get(cache_key)
+        if cached is not None:
+            is_valid, feedback = cached
+            return is_valid, feedback
+
+        response = await generate_async(model, 'validation', build_validation_prompt(task_description, user_response))
+        is_valid, feedback = parse_validation_response(response.text)
+
+        get_llm_cache().set(cache_key, [is_valid, feedback])
+        return is_valid, feedback
+
+    except LLMUnavailable as e:
+        logger.warning(f"Validation not available: {str(e)}")
+        return False, str(e)
+    except Exception as e:
+        logger.error(f"Error validating learning: {str(e)}")
+        return False, f"Error validating response: {str(e)}"
+
+# Responses validated per Gemini call by validate_learning_batch(), and how
+# many of those calls one batch may have in flight
+VALIDATION_BATCH_SIZE = 10
+VALIDATION_MAX_CONCURRENCY = 4
+
+VALIDATION_BATCH_GENERATION_CONFIG = {
+    'response_mime_type': 'application/json',
+    'response_schema': {
+        'type': 'array',
+        'items': {
+            'type': 'object',
+            'properties': {
+                'index': {'type': 'integer', 'description': 'Number of the response being judged'},
+                'valid': {'type': 'boolean'},
+                'feedback': {'type': 'string'}
+            },
+            'required': ['index', 'valid', 'feedback']
+        }
+    }
+}
+
+def build_validation_batch_prompt(items):
+    responses = "\n\n".join(
+        f"""        Response {number}:
+        Task: {task_description}
+        User's Response: {user_response}"""
+        for number, (task_description, user_response) in enumerate(items, 1)
+    )
+    return f"""
+        Validate each of these learning responses on its own:
+
+{responses}
+
+        Evaluation Criteria:
+        1. Direct relevance to the specific task
+        2. Understanding of the specific concept
+        3. Evidence of completing the practice activity
+        4. Conciseness and clarity
+
+        Return a JSON array with one object per response: its index (the
+        response number), valid (true or false) and feedback (brief, specific
+        feedback focused only on that task, with 1-2 improvement suggestions if needed).
+        """
+
+def parse_validation_batch(text, count):
+    """Map 0-based response positions to (is_valid, feedback); entries that
+    are missing or malformed are left out"""
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return {}
+    results = {}
+    for entry in data if isinstance(data, list) else []:
+        if not isinstance(entry, dict):
+            continue
+        index = entry.get('index')
+        if not isinstance(index, int) or not 1 <= index <= count or index - 1 in results:
+            continue
+        if not isinstance(entry.get('valid'), bool) or not str(entry.get('feedback') or '').strip():
+            continue
+        results[index - 1] = (entry['valid'], str(entry['feedback']).strip())
+    return results
+
+def _cached_validations(model, items):
+    """Return (results with cached verdicts filled in, cache keys, uncached positions in chunks)"""
+    cache = get_llm_cache()
+    keys = [make_key('validation', model.model_name, task, answer) for task, answer in items]
+    results = [None] * len(items)
+    pending = []
+    for position, key in enumerate(keys):
+        cached = cache.get(key)
+        if cached is None:
+            pending.append(position)
         else:
-            prompt = f"{base_prompt}\nUser: {message}"
+            results[position] = tuple(cached)
+    chunks = [pending[i:i + VALIDATION_BATCH_SIZE] for i in range(0, len(pending), VALIDATION_BATCH_SIZE)]
+    return results, keys, chunks
+
+def _store_validations(results, keys, chunk, verdicts):
+    for offset, verdict in verdicts.items():
+        results[chunk[offset]] = verdict
+        get_llm_cache().set(keys[chunk[offset]], list(verdict))
+
+def _chunk_failed(results, chunk, error):
+    if isinstance(error, LLMUnavailable):
+        logger.warning(f"Validation not available: {str(error)}")
+        verdict = (False, str(error))
+    else:
+        logger.error(f"Error validating learning batch: {str(error)}")
+        verdict = (False, f"Error validating response: {str(error)}")
+    for position in chunk:
+        results[position] = verdict
+
+def validate_learning_batch(items):
+    """validate_learning() for a list of (task_description, user_response)
+    pairs, returning their verdicts in the same order.
+
+    Uncached pairs are judged VALIDATION_BATCH_SIZE at a time in a single
+    structured prompt, with the chunks sent concurrently. A pair the batch
+    answer leaves out is validated on its own, up to
+    VALIDATION_MAX_CONCURRENCY at a time.
+    """
+    try:
+        model = get_model()
+    except Exception as e:
+        logger.error(f"Error validating learning batch: {str(e)}")
+        return [(False, f"Error validating response: {str(e)}")] * len(items)
+
+    results, keys, chunks = _cached_validations(model, items)
+
+    def validate_chunk(chunk):
+        prompt = build_validation_batch_prompt([items[position] for position in chunk])
+        response = generate(model, 'validation_batch', prompt,
+                            generation_config=VALIDATION_BATCH_GENERATION_CONFIG)
+        return parse_validation_batch(response.text, len(chunk))
+
+    if chunks:
+        with ThreadPoolExecutor(max_workers=min(VALIDATION_MAX_CONCURRENCY, len(chunks))) as pool:
+            futures = {pool.submit(with_current_route(validate_chunk), chunk): chunk for chunk in chunks}
+            for future in as_completed(futures):
+                try:
+                    _store_validations(results, keys, futures[future], future.result())
+                except Exception as e:
+                    _chunk_failed(results, futures[future], e)
 
-        response = model.generate_content(prompt)
+    missing = [position for position, result in enumerate(results) if result is None]
+    if missing:
+        with ThreadPoolExecutor(max_workers=min(VALIDATION_MAX_CONCURRENCY, len(missing))) as pool:
+            retried = pool.map(with_current_route(lambda position: validate_learning(*items[position])), missing)
+            for position, result in zip(missing, retried):
+                results[position] = result
+    return results
+
+async def validate_learning_batch_async(items):
+    try:
+        model = get_model()
+    except Exception as e:
+        logger.error(f"Error validating learning batch: {str(e)}")
+        return [(False, f"Error validating response: {str(e)}")] * len(items)
+
+    results, keys, chunks = _cached_validations(model, items)
+    limit = asyncio.Semaphore(VALIDATION_MAX_CONCURRENCY)
+
+    async def validate_chunk(chunk):
+        prompt = build_validation_batch_prompt([items[position] for position in chunk])
+        async with limit:
+            try:
+                response = await generate_async(model, 'validation_batch', prompt,
+                                                 generation_config=VALIDATION_BATCH_GENERATION_CONFIG)
+                _store_validations(results, keys, chunk, parse_validation_batch(response.text, len(chunk)))
+            except Exception as e:
+                _chunk_failed(results, chunk, e)
+
+    await asyncio.gather(*(validate_chunk(chunk) for chunk in chunks))
+
+    async def validate_single(position):
+        async with limit:
+            return await validate_learning_async(*items[position])
+
+    missing = [position for position, result in enumerate(results) if result is None]
+    retried = await asyncio.gather(*(validate_single(position) for position in missing))
+    for position, result in zip(missing, retried):
+        results[position] = result
+    return results
+
+def build_chat_prompt(message, context=None):
+    base_prompt = """You are an AI learning assistant helping users understand concepts 
+    and achieve their learning goals. Your responses should be:
+    1. Clear and concise
+    2. Include practical examples
+    3. Break down complex concepts
+    4. Encourage active learning
+    5. Validate understanding through questions
+
+    Always maintain a supportive and encouraging tone."""
+
+    if context:
+        return f"{base_prompt}\nPrevious context: {context}\nUser: {message}"
+    return f"{base_prompt}\nUser: {message}"
+
+def chat_with_gemini(message, context=None):
+    try:
+        model = get_model()
+        response = generate(model, 'chat', build_chat_prompt(message, context))
+        return {
+            'success': True,
+            'response': response.text,
+            'error': None
+        }
+    except Exception as e:
+        logger.error(f"Error in chat: {str(e)}")
+        return {
+            'success': False,
+            'response': None,
+            'error': str(e)
+        }
+
+async def chat_with_gemini_async(message, context=None):
+    try:
+        model = get_model()
+        response = await generate_async(model, 'chat', build_chat_prompt(message, context))
         return {
             'success': True,
             'response': response.text,
@@ -299,4 +662,25 @@ def chat_with_gemini(message, context=None):
             'success': False,
             'response': None,
             'error': str(e)
-        }
\ No newline at end of file
+        }
+
+def stream_chat_with_gemini(message, context=None):
+    """Yield the chat reply in text chunks as Gemini generates them.
+
+    Chunks are only pulled from Gemini as the caller consumes them, and
+    closing the generator early (e.g. the client went away) cancels the
+    upstream stream instead of letting it run to completion.
+    """
+    model = get_model()
+    with closing(generate_stream(model, 'chat_stream', build_chat_prompt(message, context))) as chunks:
+        for chunk in chunks:
+            if chunk.parts:
+                yield chunk.text
+
+async def stream_chat_with_gemini_async(message, context=None):
+    """Async generator counterpart of stream_chat_with_gemini()"""
+    model = get_model()
+    async with aclosing(generate_stream_async(model, 'chat_stream', build_chat_prompt(message, context))) as chunks:
+        async for chunk in chunks:
+            if chunk.parts:
+                yield chunk.text
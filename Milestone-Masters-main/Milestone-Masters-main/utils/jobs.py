@@ -0,0 +1,218 @@
+import logging
+import random
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from extensions import db
+from models import Goal, ScheduleJob
+from utils.bulk import bulk_insert_tasks
+from utils.gemini import generate_task_schedule
+from utils.stats import bump_data_version, record_tasks_added
+
+logger = logging.getLogger(__name__)
+
+# A running job whose lock has not been refreshed within this window is
+# assumed to belong to a crashed process and is picked up again. Live
+# workers refresh it every JOB_HEARTBEAT_INTERVAL, however long the
+# generation takes.
+STALE_JOB_TIMEOUT = timedelta(minutes=10)
+JOB_HEARTBEAT_INTERVAL = STALE_JOB_TIMEOUT / 5
+
+def generate_goal_schedule(goal):
+    """Generate and store the task schedule for a goal; returns the task count"""
+    tasks = generate_task_schedule(
+        goal.title,
+        goal.description,
+        goal.start_date,
+        goal.end_date
+    )
+    if not tasks:
+        raise RuntimeError("No tasks generated")
+
+    bulk_insert_tasks(goal, tasks)
+    record_tasks_added(goal.user_id, len(tasks))
+    return len(tasks)
+
+def run_schedule_job(job):
+    """Run a claimed job and record its outcome; the caller commits.
+
+    The outcome is only recorded while the job is still running under
+    this attempt: if another worker took it over in the meantime, this
+    run's tasks are dropped so the schedule is not stored twice.
+    """
+    attempt = job.attempts
+    goal = db.session.get(Goal, job.goal_id)
+    if goal is None:
+        # The goal, and with it the job, was deleted while queued
+        return
+    try:
+        count = generate_goal_schedule(goal)
+    except Exception as e:
+        db.session.rollback()
+        job = db.session.get(ScheduleJob, job.id)
+        if job is None or job.status != 'running' or job.attempts != attempt:
+            return
+        job.last_error = str(e)
+        if job.attempts >= job.max_attempts:
+            job.status = 'failed'
+            # The dashboard shows the failure in place of the schedule
+            bump_data_version(goal.user_id)
+            logger.error(f"Schedule job {job.id} for goal {job.goal_id} failed: {str(e)}")
+        else:
+            # Exponential backoff with jitter between attempts
+            delay = 2 ** job.attempts * 5 * random.uniform(0.5, 1.5)
+            job.status = 'pending'
+            job.run_after = datetime.utcnow() + timedelta(seconds=delay)
+            logger.warning(f"Schedule job {job.id} attempt {job.attempts} failed, retrying in {delay:.0f}s: {str(e)}")
+        return
+
+    owned = ScheduleJob.query.filter_by(id=job.id, status='running', attempts=attempt).update(
+        {'status': 'succeeded', 'last_error': None}, synchronize_session=False
+    )
+    if not owned:
+        db.session.rollback()
+        logger.warning(f"Schedule job {job.id} was taken over by another worker; discarding this run")
+        return
+    logger.info(f"Generated {count} tasks for goal: {goal.title}")
+
+class JobQueue:
+    """Queue for schedule generation jobs.
+
+    enqueue() is called inside the request that creates the goal, before
+    its commit, so the job row is stored atomically with the goal.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def enqueue(self, goal):
+        job = ScheduleJob(
+            goal_id=goal.id,
+            max_attempts=self.app.config['SCHEDULE_JOB_MAX_ATTEMPTS']
+        )
+        db.session.add(job)
+        return job
+
+    def dispatch(self, job):
+        """Called once the transaction that enqueued the job has been committed"""
+
+    def start(self):
+        pass
+
+class InlineJobQueue(JobQueue):
+    """Runs the job in the request itself, like the app used to; handy for development"""
+
+    def dispatch(self, job):
+        while job.status == 'pending':
+            job.status = 'running'
+            job.attempts += 1
+            db.session.commit()
+            run_schedule_job(job)
+            db.session.commit()
+            job = db.session.get(ScheduleJob, job.id)
+
+class DatabaseJobQueue(JobQueue):
+    """Jobs are rows in the app database, processed by in-process worker threads.
+
+    Every web worker process runs its own threads; a job is claimed with a
+    conditional UPDATE so only one of them runs it.
+    """
+
+    poll_interval = 2.0
+    heartbeat_interval = JOB_HEARTBEAT_INTERVAL.total_seconds()
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.wakeup = threading.Event()
+        self.threads = []
+
+    def dispatch(self, job):
+        self.wakeup.set()
+
+    def start(self):
+        for i in range(self.app.config['SCHEDULE_WORKERS']):
+            thread = threading.Thread(target=self.work, name=f"schedule-worker-{i}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def claim(self):
+        now = datetime.utcnow()
+        claimable = db.or_(
+            db.and_(ScheduleJob.status == 'pending', ScheduleJob.run_after <= now),
+            db.and_(ScheduleJob.status == 'running', ScheduleJob.locked_at < now - STALE_JOB_TIMEOUT)
+        )
+        candidates = (
+            db.session.query(ScheduleJob.id)
+            .filter(claimable)
+            .order_by(ScheduleJob.run_after)
+            .limit(5)
+            .all()
+        )
+        for (job_id,) in candidates:
+            # Re-checked in the UPDATE: the job may have finished or been
+            # claimed since it was selected
+            claimed = ScheduleJob.query.filter(ScheduleJob.id == job_id, claimable).update({
+                'status': 'running',
+                'locked_at': now,
+                'attempts': ScheduleJob.attempts + 1
+            }, synchronize_session=False)
+            db.session.commit()
+            if claimed:
+                return db.session.get(ScheduleJob, job_id)
+        return None
+
+    @contextmanager
+    def heartbeat(self, job):
+        """Refresh the job's locked_at from another thread while the body
+        runs, so a long generation is not taken for a crashed worker"""
+        job_id, attempt = job.id, job.attempts
+        done = threading.Event()
+
+        def beat():
+            while not done.wait(self.heartbeat_interval):
+                try:
+                    with self.app.app_context():
+                        ScheduleJob.query.filter_by(id=job_id, status='running', attempts=attempt).update(
+                            {'locked_at': datetime.utcnow()}, synchronize_session=False
+                        )
+                        db.session.commit()
+                except Exception as e:
+                    logger.warning(f"Could not refresh the lock of schedule job {job_id}: {str(e)}")
+
+        thread = threading.Thread(target=beat, name=f"schedule-heartbeat-{job_id}", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            done.set()
+            thread.join()
+
+    def run(self, job):
+        """Run a claimed job, keeping its lock fresh until it is done"""
+        with self.heartbeat(job):
+            run_schedule_job(job)
+            db.session.commit()
+
+    def work(self):
+        while True:
+            try:
+                with self.app.app_context():
+                    job = self.claim()
+                    if job is not None:
+                        self.run(job)
+                        continue
+            except Exception as e:
+                logger.error(f"Schedule worker error: {str(e)}")
+            self.wakeup.wait(self.poll_interval)
+            self.wakeup.clear()
+
+QUEUE_BACKENDS = {
+    'database': DatabaseJobQueue,
+    'inline': InlineJobQueue
+}
+
+def create_job_queue(app):
+    backend = app.config['SCHEDULE_QUEUE']
+    if backend not in QUEUE_BACKENDS:
+        raise ValueError(f"Unknown schedule queue backend: {backend}")
+    return QUEUE_BACKENDS[backend](app)
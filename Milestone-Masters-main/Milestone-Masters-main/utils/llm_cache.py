@@ -0,0 +1,202 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Bump the version of a prompt whenever its template changes so that
+# responses generated from the old wording are no longer served
+PROMPT_VERSIONS = {
+    'schedule': 2,
+    'validation': 1
+}
+
+_whitespace = re.compile(r'\s+')
+
+def normalize(value):
+    """Case- and whitespace-insensitive form of a prompt input"""
+    if value is None:
+        return ''
+    return _whitespace.sub(' ', str(value)).strip().lower()
+
+def make_key(kind, model_name, *inputs):
+    """Content hash of (prompt kind and version, model name, normalized inputs)"""
+    payload = json.dumps(
+        [kind, PROMPT_VERSIONS[kind], model_name, [normalize(i) for i in inputs]],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class LLMCache:
+    """Size-bounded TTL cache for JSON-serializable LLM results"""
+
+    def __init__(self, ttl=7 * 24 * 3600, max_entries=1000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._counter_lock = threading.Lock()
+
+    def get(self, key):
+        value = self._get(key)
+        with self._counter_lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self._set(key, value)
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(self)
+        }
+
+    def _count_evictions(self, count):
+        with self._counter_lock:
+            self.evictions += count
+
+    def _get(self, key):
+        raise NotImplementedError
+
+    def _set(self, key, value):
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
+
+class NullCache(LLMCache):
+    """Caching disabled: every lookup is a miss"""
+
+    def _get(self, key):
+        return None
+
+    def _set(self, key, value):
+        pass
+
+    def __len__(self):
+        return 0
+
+class MemoryCache(LLMCache):
+    """Per-process LRU cache"""
+
+    def __init__(self, ttl=7 * 24 * 3600, max_entries=1000):
+        super().__init__(ttl, max_entries)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, value)
+            self._entries.move_to_end(key)
+            evicted = 0
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+        if evicted:
+            self._count_evictions(evicted)
+
+    def __len__(self):
+        return len(self._entries)
+
+class SQLiteCache(LLMCache):
+    """On-disk LRU cache shared by every worker process on the host"""
+
+    def __init__(self, path, ttl=7 * 24 * 3600, max_entries=10000):
+        super().__init__(ttl, max_entries)
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_last_used ON llm_cache (last_used)")
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _get(self, key):
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        now = time.time()
+        with conn:
+            if expires_at < now:
+                conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (now, key))
+        return json.loads(value)
+
+    def _set(self, key, value):
+        conn = self._connect()
+        now = time.time()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now + self.ttl, now)
+            )
+            excess = conn.execute("SELECT count(*) FROM llm_cache").fetchone()[0] - self.max_entries
+            if excess > 0:
+                conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN "
+                    "(SELECT key FROM llm_cache ORDER BY last_used LIMIT ?)", (excess,)
+                )
+                self._count_evictions(excess)
+
+    def __len__(self):
+        return self._connect().execute("SELECT count(*) FROM llm_cache").fetchone()[0]
+
+llm_cache = MemoryCache()
+
+def configure_llm_cache(backend='memory', path=None, ttl=7 * 24 * 3600, max_entries=1000):
+    """Replace the process-wide cache: backend is 'memory', 'sqlite' or 'none'"""
+    global llm_cache
+    if backend == 'memory':
+        llm_cache = MemoryCache(ttl=ttl, max_entries=max_entries)
+    elif backend == 'sqlite':
+        path = path or os.path.join(os.getcwd(), 'llm_cache.db')
+        llm_cache = SQLiteCache(path, ttl=ttl, max_entries=max_entries)
+    elif backend == 'none':
+        llm_cache = NullCache()
+    else:
+        raise ValueError(f"Unknown LLM cache backend: {backend}")
+    logger.info(f"Using {backend} LLM response cache")
+    return llm_cache
+
+def get_llm_cache():
+    return llm_cache
@@ -0,0 +1,370 @@
+"""Admission control for Gemini calls.
+
+Every request to the model goes through one process-wide gateway which
+bounds how many calls are in flight, how fast new ones start, how long
+each may take and how often a failing one is retried. After repeated
+failures a circuit breaker rejects calls outright for a while, so a slow
+or rate-limited upstream makes callers fall back quickly instead of
+tying up worker threads.
+
+call() serves threads and call_async() coroutines; both draw on the same
+limits, so sync and async callers in one process share the budget.
+stream() and stream_async() do the same for streamed responses and keep
+the call's slot until the stream ends or is closed.
+"""
+import asyncio
+import logging
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class LLMUnavailable(Exception):
+    """The gateway refused the call; callers should use their fallback"""
+
+class TokenBucket:
+    """Allows `rate` calls per second on average with bursts of up to `capacity`"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take(self):
+        """Take a token if one is available; returns 0 or the seconds until the next one"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self, timeout):
+        """Take a token, waiting up to `timeout` seconds; False if none came free"""
+        deadline = time.monotonic() + timeout
+        while True:
+            wait = self._take()
+            if not wait:
+                return True
+            if time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    async def acquire_async(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            wait = self._take()
+            if not wait:
+                return True
+            if time.monotonic() + wait > deadline:
+                return False
+            await asyncio.sleep(wait)
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures.
+
+    While open every call is rejected. After `reset_timeout` seconds one
+    trial call is let through (half-open): its success closes the
+    breaker, its failure opens it again.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._trial_running = False
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def release_trial(self):
+        """Give back a half-open trial that was granted but never made"""
+        with self._lock:
+            self._trial_running = False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("Gemini circuit breaker closed")
+            self.state = self.CLOSED
+            self._failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"Gemini circuit breaker opened after {self._failures} failures")
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._trial_running = False
+
+def is_retryable(error):
+    """Timeouts, rate limiting and server errors are worth another attempt;
+    rejected requests (bad arguments, auth, blocked content) are not"""
+    # google.api_core errors carry their HTTP status as `code`; checking it
+    # avoids importing the SDK's exception module
+    code = getattr(error, 'code', None)
+    if isinstance(code, int) and 400 <= code < 500:
+        return code == 429
+    return not isinstance(error, (LLMUnavailable, ValueError, TypeError))
+
+class LLMGateway:
+    def __init__(self, timeout=30.0, max_concurrency=4, queue_timeout=10.0,
+                 rate_per_minute=60, burst=10, max_retries=2, backoff=1.0,
+                 failure_threshold=5, reset_timeout=30.0):
+        self.timeout = timeout
+        self.queue_timeout = queue_timeout
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._bucket = TokenBucket(rate_per_minute / 60.0, burst)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.rejected = 0
+        self.retries = 0
+
+    def _reject(self, reason):
+        with self._lock:
+            self.rejected += 1
+        raise LLMUnavailable(f"AI service temporarily unavailable ({reason}), please try again shortly")
+
+    def _failed(self, operation, error, attempt):
+        """Account for a failed attempt; returns the delay before the next
+        one, or None when the error should be raised"""
+        if not is_retryable(error):
+            # The service answered, it just refused this request
+            self.breaker.record_success()
+            return None
+        self.breaker.record_failure()
+        if attempt >= self.max_retries:
+            return None
+        with self._lock:
+            self.retries += 1
+        delay = self.backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+        logger.warning(f"Gemini {operation} call failed ({str(error)}), retry {attempt + 1} in {delay:.1f}s")
+        return delay
+
+    def _track(self, amount):
+        with self._lock:
+            self.in_flight += amount
+
+    def _admit(self):
+        """Take a slot and a rate token, or raise LLMUnavailable; the
+        caller releases the slot"""
+        if not self.breaker.allow():
+            self._reject("circuit open")
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            self.breaker.release_trial()
+            self._reject("too many requests in flight")
+        if not self._bucket.acquire(self.queue_timeout):
+            self._slots.release()
+            self.breaker.release_trial()
+            self._reject("rate limited")
+
+    async def _acquire_slot_async(self):
+        # The slots are shared with threaded callers, so poll the semaphore
+        # instead of blocking the event loop on it
+        deadline = time.monotonic() + self.queue_timeout
+        while not self._slots.acquire(blocking=False):
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(0.05)
+        return True
+
+    async def _admit_async(self):
+        if not self.breaker.allow():
+            self._reject("circuit open")
+        if not await self._acquire_slot_async():
+            self.breaker.release_trial()
+            self._reject("too many requests in flight")
+        if not await self._bucket.acquire_async(self.queue_timeout):
+            self._slots.release()
+            self.breaker.release_trial()
+            self._reject("rate limited")
+
+    def call(self, operation, send):
+        """Run send(timeout) under the gateway's limits and return its result.
+
+        Raises LLMUnavailable when the call is refused (breaker open, no
+        free slot or rate budget within queue_timeout) and re-raises the
+        last error once the retries are used up.
+        """
+        attempt = 0
+        while True:
+            self._admit()
+            try:
+                self._track(1)
+                try:
+                    result = send(self.timeout)
+                finally:
+                    self._track(-1)
+            except LLMUnavailable:
+                raise
+            except Exception as e:
+                delay = self._failed(operation, e, attempt)
+                if delay is None:
+                    raise
+            else:
+                self.breaker.record_success()
+                return result
+            finally:
+                self._slots.release()
+
+            attempt += 1
+            time.sleep(delay)
+
+    async def call_async(self, operation, send):
+        """call() for coroutines: awaits send(timeout) without holding a thread"""
+        attempt = 0
+        while True:
+            await self._admit_async()
+            try:
+                self._track(1)
+                try:
+                    result = await send(self.timeout)
+                finally:
+                    self._track(-1)
+            except LLMUnavailable:
+                raise
+            except Exception as e:
+                delay = self._failed(operation, e, attempt)
+                if delay is None:
+                    raise
+            else:
+                self.breaker.record_success()
+                return result
+            finally:
+                self._slots.release()
+
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    def _stream_ended(self, read_any):
+        """A stream was closed by its consumer before it ended"""
+        if read_any:
+            self.breaker.record_success()
+        else:
+            self.breaker.release_trial()
+
+    def stream(self, operation, send):
+        """call() for streamed responses: send(timeout) opens the stream and
+        its chunks are yielded while the call keeps its slot, so streams
+        count towards max_concurrency until they end or are closed.
+
+        Opening the stream is retried like call(); a stream that fails
+        after yielding chunks is not, as the caller already has part of it.
+        """
+        attempt = 0
+        while True:
+            self._admit()
+            read_any = False
+            chunks = None
+            try:
+                self._track(1)
+                try:
+                    chunks = send(self.timeout)
+                    for chunk in chunks:
+                        read_any = True
+                        yield chunk
+                finally:
+                    self._track(-1)
+                    if hasattr(chunks, 'close'):
+                        chunks.close()
+            except GeneratorExit:
+                self._stream_ended(read_any)
+                raise
+            except LLMUnavailable:
+                raise
+            except Exception as e:
+                delay = self._failed(operation, e, self.max_retries if read_any else attempt)
+                if delay is None:
+                    raise
+            else:
+                self.breaker.record_success()
+                return
+            finally:
+                self._slots.release()
+
+            attempt += 1
+            time.sleep(delay)
+
+    async def stream_async(self, operation, send):
+        """stream() for coroutines: send(timeout) is awaited and returns an
+        async iterable"""
+        attempt = 0
+        while True:
+            await self._admit_async()
+            read_any = False
+            chunks = None
+            try:
+                self._track(1)
+                try:
+                    chunks = await send(self.timeout)
+                    async for chunk in chunks:
+                        read_any = True
+                        yield chunk
+                finally:
+                    self._track(-1)
+                    if hasattr(chunks, 'aclose'):
+                        await chunks.aclose()
+            except (GeneratorExit, asyncio.CancelledError):
+                self._stream_ended(read_any)
+                raise
+            except LLMUnavailable:
+                raise
+            except Exception as e:
+                delay = self._failed(operation, e, self.max_retries if read_any else attempt)
+                if delay is None:
+                    raise
+            else:
+                self.breaker.record_success()
+                return
+            finally:
+                self._slots.release()
+
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'in_flight': self.in_flight,
+                'rejected': self.rejected,
+                'retries': self.retries,
+                'circuit_open': int(self.breaker.state != CircuitBreaker.CLOSED)
+            }
+
+llm_gateway = LLMGateway()
+
+def configure_llm_gateway(**options):
+    """Replace the process-wide gateway; see LLMGateway for the options"""
+    global llm_gateway
+    llm_gateway = LLMGateway(**options)
+    return llm_gateway
+
+def get_llm_gateway():
+    return llm_gateway
@@ -0,0 +1,233 @@
+"""In-process metrics exposed in the Prometheus text format.
+
+Recording a sample is a dict lookup and a few additions under a lock, so
+the instrumentation is cheap enough to stay on in production. Each worker
+process keeps its own values; scrape every worker, or run a single
+process, to get the full picture.
+
+Gemini calls are labelled with the URL rule of the route that made them
+('background' for the schedule workers). Work a request hands to a thread
+pool keeps its route when the callable is wrapped in with_current_route().
+"""
+import bisect
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from functools import wraps
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (non-cumulative, last is +Inf), sum, count]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (counts, total, count) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                    cumulative += bucket_count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(
+                        f"{self.name}_bucket{_format_labels(self.labelnames, labels, [('le', le)])} {cumulative}"
+                    )
+                label_text = _format_labels(self.labelnames, labels)
+                lines.append(f"{self.name}_sum{label_text} {total}")
+                lines.append(f"{self.name}_count{label_text} {count}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, *args, **kwargs):
+        metric = Counter(*args, **kwargs)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, *args, **kwargs):
+        metric = Histogram(*args, **kwargs)
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collect):
+        """collect() returns (name, type, help, value) tuples read at scrape time"""
+        self._collectors.append(collect)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collect in self._collectors:
+            for name, metric_type, documentation, value in collect():
+                lines.extend([f"# HELP {name} {documentation}", f"# TYPE {name} {metric_type}", f"{name} {value}"])
+        return '\n'.join(lines) + '\n'
+
+registry = Registry()
+
+http_requests = registry.counter(
+    'http_requests_total', 'HTTP requests by endpoint, method and status.',
+    ('endpoint', 'method', 'status'))
+http_request_duration = registry.histogram(
+    'http_request_duration_seconds', 'Time to produce the response (excluding streamed bodies).',
+    ('endpoint',))
+db_queries = registry.counter(
+    'db_queries_total', 'SQL statements executed, by endpoint.', ('endpoint',))
+db_query_duration = registry.histogram(
+    'db_query_duration_seconds', 'SQL statement execution time, by endpoint.', ('endpoint',),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0))
+llm_requests = registry.counter(
+    'llm_requests_total', 'Gemini calls by route, operation and outcome.', ('route', 'operation', 'outcome'))
+llm_request_duration = registry.histogram(
+    'llm_request_duration_seconds', 'Gemini call latency by route and operation.', ('route', 'operation'))
+llm_tokens = registry.counter(
+    'llm_tokens_total', 'Gemini tokens by operation and kind (prompt or completion).',
+    ('operation', 'kind'))
+schedules_generated = registry.counter(
+    'schedules_generated_total', 'Goal schedules by source (template, cache, llm or fallback).',
+    ('source',))
+
+# Route of the work running outside a Flask request context: set by the
+# ASGI coroutine views and carried into thread pools by with_current_route()
+metrics_route = ContextVar('metrics_route', default='background')
+
+def current_route():
+    """URL rule of the request being served, e.g. '/validate_concept/<int:task_id>'"""
+    if has_request_context():
+        return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    return metrics_route.get()
+
+def with_current_route(func):
+    """Wrap func so that, when run in another thread, its Gemini calls are
+    labelled with the route that submitted it"""
+    route = current_route()
+
+    @wraps(func)
+    def run(*args, **kwargs):
+        token = metrics_route.set(route)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            metrics_route.reset(token)
+    return run
+
+def _current_endpoint():
+    if has_request_context():
+        return request.endpoint or 'unmatched'
+    return 'background'
+
+def _add_to_request(key, amount):
+    if has_request_context():
+        setattr(g, key, g.get(key, 0) + amount)
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+def _record_query(conn):
+    elapsed = time.perf_counter() - conn.info['query_started'].pop()
+    endpoint = _current_endpoint()
+    db_queries.inc(endpoint)
+    db_query_duration.observe(elapsed, endpoint)
+    _add_to_request('db_queries', 1)
+    _add_to_request('db_seconds', elapsed)
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _record_query(conn)
+
+@event.listens_for(Engine, 'handle_error')
+def _handle_error(exception_context):
+    # A failed statement gets no after_cursor_execute; take its start time
+    # off the stack here, or it would stay on the pooled connection
+    conn = exception_context.connection
+    if conn is not None and conn.info.get('query_started'):
+        _record_query(conn)
+
+def observe_llm_call(operation, elapsed, outcome, response=None):
+    """Record one Gemini call; token counts come from the response's usage metadata"""
+    route = current_route()
+    llm_requests.inc(route, operation, outcome)
+    llm_request_duration.observe(elapsed, route, operation)
+    _add_to_request('llm_seconds', elapsed)
+    usage = getattr(response, 'usage_metadata', None)
+    if usage is not None:
+        llm_tokens.inc(operation, 'prompt', amount=getattr(usage, 'prompt_token_count', 0) or 0)
+        llm_tokens.inc(operation, 'completion', amount=getattr(usage, 'candidates_token_count', 0) or 0)
+
+def init_request_metrics(app):
+    """Time every request and log the ones slower than SLOW_REQUEST_MS"""
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        started = g.get('request_started')
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        endpoint = request.endpoint or 'unmatched'
+        http_requests.inc(endpoint, request.method, str(response.status_code))
+        http_request_duration.observe(elapsed, endpoint)
+        slow_request_ms = app.config.get('SLOW_REQUEST_MS', 0)
+        if slow_request_ms and elapsed * 1000 >= slow_request_ms:
+            logger.warning(
+                f"Slow request {request.method} {request.path}: {elapsed * 1000:.0f}ms, "
+                f"{g.get('db_queries', 0)} queries ({g.get('db_seconds', 0) * 1000:.0f}ms), "
+                f"LLM {g.get('llm_seconds', 0) * 1000:.0f}ms"
+            )
+        return response
@@ -0,0 +1,137 @@
+"""Parsing of generated schedules.
+
+Schedules are requested in Gemini's JSON mode with SCHEDULE_RESPONSE_SCHEMA.
+parse_schedule() reads that output, and also the older line format
+(DATE: YYYY-MM-DD | TASK: ...) in case a model ignores the schema, with a
+single compiled pattern. Truncated JSON still yields every complete
+entry, task text may contain '|' or span several lines, repeated dates
+keep their first entry, and the days that are still missing are reported
+so that only those need to be requested again.
+"""
+import json
+import logging
+import re
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+logger = logging.getLogger(__name__)
+
+SCHEDULE_RESPONSE_SCHEMA = {
+    'type': 'array',
+    'items': {
+        'type': 'object',
+        'properties': {
+            'date': {'type': 'string', 'description': 'Day of the task as YYYY-MM-DD'},
+            'day': {'type': 'integer', 'description': 'Day number within the whole plan'},
+            'topic': {'type': 'string'},
+            'objective': {'type': 'string'},
+            'concept': {'type': 'string'},
+            'practice': {'type': 'string'}
+        },
+        'required': ['date', 'day', 'topic', 'objective', 'concept', 'practice']
+    }
+}
+
+SCHEDULE_GENERATION_CONFIG = {
+    'response_mime_type': 'application/json',
+    'response_schema': SCHEDULE_RESPONSE_SCHEMA
+}
+
+# Either a flat JSON object (a schedule entry; braces inside its strings
+# are fine) or a DATE: ... | TASK: ... entry running up to the next entry
+_ENTRY = re.compile(
+    r'(?P<object>\{(?:[^{}"]|"(?:[^"\\]|\\.)*")*\})'
+    r'|DATE:\s*(?P<date>\d{4}-\d{2}-\d{2})\s*\|\s*TASK:\s*(?P<task>.*?)\s*(?=DATE:\s*\d{4}-|\Z)',
+    re.DOTALL
+)
+
+@dataclass
+class ParsedSchedule:
+    tasks: dict
+    missing: list = field(default_factory=list)
+    duplicates: int = 0
+    invalid: int = 0
+
+def format_task(entry):
+    """Task description in the form the app stores and displays"""
+    return (
+        f"Day {entry.get('day', '?')}: {entry.get('topic', '').strip()} - "
+        f"Objective: {entry.get('objective', '').strip()} - "
+        f"Task: {entry.get('concept', '').strip()} - "
+        f"Practice: {entry.get('practice', '').strip()}"
+    )
+
+def _json_entry(entry):
+    if not isinstance(entry, dict) or not entry.get('date') or not entry.get('topic'):
+        return None
+    return str(entry['date']).strip(), format_task(entry)
+
+def _entries(text):
+    """Yield (date string, description) per entry, or None for an unusable one"""
+    try:
+        data = json.loads(text)
+    except ValueError:
+        data = None
+    if isinstance(data, list):
+        for entry in data:
+            yield _json_entry(entry)
+        return
+
+    # Not a complete JSON array: truncated output or the line format
+    for match in _ENTRY.finditer(text):
+        if match.group('object') is None:
+            yield match.group('date'), match.group('task')
+            continue
+        try:
+            yield _json_entry(json.loads(match.group('object')))
+        except ValueError:
+            yield None
+
+def missing_dates(tasks, start_date, end_date):
+    return [
+        start_date + timedelta(days=offset)
+        for offset in range((end_date - start_date).days + 1)
+        if start_date + timedelta(days=offset) not in tasks
+    ]
+
+def missing_date_ranges(tasks, segments):
+    """Contiguous (first, last) runs of days that have no task, within each
+    (first, last) segment. A run never crosses a segment boundary, so
+    requesting it again is never longer than the segment was."""
+    ranges = []
+    for segment_start, segment_end in segments:
+        runs = []
+        for day in missing_dates(tasks, segment_start, segment_end):
+            if runs and day - runs[-1][1] == timedelta(days=1):
+                runs[-1] = (runs[-1][0], day)
+            else:
+                runs.append((day, day))
+        ranges.extend(runs)
+    return ranges
+
+def parse_schedule(text, start_date, end_date):
+    """Map each date within range to its task description"""
+    result = ParsedSchedule(tasks={})
+    for entry in _entries(text or ''):
+        if entry is None:
+            result.invalid += 1
+            continue
+        date_str, description = entry
+        try:
+            task_date = date.fromisoformat(date_str)
+        except ValueError:
+            result.invalid += 1
+            continue
+        if not start_date <= task_date <= end_date or not description.strip():
+            result.invalid += 1
+        elif task_date in result.tasks:
+            result.duplicates += 1
+        else:
+            result.tasks[task_date] = description.strip()
+
+    result.missing = missing_dates(result.tasks, start_date, end_date)
+    if result.duplicates or result.invalid:
+        logger.debug(
+            f"Schedule response had {result.duplicates} duplicate and {result.invalid} unusable entries"
+        )
+    return result
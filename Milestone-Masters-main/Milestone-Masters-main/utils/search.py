@@ -0,0 +1,158 @@
+"""Full-text search over task descriptions and goals.
+
+The indexes are created by migration 6: FTS5 tables kept in sync by
+triggers on SQLite, generated tsvector columns with GIN indexes on
+Postgres. Both stem English words, so "loops" finds "loop". Queries are
+reduced to plain words that must all occur. Prefix matching is left out on
+purpose: a short prefix expands to many words, and reading all of their
+entries for every returned row costs hundreds of milliseconds on a large
+history.
+
+Since migration 7 the FTS5 tables also index each row's owner and every
+SQLite query matches the user's id along with the words, so a search
+reads only the user's own entries however many other users there are.
+Every match of the user is ranked before a page is cut, so each page
+holds the next best matches overall; a word found in most of the user's
+tasks costs a pass over those entries.
+
+Snippets are HTML: the matched text is escaped and the hits are wrapped
+in <mark>.
+"""
+import re
+from markupsafe import escape
+from sqlalchemy import text
+from extensions import db
+
+# Private-use markers that the engines put around hits; replaced with
+# <mark> once the snippet text has been escaped
+_HIT_START = '\ue000'
+_HIT_END = '\ue001'
+
+SEARCH_TYPES = ('task', 'goal')
+
+_SQLITE_QUERIES = {
+    'task': """
+        WITH hits AS (
+            SELECT task_fts.rowid, rank
+            FROM task_fts
+            -- The owner column does not count towards the rank
+            WHERE task_fts MATCH :query AND rank MATCH 'bm25(1.0, 0.0)'
+            ORDER BY rank, task_fts.rowid DESC LIMIT :limit OFFSET :offset
+        )
+        SELECT task.id, task.date, task.completed, task.goal_id, goal.title AS goal_title,
+               snippet(task_fts, 0, :hit_start, :hit_end, '…', 24) AS snippet, hits.rank
+        FROM hits
+        -- Matched again by rowid so that snippets are only built for this page
+        JOIN task_fts ON task_fts.rowid = hits.rowid
+        JOIN task ON task.id = hits.rowid
+        JOIN goal ON goal.id = task.goal_id
+        WHERE task_fts MATCH :query
+        ORDER BY hits.rank, hits.rowid DESC
+    """,
+    'goal': """
+        SELECT goal.id, goal.title, goal.start_date, goal.end_date, hits.snippet, hits.rank
+        FROM (
+            SELECT goal_fts.rowid, rank, snippet(goal_fts, -1, :hit_start, :hit_end, '…', 24) AS snippet
+            FROM goal_fts
+            -- A hit in the title counts four times as much as one in the
+            -- description; the owner column not at all
+            WHERE goal_fts MATCH :query AND rank MATCH 'bm25(4.0, 1.0, 0.0)'
+            ORDER BY rank LIMIT :limit OFFSET :offset
+        ) AS hits
+        JOIN goal ON goal.id = hits.rowid
+        ORDER BY hits.rank
+    """,
+}
+
+_HEADLINE_OPTIONS = f"StartSel={_HIT_START}, StopSel={_HIT_END}, MaxWords=24, MinWords=8"
+
+_POSTGRES_QUERIES = {
+    'task': f"""
+        WITH hits AS (
+            SELECT task.id, query, ts_rank(task.search_vector, query) AS rank
+            FROM task, to_tsquery('english', :query) AS query
+            WHERE task.search_vector @@ query AND task.user_id = :user_id
+            ORDER BY rank DESC, task.id DESC LIMIT :limit OFFSET :offset
+        )
+        SELECT task.id, task.date, task.completed, task.goal_id, goal.title AS goal_title,
+               ts_headline('english', task.description, hits.query, '{_HEADLINE_OPTIONS}') AS snippet,
+               hits.rank
+        FROM hits
+        JOIN task ON task.id = hits.id
+        JOIN goal ON goal.id = task.goal_id
+        ORDER BY hits.rank DESC, hits.id DESC
+    """,
+    'goal': f"""
+        SELECT goal.id, goal.title, goal.start_date, goal.end_date,
+               ts_headline('english', goal.title || ' ' || coalesce(goal.description, ''),
+                           hits.query, '{_HEADLINE_OPTIONS}') AS snippet,
+               hits.rank
+        FROM (
+            SELECT goal.id, query, ts_rank(goal.search_vector, query) AS rank
+            FROM goal, to_tsquery('english', :query) AS query
+            WHERE goal.search_vector @@ query AND goal.user_id = :user_id
+            ORDER BY rank DESC, goal.id LIMIT :limit OFFSET :offset
+        ) AS hits
+        JOIN goal ON goal.id = hits.id
+        ORDER BY hits.rank DESC, goal.id
+    """,
+}
+
+def search_terms(query):
+    """The words of a user's query; punctuation and operators are dropped"""
+    return re.findall(r'\w+', query.lower())
+
+def build_match_query(terms, dialect, user_id, kind='task'):
+    """Engine query requiring every term; on SQLite also the owner"""
+    if dialect == 'sqlite':
+        # Quoted, so words like AND or NEAR are searched for literally
+        words = ' '.join(f'"{term}"' for term in terms)
+        columns = 'description' if kind == 'task' else '{title description}'
+        return f'user_id : "u{int(user_id)}" AND {columns} : ({words})'
+    return ' & '.join(terms)
+
+def render_snippet(snippet):
+    return str(escape(snippet or '')).replace(_HIT_START, '<mark>').replace(_HIT_END, '</mark>')
+
+def search(query, user_id, kind='task', limit=20, offset=0):
+    """Ranked matches for `query` among the user's tasks or goals, best
+    first, as a list of dicts.
+
+    Tasks carry their goal's id and title; goals their date range. Every
+    result has an HTML `snippet` of the matching text.
+    """
+    if kind not in SEARCH_TYPES:
+        raise ValueError(f"Unknown search type: {kind}")
+    terms = search_terms(query)
+    if not terms:
+        return []
+
+    dialect = db.session.get_bind().dialect.name
+    statements = _SQLITE_QUERIES if dialect == 'sqlite' else _POSTGRES_QUERIES
+    rows = db.session.execute(text(statements[kind]), {
+        'query': build_match_query(terms, dialect, user_id, kind),
+        'hit_start': _HIT_START,
+        'hit_end': _HIT_END,
+        'user_id': user_id,
+        'limit': limit,
+        'offset': offset
+    }).mappings()
+
+    results = []
+    for row in rows:
+        result = {'type': kind, 'id': row['id'], 'snippet': render_snippet(row['snippet'])}
+        if kind == 'task':
+            result.update({
+                'date': str(row['date']),
+                'completed': bool(row['completed']),
+                'goal_id': row['goal_id'],
+                'goal_title': row['goal_title']
+            })
+        else:
+            result.update({
+                'title': row['title'],
+                'start_date': str(row['start_date']),
+                'end_date': str(row['end_date'])
+            })
+        results.append(result)
+    return results
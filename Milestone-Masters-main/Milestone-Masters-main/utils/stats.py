@@ -0,0 +1,138 @@
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import case, func
+from sqlalchemy.exc import IntegrityError
+from extensions import db
+from models import Task, UserStats
+
+logger = logging.getLogger(__name__)
+
+def get_user_stats(user_id):
+    """Return the stats row for a user, building it on first access"""
+    stats = db.session.get(UserStats, user_id)
+    if stats is None:
+        try:
+            stats = rebuild_user_stats(user_id)
+            db.session.commit()
+        except IntegrityError:
+            # Another request built the row first; theirs is just as current
+            db.session.rollback()
+            stats = db.session.get(UserStats, user_id)
+    return stats
+
+def get_data_version(user_id):
+    """Counter that changes whenever any of the user's goals or tasks do"""
+    return get_user_stats(user_id).data_version
+
+def bump_data_version(user_id):
+    """Mark the user's cached pages and fragments as stale; the caller commits"""
+    stats, _ = _load_for_update(user_id)
+    stats.data_version = UserStats.data_version + 1
+
+def _load_for_update(user_id):
+    """Return (stats, rebuilt) for an incremental update.
+
+    A freshly rebuilt row already reflects the pending changes in the
+    session (the rebuild queries autoflush), so callers must not apply
+    their delta on top of it.
+    """
+    stats = db.session.get(UserStats, user_id)
+    if stats is None:
+        return rebuild_user_stats(user_id), True
+    return stats, False
+
+def rebuild_user_stats(user_id):
+    """Recompute a user's stats from their full task history"""
+    total_tasks, completed_tasks = db.session.query(
+        func.count(Task.id),
+        func.count(case((Task.completed.is_(True), 1)))
+    ).filter(Task.user_id == user_id).one()
+
+    dates = (
+        db.session.query(Task.date)
+        .filter(Task.user_id == user_id, Task.completed.is_(True))
+        .distinct()
+        .order_by(Task.date.desc())
+    )
+    last_active_date = None
+    streak = 0
+    for (task_date,) in dates.yield_per(100):
+        if last_active_date is None:
+            last_active_date = task_date
+        elif (last_active_date - task_date).days != streak:
+            break
+        streak += 1
+
+    stats = db.session.get(UserStats, user_id)
+    if stats is None:
+        stats = UserStats(user_id=user_id)
+        db.session.add(stats)
+    else:
+        stats.data_version = UserStats.data_version + 1
+    stats.total_tasks = total_tasks
+    stats.completed_tasks = completed_tasks
+    stats.current_streak = streak
+    stats.last_active_date = last_active_date
+    db.session.flush()
+    logger.info(f"Rebuilt stats for user {user_id}: {total_tasks} tasks, streak {streak}")
+    return stats
+
+def record_tasks_added(user_id, count):
+    """Account for newly created, not yet completed tasks"""
+    stats, rebuilt = _load_for_update(user_id)
+    if not rebuilt:
+        stats.total_tasks = UserStats.total_tasks + count
+        stats.data_version = UserStats.data_version + 1
+
+def record_task_completed(user_id, task_date):
+    """Account for a task that has just been marked as completed"""
+    record_tasks_completed(user_id, [task_date])
+
+def record_tasks_completed(user_id, task_dates):
+    """Account for tasks of one user that have just been marked as completed"""
+    if not task_dates:
+        return
+    stats, rebuilt = _load_for_update(user_id)
+    if rebuilt:
+        return
+    last_active_date = stats.last_active_date
+    if last_active_date is not None and min(task_dates) < last_active_date:
+        # A back-dated completion can close a gap inside the current streak,
+        # which cannot be decided from the summary alone
+        db.session.flush()
+        rebuild_user_stats(user_id)
+        return
+
+    stats.completed_tasks = UserStats.completed_tasks + len(task_dates)
+    stats.data_version = UserStats.data_version + 1
+    streak = stats.current_streak
+    for task_date in sorted(set(task_dates)):
+        if last_active_date is None or task_date > last_active_date:
+            if last_active_date is not None and task_date - last_active_date == timedelta(days=1):
+                streak += 1
+            else:
+                streak = 1
+            last_active_date = task_date
+    stats.current_streak = streak
+    stats.last_active_date = last_active_date
+
+def record_tasks_removed(user_id, total, completed):
+    """Account for deleted tasks, `completed` of which had been completed"""
+    if completed:
+        # Removing completed days can break the streak anywhere in history
+        db.session.flush()
+        rebuild_user_stats(user_id)
+        return
+    stats, rebuilt = _load_for_update(user_id)
+    if not rebuilt:
+        stats.total_tasks = UserStats.total_tasks - total
+        stats.data_version = UserStats.data_version + 1
+
+def stats_summary(stats):
+    """Dashboard view of a stats row; the streak lapses once a day is missed"""
+    today = datetime.now().date()
+    return {
+        "streak": stats.current_streak if stats.last_active_date == today else 0,
+        "active_days": stats.completed_tasks,
+        "missing_days": stats.total_tasks - stats.completed_tasks
+    }
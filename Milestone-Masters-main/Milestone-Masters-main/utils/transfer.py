@@ -0,0 +1,276 @@
+"""Streaming export and batched import of goals with their tasks.
+
+Two formats, both readable by import_records():
+
+  ndjson -- one JSON object per line: a {"type": "goal", "id": ...} record
+            followed by the {"type": "task", "goal_id": ...} records of
+            that goal
+  csv    -- one row per task with its goal's columns repeated; a goal
+            without tasks has a single row with empty task columns
+
+export_goals() reads through one server-side cursor (yield_per) and
+yields text chunks, so memory use does not depend on the size of the
+export. import_records() validates every record and inserts in batches,
+committing after each one, so no transaction grows with the input.
+"""
+import csv
+import io
+import json
+import logging
+from dataclasses import dataclass, field
+from datetime import date
+from itertools import islice
+from sqlalchemy import select
+from extensions import db
+from models import Goal, Task, User
+from utils.bulk import goal_row, insert_goal_rows, insert_task_rows, task_row
+from utils.stats import rebuild_user_stats
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ('ndjson', 'csv')
+EXPORT_MIMETYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+# Rows fetched per round trip and records per yielded chunk
+EXPORT_CHUNK_ROWS = 1000
+
+CSV_COLUMNS = [
+    'goal_id', 'user_id', 'title', 'goal_description', 'start_date', 'end_date',
+    'task_date', 'task_description', 'completed'
+]
+
+# Only this many of an import's errors are kept for the report
+MAX_REPORTED_ERRORS = 100
+
+def _export_rows(user_id=None):
+    """Every goal joined with its tasks, in goal order, fetched in chunks"""
+    query = (
+        select(
+            Goal.id, Goal.user_id, Goal.title, Goal.description, Goal.start_date, Goal.end_date,
+            Task.date, Task.description.label('task_description'), Task.completed
+        )
+        .outerjoin(Task, Task.goal_id == Goal.id)
+        .order_by(Goal.id, Task.date, Task.id)
+    )
+    if user_id is not None:
+        query = query.where(Goal.user_id == user_id)
+    return db.session.execute(query.execution_options(yield_per=EXPORT_CHUNK_ROWS))
+
+def _ndjson_lines(rows):
+    goal_id = None
+    for row in rows:
+        if row.id != goal_id:
+            goal_id = row.id
+            yield json.dumps({
+                'type': 'goal',
+                'id': row.id,
+                'user_id': row.user_id,
+                'title': row.title,
+                'description': row.description,
+                'start_date': row.start_date.isoformat(),
+                'end_date': row.end_date.isoformat()
+            }) + '\n'
+        if row.date is not None:
+            yield json.dumps({
+                'type': 'task',
+                'goal_id': row.id,
+                'date': row.date.isoformat(),
+                'description': row.task_description,
+                'completed': bool(row.completed)
+            }) + '\n'
+
+def _csv_lines(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def line(values):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow(values)
+        return buffer.getvalue()
+
+    yield line(CSV_COLUMNS)
+    for row in rows:
+        yield line([
+            row.id, row.user_id, row.title, row.description or '',
+            row.start_date.isoformat(), row.end_date.isoformat(),
+            row.date.isoformat() if row.date else '', row.task_description or '',
+            '' if row.date is None else int(bool(row.completed))
+        ])
+
+def export_goals(fmt='ndjson', user_id=None):
+    """Yield the export as text chunks of EXPORT_CHUNK_ROWS records"""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    rows = _export_rows(user_id)
+    lines = _ndjson_lines(rows) if fmt == 'ndjson' else _csv_lines(rows)
+    while True:
+        chunk = ''.join(islice(lines, EXPORT_CHUNK_ROWS))
+        if not chunk:
+            return
+        yield chunk
+
+# Readers turn the input into (line number, kind, goal key, fields) records;
+# kind is 'goal', 'task' or 'error' (fields is then the message)
+
+def read_ndjson(lines):
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield number, 'error', None, f"Invalid JSON: {str(e)}"
+            continue
+        kind = record.get('type') if isinstance(record, dict) else None
+        if kind == 'goal':
+            yield number, 'goal', record.get('id'), record
+        elif kind == 'task':
+            yield number, 'task', record.get('goal_id'), record
+        else:
+            yield number, 'error', None, "Record type must be 'goal' or 'task'"
+
+def read_csv(lines):
+    reader = csv.DictReader(lines)
+    missing = set(CSV_COLUMNS) - set(reader.fieldnames or [])
+    if missing:
+        yield 1, 'error', None, f"Missing columns: {', '.join(sorted(missing))}"
+        return
+    goal_key = None
+    for row in reader:
+        number = reader.line_num
+        if row['goal_id'] != goal_key:
+            goal_key = row['goal_id']
+            yield number, 'goal', goal_key, {
+                'title': row['title'],
+                'description': row['goal_description'] or None,
+                'start_date': row['start_date'],
+                'end_date': row['end_date'],
+                'user_id': row['user_id']
+            }
+        if row['task_date']:
+            yield number, 'task', goal_key, {
+                'date': row['task_date'],
+                'description': row['task_description'],
+                'completed': row['completed'].strip().lower() in ('1', 'true', 'yes')
+            }
+
+READERS = {'ndjson': read_ndjson, 'csv': read_csv}
+
+def validate_goal(fields, user_id=None):
+    """Goal column values from an import record; raises ValueError"""
+    title = fields.get('title')
+    if not isinstance(title, str) or not title.strip():
+        raise ValueError("Goal needs a title")
+    if len(title) > Goal.title.type.length:
+        raise ValueError(f"Goal title is longer than {Goal.title.type.length} characters")
+    try:
+        row = goal_row({**fields, 'title': title.strip(), 'user_id': int(user_id or fields.get('user_id'))})
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("Goal needs a user_id and YYYY-MM-DD start and end dates")
+    if row['end_date'] < row['start_date']:
+        raise ValueError("Goal ends before it starts")
+    return row
+
+def validate_task(fields, goal_id, user_id):
+    description = fields.get('description')
+    if not isinstance(description, str) or not description.strip():
+        raise ValueError("Task needs a description")
+    if not isinstance(fields.get('date'), (str, date)):
+        raise ValueError("Task needs a YYYY-MM-DD date")
+    try:
+        return task_row(fields, goal_id, user_id)
+    except ValueError:
+        raise ValueError("Task needs a YYYY-MM-DD date")
+
+@dataclass
+class ImportResult:
+    goals: int = 0
+    tasks: int = 0
+    skipped: int = 0  # tasks of rejected goals; not listed as errors
+    error_count: int = 0
+    errors: list = field(default_factory=list)
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'error': message})
+
+def import_records(records, batch_size=1000, user_id=None):
+    """Insert goals and tasks from reader records in batches of
+    `batch_size` rows, committing after each batch.
+
+    Invalid records are skipped and reported; the tasks of a rejected goal,
+    and those that follow a repeated goal record, are skipped and only
+    counted. `user_id` assigns every goal to that user instead of the one
+    in the file. Stats of the affected users are rebuilt once at the end.
+    """
+    result = ImportResult()
+    goal_ids = {}  # goal key in the file -> id, None until inserted
+    owners = {}  # goal key -> user id
+    rejected = set()
+    # Keys whose goal record appeared again: the tasks after the repeat may
+    # belong to a different goal, so none of them go to the first one
+    duplicates = set()
+    pending_goals = []
+    pending_tasks = []
+    users = {}
+
+    def flush():
+        if pending_goals:
+            new_ids = insert_goal_rows([row for _, row in pending_goals])
+            for (key, _), goal_id in zip(pending_goals, new_ids):
+                goal_ids[key] = goal_id
+        insert_task_rows([{**row, 'goal_id': goal_ids[key]} for key, row in pending_tasks])
+        db.session.commit()
+        result.goals += len(pending_goals)
+        result.tasks += len(pending_tasks)
+        pending_goals.clear()
+        pending_tasks.clear()
+
+    for line, kind, key, fields in records:
+        try:
+            if kind == 'error':
+                raise ValueError(fields)
+            if key is None:
+                raise ValueError("Record has no goal id")
+            if kind == 'goal':
+                if key in goal_ids or key in rejected:
+                    duplicates.add(key)
+                    raise ValueError(f"Goal {key} appears more than once")
+                try:
+                    row = validate_goal(fields, user_id)
+                except ValueError:
+                    rejected.add(key)
+                    raise
+                if row['user_id'] not in users:
+                    users[row['user_id']] = db.session.get(User, row['user_id']) is not None
+                if not users[row['user_id']]:
+                    rejected.add(key)
+                    raise ValueError(f"User {row['user_id']} does not exist")
+                goal_ids[key] = None
+                owners[key] = row['user_id']
+                pending_goals.append((key, row))
+            elif key in rejected or key in duplicates:
+                result.skipped += 1
+                continue
+            elif key not in goal_ids:
+                raise ValueError(f"Task refers to goal {key}, which has not been defined before it")
+            else:
+                pending_tasks.append((key, validate_task(fields, None, owners[key])))
+        except ValueError as e:
+            result.add_error(line, str(e))
+            continue
+
+        if len(pending_goals) + len(pending_tasks) >= batch_size:
+            flush()
+    flush()
+
+    for owner, exists in users.items():
+        if exists:
+            rebuild_user_stats(owner)
+    db.session.commit()
+    logger.info(
+        f"Imported {result.goals} goals with {result.tasks} tasks, "
+        f"{result.error_count} rows rejected, {result.skipped} tasks skipped"
+    )
+    return result